@@ -0,0 +1,103 @@
+"""
+AI Pipeline
+Asyncio engine that runs independent LLM calls concurrently under a concurrency limit
+"""
+
+import asyncio
+import threading
+
+from llm_cache import cached_completion_async
+from openai_clients import create_async_openai_client
+
+# Calls in flight at once per pipeline run; RPM/TPM quotas are enforced by rate_limits
+DEFAULT_MAX_CONCURRENCY = 6
+
+
+async def _run_tasks(tasks, api_key, max_concurrency, on_done, cache, refresh_cache, base_url):
+    client = create_async_openai_client(api_key, base_url)
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def complete(**params):
+        async with semaphore:
+            return await cached_completion_async(client, params, cache, refresh_cache)
+
+    async def run_one(position, task):
+        try:
+            result = await task(complete)
+        except Exception as e:
+            result = e
+        if on_done is not None:
+            on_done(position, result)
+        return result
+
+    try:
+        return await asyncio.gather(*(run_one(position, task) for position, task in enumerate(tasks)))
+    finally:
+        await client.close()
+
+
+def _run_coroutine(coroutine):
+    """Run a coroutine to completion from synchronous code.
+
+    Streamlit scripts have no running loop, so asyncio.run is used directly;
+    inside an already running loop the coroutine gets its own thread.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coroutine)
+
+    outcome = {}
+
+    def runner():
+        try:
+            outcome['result'] = asyncio.run(coroutine)
+        except BaseException as e:
+            outcome['error'] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if 'error' in outcome:
+        raise outcome['error']
+    return outcome['result']
+
+
+def run_tasks(tasks, api_key, max_concurrency=DEFAULT_MAX_CONCURRENCY, on_done=None, cache=None, refresh_cache=False,
+              base_url=None):
+    """Run independent async tasks concurrently and return their results in order.
+
+    Each task is an async callable taking complete(**params), which awaits
+    one chat.completions.create call on a client shared by the whole run.
+    Tasks may chain several calls (e.g. analyze a screenshot, then map it);
+    at most max_concurrency calls are in flight across all tasks. A task's
+    exception is returned in place of its result so one failure does not
+    sink the batch. on_done(position, result) is called on the calling
+    thread's event loop as each task finishes. With a response cache,
+    repeated calls are answered from it (see llm_cache.cached_completion).
+    base_url is the endpoint (see openai_clients.resolve_base_url).
+    """
+    if not tasks:
+        return []
+    return _run_coroutine(_run_tasks(list(tasks), api_key, max_concurrency, on_done, cache, refresh_cache, base_url))
+
+
+def run_completions(requests, api_key, max_concurrency=DEFAULT_MAX_CONCURRENCY, on_done=None,
+                    cache=None, refresh_cache=False, base_url=None):
+    """Run independent chat.completions.create calls concurrently.
+
+    requests is a list of keyword-argument dicts; returns the completions
+    (or exceptions) in the same order.
+    """
+    def make_task(params):
+        async def task(complete):
+            return await complete(**params)
+        return task
+
+    return run_tasks([make_task(params) for params in requests], api_key, max_concurrency, on_done,
+                     cache, refresh_cache, base_url)
+
+
+def completion_text(completion):
+    """Message content of a completion's first choice"""
+    return completion.choices[0].message.content
@@ -5,17 +5,39 @@ Streamlit application to generate test cases from BRD documents using AI
 
 import streamlit as st
 import pandas as pd
-from openai import OpenAI
-from docx import Document
-import PyPDF2
-import io
-import openpyxl
 from datetime import datetime
+import hashlib
 import json
 import os
-import base64
+import time
 from PIL import Image
 
+from sqlite_cache import SQLiteCache
+from brd_sections import build_section_index, section_outline
+from upload_storage import create_upload_dir, spool_uploads
+from pipeline_plan import plan_pipeline
+from openai_clients import DEFAULT_BASE_URL, get_openai_client
+from llm_cache import cached_completion, get_response_cache, usage_totals
+from rate_limits import rate_limit_caps, rate_limit_stats
+from ai_pipeline import DEFAULT_MAX_CONCURRENCY, run_tasks
+from ui_coverage import screen_analysis_task
+from requirements_coverage import coverage_request
+from test_case_generation import DEFAULT_BATCH_SIZE, DEFAULT_CONTINUATION_ROUNDS
+from requirements_analysis import (
+    artifact_matches, brd_fingerprint, build_requirement_chunks, use_chunked_extraction
+)
+from test_case_export import convert_to_dataframe, create_excel_output
+from brd_pipeline import (
+    AUTO_DOMAIN_CONTEXT, PROMPT_FILE, extract_brd_text, generate_suite, incremental_options, read_prompt_template,
+    regenerate_suite
+)
+from brd_revisions import get_suite_store, load_suite, save_suite
+from test_case_dedup import DEFAULT_THRESHOLD, collapse_duplicates, find_near_duplicates, merge_duplicates
+from background_jobs import ACTIVE_STATUSES, get_job_runner, job_key
+
+# How often the page reruns to pick up progress while a background job is running
+JOB_POLL_SECONDS = 1.0
+
 # Page configuration
 st.set_page_config(
     page_title="Test Case Generator",
@@ -58,756 +80,346 @@ st.markdown("""
 
 # Load the test case generation prompt
 def load_prompt():
-    """Load the test case generation prompt from file"""
+    """Load the test case generation prompt, re-reading the file only after it changes"""
     try:
-        with open('Test_Case_Generation_Prompt.md', 'r') as f:
-            return f.read()
+        return read_prompt_template()
     except FileNotFoundError:
-        st.error("Test_Case_Generation_Prompt.md not found. Please ensure it's in the same directory.")
+        st.error(f"{os.path.basename(PROMPT_FILE)} not found. Please ensure it's in the same directory.")
         return None
 
-# Document processing functions
-def extract_text_from_docx(file):
-    """Extract text from Word document"""
-    doc = Document(file)
-    full_text = []
-    for para in doc.paragraphs:
-        full_text.append(para.text)
-    
-    # Extract tables
-    for table in doc.tables:
-        for row in table.rows:
-            row_text = [cell.text for cell in row.cells]
-            full_text.append(' | '.join(row_text))
-    
-    return '\n'.join(full_text)
+def streamlit_report(level, message):
+    """Pipeline reporter that shows messages as Streamlit alerts (st.info, st.warning, st.caption, ...)"""
+    getattr(st, level)(message)
 
-def extract_text_from_pdf(file):
-    """Extract text from PDF document"""
-    pdf_reader = PyPDF2.PdfReader(file)
-    full_text = []
-    for page in pdf_reader.pages:
-        full_text.append(page.extract_text())
-    return '\n'.join(full_text)
+@st.cache_resource
+def get_extraction_cache():
+    """Process-wide on-disk cache of extracted document text"""
+    return SQLiteCache('extraction_cache.sqlite', max_bytes=1024 * 1024 * 1024)
 
-def extract_text_from_excel(file):
-    """Extract text from Excel document"""
-    df = pd.read_excel(file, sheet_name=None)  # Read all sheets
-    full_text = []
-    for sheet_name, sheet_df in df.items():
-        full_text.append(f"\n--- Sheet: {sheet_name} ---\n")
-        full_text.append(sheet_df.to_string())
-    return '\n'.join(full_text)
-
-def process_uploaded_files(uploaded_files):
-    """Process multiple uploaded files and extract text"""
-    combined_text = []
-    
-    for uploaded_file in uploaded_files:
-        file_extension = uploaded_file.name.split('.')[-1].lower()
-        
-        st.write(f"📄 Processing: {uploaded_file.name}")
-        
-        try:
-            if file_extension == 'docx':
-                text = extract_text_from_docx(uploaded_file)
-            elif file_extension == 'pdf':
-                text = extract_text_from_pdf(uploaded_file)
-            elif file_extension in ['xlsx', 'xls']:
-                text = extract_text_from_excel(uploaded_file)
-            elif file_extension == 'txt':
-                text = uploaded_file.read().decode('utf-8')
-            else:
-                st.warning(f"Unsupported file type: {file_extension}")
-                continue
-            
-            combined_text.append(f"\n{'='*80}\n")
-            combined_text.append(f"FILE: {uploaded_file.name}\n")
-            combined_text.append(f"{'='*80}\n")
-            combined_text.append(text)
-            
-        except Exception as e:
-            st.error(f"Error processing {uploaded_file.name}: {str(e)}")
-    
-    return '\n'.join(combined_text)
-
-def analyze_requirements_from_brd(brd_text, api_key):
-    """Analyze BRD document to identify and count all functional requirements"""
-    
-    try:
-        client = OpenAI(api_key=api_key)
-    except Exception as e:
-        st.error(f"Error initializing OpenAI client: {str(e)}")
-        return [], 0
+def spool_session_uploads(uploaded_files, category):
+    """Spool this session's uploads to disk, reporting files rejected by the byte budgets"""
+    if 'upload_dir' not in st.session_state or not os.path.isdir(st.session_state['upload_dir']):
+        st.session_state['upload_dir'] = create_upload_dir()
+        st.session_state['spooled_uploads'] = {}
     
-    prompt = f"""You are a Senior Business Analyst specialized in comprehensive requirements extraction from Business Requirements Documents.
-
-## BRD DOCUMENT TO ANALYZE
-
-{brd_text}
-
-## CRITICAL TASK
-
-Extract AT LEAST 30-40 UNIQUE functional requirements from the BRD. Be extremely thorough and granular. Break down complex features into multiple specific requirements.
-
-**REQUIREMENT CATEGORIES TO EXTRACT (Minimum 5-8 per category):**
-
-### 1. USER INTERFACE REQUIREMENTS (8-12 requirements)
-- Each screen/page as separate requirement
-- Form fields and their validations (group by sections)
-- Buttons, links, navigation elements
-- Menu items and dropdown options
-- Search functionality and filters
-- Display formats and layouts
-- File upload/download features
-- Modal dialogs and popups
-
-### 2. BUSINESS PROCESS REQUIREMENTS (10-15 requirements)
-- User registration/login processes
-- Account creation workflows
-- Transaction processing steps
-- Approval workflows (each approval level)
-- Status change processes
-- Email/notification triggers
-- Data synchronization processes
-- Batch processing operations
-
-### 3. DATA VALIDATION REQUIREMENTS (8-12 requirements)
-- Field-level validations (separate for each field type)
-- Business rule validations
-- Cross-field validations
-- Format validations (date, email, phone, etc.)
-- Range validations (amounts, dates)
-- Mandatory field checks
-- Duplicate data checks
-- Data integrity constraints
-
-### 4. INTEGRATION REQUIREMENTS (3-5 requirements)
-- API integrations
-- Database operations
-- Third-party service calls
-- File import/export
-- External system communications
-
-### 5. REPORTING & INQUIRY REQUIREMENTS (3-5 requirements)
-- Report generation
-- Data export features  
-- Search and inquiry functions
-- Dashboard displays
-- Analytics and metrics
-
-### 6. SECURITY & ACCESS REQUIREMENTS (3-5 requirements)
-- Authentication mechanisms
-- Authorization controls
-- Role-based access
-- Session management
-- Audit trail requirements
-
-### 7. BUSINESS RULES & CALCULATIONS (5-8 requirements)
-- Calculation logic
-- Interest computations
-- Fee calculations
-- Business rule validations
-- Conditional processing
-- Status determination logic
-
-**EXTRACTION STRATEGY:**
-1. **Be Granular**: Break large features into 3-4 smaller requirements
-2. **Field-Level**: Each form section = 1 requirement
-3. **Step-by-Step**: Each workflow step = 1 requirement  
-4. **Screen-Specific**: Each screen/page = 1 requirement
-5. **Validation-Specific**: Each validation type = 1 requirement
-6. **Role-Specific**: Different user roles = separate requirements
-
-**EXAMPLES OF GRANULAR BREAKDOWN:**
-- Instead of "User Registration" → Break into:
-  - REQ-001: User registration form - Personal details validation
-  - REQ-002: User registration form - Contact details validation  
-  - REQ-003: User registration form - Document upload functionality
-  - REQ-004: User registration - Email verification process
-  - REQ-005: User registration - Account activation workflow
-
-**MINIMUM TARGET**: 35+ unique requirements (aim for 40-50 if document is comprehensive)
-
-**NO DUPLICATES**: Each requirement must be unique and testable
+    records, errors = spool_uploads(
+        uploaded_files,
+        st.session_state['upload_dir'],
+        st.session_state['spooled_uploads'],
+        category
+    )
+    for error in errors:
+        st.error(f"⚠️ {error}")
+    return records
+
+def response_cache_settings():
+    """Response cache and refresh flag for AI calls, as chosen in the sidebar"""
+    return get_response_cache(), st.session_state.get('bypass_llm_cache', False)
+
+def show_response_cache_stats(placeholder):
+    """Render response cache counters into a sidebar placeholder"""
+    stats = get_response_cache().stats()
+    placeholder.caption(
+        f"💾 Response cache: {stats['hits']} hits · {stats['misses']} misses · "
+        f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)"
+    )
+
+def show_prompt_cache_stats(placeholder):
+    """Render how much of the prompt tokens sent so far the provider served from its prompt cache"""
+    usage = usage_totals()
+    if not usage['prompt_tokens']:
+        return
+    placeholder.caption(
+        f"🧠 Prompt cache: {usage['cached_tokens']:,} of {usage['prompt_tokens']:,} prompt tokens cached "
+        f"({usage['cached_tokens'] / usage['prompt_tokens']:.0%}) over {usage['calls']} API calls"
+    )
+
+def show_rate_limit_stats(placeholder):
+    """Render rate limiter counters into a sidebar placeholder"""
+    stats = rate_limit_stats()
+    placeholder.caption(
+        f"🚦 Rate limits: {stats['requests']} requests · {stats['rate_limited']} throttled by the API · "
+        f"{stats['retries']} retries · {stats['wait_seconds']:.0f}s queued"
+    )
 
-**OUTPUT FORMAT**:
-Return ONLY a valid JSON object with this structure:
-{{
-  "total_requirements": <number_minimum_35>,
-  "requirements": [
-    {{
-      "requirement_id": "REQ-001",
-      "requirement_type": "UI/Workflow/Data/Integration/Report/Security/Business Rule/Calculation",
-      "module": "Module Name",
-      "title": "Specific granular requirement title",
-      "description": "Detailed requirement description with specific functionality",
-      "priority": "Critical/High/Medium/Low",
-      "testable": true
-    }}
-  ]
-}}
-
-**IMPORTANT**: If the BRD seems to have fewer obvious requirements, EXPAND and DECOMPOSE existing features into granular, testable requirements. Every button click, field validation, screen display, and process step should be a separate requirement.
-
-Start extraction now - aim for 35-50 unique requirements:"""
-
-    try:
-        with st.spinner('🔍 Analyzing BRD to identify all requirements...'):
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert Business Analyst specialized in requirements analysis and extraction."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=8192,
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
-            
-            response_text = response.choices[0].message.content
-            
-            # Parse JSON response
-            try:
-                json_response = json.loads(response_text)
-                requirements = json_response.get('requirements', [])
-                total_count = json_response.get('total_requirements', len(requirements))
-                
-                return requirements, total_count
-                
-            except json.JSONDecodeError as e:
-                st.error(f"Error parsing requirements analysis: {str(e)}")
-                return [], 0
-                
-    except Exception as e:
-        st.error(f"Error analyzing requirements: {str(e)}")
-        return [], 0
-
-def generate_test_cases_with_ai(brd_text, prompt_template, api_key, options):
-    """Generate test cases using OpenAI GPT-4o API"""
-    
-    try:
-        client = OpenAI(api_key=api_key)
-    except Exception as e:
-        st.error(f"Error initializing OpenAI client: {str(e)}")
-        return [], ""
+# Document processing functions
+def process_uploaded_files(uploaded_files, parallel=False, max_workers=None, use_cache=True, normalize=True):
+    """Process multiple uploaded files and extract text"""
+    documents = []
+    for record in spool_session_uploads(uploaded_files, 'brd'):
+        st.write(f"📄 Processing: {record['name']}")
+        documents.append((record['name'], record['path'], record['sha256']))
     
-    # First analyze requirements to get exact count
-    st.info("🔍 Step 1: Analyzing BRD to identify all requirements...")
-    requirements, total_requirements_count = analyze_requirements_from_brd(brd_text, api_key)
+    cache = get_extraction_cache() if use_cache else None
+    return extract_brd_text(documents, parallel=parallel, max_workers=max_workers, cache=cache,
+                            normalize=normalize, report=streamlit_report)
+
+def current_requirements(brd_text):
+    """Analyzed requirements for this BRD text, or None if none have been produced yet"""
+    artifact = st.session_state.get('requirements_artifact')
+    return artifact['requirements'] if artifact_matches(artifact, brd_text) else None
+
+def show_preflight_plan(brd_text, options):
+    """Expected calls, tokens and wall time per stage for the current BRD and sidebar options"""
+    section_index = st.session_state.get('brd_sections') or build_section_index(brd_text)
+    chunk_count = None
+    if use_chunked_extraction(brd_text, options.get('chunked_requirements')):
+        chunk_count = len(build_requirement_chunks(brd_text, section_index))
+    requirements = current_requirements(brd_text)
+    plan = plan_pipeline(
+        brd_text, load_prompt() or '', options,
+        chunk_count=chunk_count,
+        requirements=requirements,
+        section_index=section_index
+    )
     
-    if not requirements:
-        st.warning("Could not identify requirements. Falling back to automatic detection...")
-        total_requirements_count = 35  # Minimum fallback count
-        requirements_summary = "Analyze BRD and identify at least 35 granular requirements automatically"
+    with st.expander("📐 Pre-flight Plan", expanded=True):
+        st.caption(
+            f"Based on the last extracted text: ~{plan['brd_tokens']:,} BRD tokens, "
+            f"{'analyzed' if requirements else 'an estimated'} {plan['expected_requirements']} requirements "
+            f"({plan['model']}). Estimates are approximate."
+        )
+        st.dataframe(
+            pd.DataFrame([{
+                'Stage': stage['stage'],
+                'Calls': stage['calls'],
+                'Input Tokens': stage['input_tokens'],
+                'Output Tokens': stage['output_tokens'],
+                'Est. Wall Time (s)': stage['wall_seconds'],
+                'Notes': stage['note']
+            } for stage in plan['stages']]),
+            use_container_width=True,
+            hide_index=True
+        )
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Input Tokens", f"{plan['total_input_tokens']:,}")
+        with col2:
+            st.metric("Output Tokens", f"{plan['total_output_tokens']:,}")
+        with col3:
+            st.metric("Est. Wall Time", f"{plan['total_wall_seconds'] / 60:.1f} min")
+        for warning in plan['warnings']:
+            st.warning(f"⚠️ {warning}")
+
+def generation_job(job, brd_text, prompt_template, api_key, options, cache, refresh_cache, previous_artifact,
+                   previous_suite=None):
+    """Background job body: requirements analysis and generation, reported through the job handle.
+
+    With previous_suite the revised BRD is regenerated incrementally. Every
+    generated suite is stored as the baseline for the next revision.
+    """
+    if previous_suite:
+        suite = regenerate_suite(
+            brd_text, prompt_template, api_key, options, previous_suite, job.report, cache, refresh_cache,
+            on_progress=job.progress
+        )
     else:
-        if total_requirements_count < 30:
-            st.warning(f"⚠️ Only {total_requirements_count} requirements found. Expanding analysis...")
-            total_requirements_count = max(35, total_requirements_count)
-            st.info(f"📈 Targeting {total_requirements_count} test cases with granular requirement breakdown")
-        else:
-            st.success(f"✅ Found {total_requirements_count} requirements in the BRD")
-        
-        requirements_summary = f"Generate EXACTLY {total_requirements_count} test cases - one for each requirement:\n"
-        for i, req in enumerate(requirements[:10], 1):  # Show first 10 for reference
-            requirements_summary += f"{i}. {req.get('title', 'N/A')} (Type: {req.get('requirement_type', 'N/A')})\n"
-        if len(requirements) > 10:
-            requirements_summary += f"... and {len(requirements) - 10} more requirements"
-    
-    st.info("🤖 Step 2: Generating test cases for each identified requirement...")
+        suite = generate_suite(
+            brd_text, prompt_template, api_key, options, job.report, cache, refresh_cache,
+            previous_artifact=previous_artifact, on_progress=job.progress
+        )
+    if suite['test_cases']:
+        save_suite(get_suite_store(), brd_text, suite['artifact'], suite['test_cases'])
+    suite['generation_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    return suite
+
+def previous_suite_for(brd_text):
+    """The stored suite of the last BRD generated in this session if brd_text is a revision of it, else None.
+
+    The session's test cases replace the stored ones, so edits made since
+    (e.g. merged duplicates) carry over into the revision.
+    """
+    artifact = st.session_state.get('requirements_artifact')
+    if not artifact or artifact['fingerprint'] == brd_fingerprint(brd_text):
+        return None
+    previous = load_suite(get_suite_store(), artifact['fingerprint'])
+    if previous and st.session_state.get('test_cases'):
+        previous['test_cases'] = st.session_state['test_cases']
+    return previous
+
+def start_generation_job(brd_text, prompt_template, api_key, options, incremental=False):
+    """Run generation on the background job runner and remember the job in the session.
+
+    Submitting the same BRD, options and prompt while that job is still
+    running attaches to it, so a rerun never repeats its AI calls. With
+    incremental, a revision of the last generated BRD only regenerates
+    what its changed sections affect.
+    """
+    cache, refresh_cache = response_cache_settings()
+    previous_suite = previous_suite_for(brd_text) if incremental else None
+    key = job_key(
+        'generation', brd_fingerprint(brd_text), prompt_template, refresh_cache,
+        hashlib.sha256(api_key.encode('utf-8')).hexdigest(),
+        {name: value for name, value in options.items() if name != 'section_index'},
+        previous_suite['fingerprint'] if previous_suite else None
+    )
+    job_id = get_job_runner().submit(
+        'generation', generation_job, brd_text, prompt_template, api_key, options, cache, refresh_cache,
+        st.session_state.get('requirements_artifact'), previous_suite, key=key
+    )
+    st.session_state['generation_job_id'] = job_id
+    return job_id
+
+def current_generation_job():
+    """This session's latest generation job; a finished job's results are copied into session state once"""
+    job_id = st.session_state.get('generation_job_id')
+    job = get_job_runner().get(job_id) if job_id else None
+    if job is None or job['status'] != 'done' or st.session_state.get('applied_generation_job') == job_id:
+        return job
     
-    # Construct the full prompt
-    full_prompt = f"""{prompt_template}
-
----
-
-## BRD DOCUMENT TO ANALYZE
-
-{brd_text}
-
----
-
-## REQUIREMENTS ANALYSIS RESULTS
-
-{requirements_summary}
-
----
-
-## GENERATION INSTRUCTIONS
-
-Based on the above BRD document and requirements analysis, generate comprehensive test cases following the framework provided.
-
-**CRITICAL REQUIREMENT**: Generate EXACTLY {total_requirements_count if isinstance(total_requirements_count, int) else 'at least 35'} test cases - ONE test case for EACH identified requirement. Be comprehensive and granular - break down complex features into multiple specific test cases.
-
-**MINIMUM TEST CASE TARGET**: {total_requirements_count if isinstance(total_requirements_count, int) else '35'} test cases (ensure comprehensive coverage)
-
-**APPLICATION DOMAIN/CONTEXT:**
-{options.get('domain_context', 'Identify from BRD')}
-
-Use domain-appropriate terminology, workflows, and test scenarios relevant to this industry/application type.
-
-**IMPORTANT REQUIREMENTS:**
-1. Generate test cases in the 14-column structure specified
-2. Include field-level validation test cases (~20%)
-3. Include workflow test cases with 15-step pattern (~55%)
-4. Include authorization/approval test cases (6+ per workflow if applicable)
-5. Include negative test cases (~{options['negative_ratio']}%)
-6. Consider variations: {', '.join(options['variations']) if options['variations'] else 'Identify from BRD'}
-7. Focus on these modules: {', '.join(options['focus_modules']) if options['focus_modules'] else 'All modules from BRD'}
-
-**ADAPT TO DOMAIN:**
-- Use terminology specific to {options.get('domain_context', 'the application domain')}
-- Include domain-specific validations and business rules
-- Create realistic test scenarios for this industry
-- Consider domain-specific user roles and workflows
-
-**IMPORTANT - TEST CASE CATEGORIZATION:**
-Clearly mark each test case with appropriate type in the TC Module field:
-- **Field-Level**: Use format "[Module Name] - Field Validation"
-- **Functional/Workflow**: Use format "[Module Name] - Workflow"
-- **Negative**: Use format "[Module Name] - Negative Test"
-
-**TEST CASE DISTRIBUTION:**
-1. **Field-Level Test Cases (~20% of total)**:
-   - Focus on field validations, formats, mandatory checks
-   - TC Module should end with "- Field Validation"
-   - Example: "Account Opening - Field Validation"
-
-2. **Functional/Workflow Test Cases (~60% of total)**:
-   - Focus on end-to-end workflows, business processes
-   - TC Module should end with "- Workflow"
-   - Example: "Account Opening - Workflow"
-
-3. **Negative Test Cases (~15% of total)**:
-   - Focus on business rule violations, error scenarios
-   - TC Module should end with "- Negative Test"
-   - Example: "Account Opening - Negative Test"
-
-4. **Other Test Cases (~5%)**:
-   - Reports, inquiries, modifications
-   - TC Module should reflect the type
-
-**OUTPUT FORMAT:**
-Return ONLY a valid JSON object with a "test_cases" key containing an array of test case objects.
-Each test case object must have these 14 fields:
-- product_name
-- process_category
-- business_process_id
-- business_process
-- scenario_id
-- scenario_description
-- category
-- importance
-- test_case_id
-- tc_module (MUST include type suffix: "- Field Validation", "- Workflow", or "- Negative Test")
-- test_condition
-- prerequisite
-- test_case_description
-- expected_result
-
-**IMPORTANT - COMPREHENSIVE TEST CASE COUNT REQUIREMENT:**
-Generate EXACTLY {total_requirements_count if isinstance(total_requirements_count, int) else 'at least 35'} test cases based on:
-- One test case for each functional requirement identified in the requirements analysis
-- If requirements analysis found fewer than 30 requirements, expand by breaking down complex features into granular test cases
-- Each screen, form section, workflow step, validation rule should be a separate test case
-- Cover all UI elements, business processes, data validations, integrations, reports, and security aspects
-- Be granular: "User Registration" should become 4-5 separate test cases (personal details, contact details, document upload, email verification, account activation)
-- Ensure comprehensive coverage: {total_requirements_count if isinstance(total_requirements_count, int) else 'minimum 35'} unique test cases
-- No duplicates - each test case must test a unique aspect of the system
-
-Example format:
-{{
-  "test_cases": [
-    {{
-      "product_name": "Banking Application",
-      "process_category": "Account Opening",
-      "tc_module": "Account Opening - Field Validation",
-      ...
-    }},
-    {{
-      "product_name": "Banking Application",
-      "process_category": "Account Opening",
-      "tc_module": "Account Opening - Workflow",
-      ...
-    }}
-  ]
-}}
-
-Start generating now:"""
+    st.session_state['applied_generation_job'] = job_id
+    result = job['result']
+    st.session_state['requirements_artifact'] = result['artifact']
+    if result['test_cases']:
+        st.session_state['test_cases'] = result['test_cases']
+        st.session_state['raw_response'] = result['raw_response']
+        st.session_state['generation_time'] = result['generation_time']
+        # Requirements count for display comes from the artifact generation produced
+        st.session_state['requirements_count'] = result['artifact']['total_count']
+    return job
+
+def show_generation_job(job):
+    """Progress and live results of a running generation job, or the outcome of a finished one"""
+    if job['status'] in ACTIVE_STATUSES:
+        for level, message in job['events']:
+            getattr(st, level)(message)
+        st.progress(job['progress'], text=job['message'])
+        if job['partial']:
+            st.dataframe(convert_to_dataframe(job['partial']), use_container_width=True, height=400)
+        return
     
-    with st.spinner('🤖 AI is analyzing BRD and generating test cases...'):
-        try:
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert QA Test Analyst specialized in creating comprehensive test cases from Business Requirements Documents."},
-                    {"role": "user", "content": full_prompt}
-                ],
-                max_tokens=16384,
-                temperature=0.3,
-                response_format={"type": "json_object"}
-            )
-            
-            response_text = response.choices[0].message.content
-            
-            # Try to parse JSON response
-            try:
-                # Parse the JSON response
-                json_response = json.loads(response_text)
-                
-                # Extract test cases from the response
-                if isinstance(json_response, dict) and 'test_cases' in json_response:
-                    test_cases = json_response['test_cases']
-                    if test_cases and isinstance(test_cases, list):
-                        return test_cases, response_text
-                    else:
-                        return None, response_text
-                elif isinstance(json_response, list):
-                    test_cases = json_response
-                    return test_cases, response_text
-                else:
-                    # Try to find test_cases array in the response
-                    test_cases = None
-                    for key in json_response:
-                        if isinstance(json_response[key], list) and len(json_response[key]) > 0:
-                            test_cases = json_response[key]
-                            break
-                    
-                    if test_cases:
-                        return test_cases, response_text
-                    else:
-                        return None, response_text
-                    
-            except json.JSONDecodeError as e:
-                st.warning("⚠️ JSON response incomplete due to token limit. Attempting to recover partial data...")
-                
-                # Try to extract incomplete JSON and fix it
-                try:
-                    # Find the test_cases array start
-                    test_cases_start = response_text.find('"test_cases": [')
-                    if test_cases_start != -1:
-                        # Extract from test_cases array start
-                        array_start = response_text.find('[', test_cases_start)
-                        
-                        # Find all complete test case objects
-                        test_cases = []
-                        current_pos = array_start + 1
-                        brace_count = 0
-                        current_obj_start = -1
-                        
-                        for i, char in enumerate(response_text[array_start + 1:], array_start + 1):
-                            if char == '{':
-                                if brace_count == 0:
-                                    current_obj_start = i
-                                brace_count += 1
-                            elif char == '}':
-                                brace_count -= 1
-                                if brace_count == 0 and current_obj_start != -1:
-                                    # Complete object found
-                                    obj_text = response_text[current_obj_start:i+1]
-                                    try:
-                                        test_case = json.loads(obj_text)
-                                        test_cases.append(test_case)
-                                    except:
-                                        pass
-                                    current_obj_start = -1
-                        
-                        if test_cases:
-                            st.info(f"✅ Recovered {len(test_cases)} complete test cases from incomplete response")
-                            return test_cases, response_text
-                
-                except Exception as recovery_error:
-                    st.error(f"Could not recover partial data: {str(recovery_error)}")
-                
-                # Final fallback - try to extract any JSON array
-                start_idx = response_text.find('[')
-                end_idx = response_text.rfind(']') + 1
-                
-                if start_idx != -1 and end_idx > start_idx:
-                    try:
-                        json_text = response_text[start_idx:end_idx]
-                        test_cases = json.loads(json_text)
-                        return test_cases, response_text
-                    except:
-                        pass
-                
-                return None, response_text
-                
-        except Exception as e:
-            st.error(f"Error calling OpenAI API: {str(e)}")
-            return None, str(e)
-
-def categorize_test_case_type(tc_module):
-    """Categorize test case based on TC Module name"""
-    tc_module_lower = str(tc_module).lower()
+    with st.expander("📝 Generation Log", expanded=job['status'] != 'done'):
+        for level, message in job['events']:
+            getattr(st, level)(message)
     
-    if 'field validation' in tc_module_lower or 'field-level' in tc_module_lower:
-        return 'Field-Level'
-    elif 'workflow' in tc_module_lower or 'functional' in tc_module_lower:
-        return 'Functional'
-    elif 'negative' in tc_module_lower:
-        return 'Negative'
-    elif 'report' in tc_module_lower or 'inquiry' in tc_module_lower:
-        return 'Report/Inquiry'
-    elif 'modification' in tc_module_lower or 'update' in tc_module_lower:
-        return 'Modification'
+    if job['status'] == 'interrupted':
+        st.warning("⚠️ The last generation was interrupted by a server restart. Please generate again.")
+    elif job['status'] == 'failed':
+        st.error(f"❌ Generation failed: {job['error']}")
+    elif job['result']['test_cases']:
+        show_generation_summary(job['result']['test_cases'], job['result']['artifact']['total_count'])
     else:
-        return 'Other'
-
-def encode_image_to_base64(image_file):
-    """Encode uploaded image to base64"""
-    try:
-        image = Image.open(image_file)
-        buffered = io.BytesIO()
-        image.save(buffered, format=image.format if image.format else "PNG")
-        return base64.b64encode(buffered.getvalue()).decode('utf-8')
-    except Exception as e:
-        st.error(f"Error encoding image: {str(e)}")
-        return None
+        st.warning("⚠️ Could not extract structured test cases. Showing raw response:")
+        st.text_area("Raw AI Response", job['result']['raw_response'], height=400)
 
-def analyze_ui_screenshot(image_file, screen_name, api_key):
-    """Analyze UI screenshot using GPT-4o Vision to extract UI elements"""
-    
-    try:
-        client = OpenAI(api_key=api_key)
-    except Exception as e:
-        st.error(f"Error initializing OpenAI client for UI analysis: {str(e)}")
-        return []
+def show_generation_summary(test_cases, req_count):
+    """Success message with requirements coverage info and quick stats"""
+    test_case_count = len(test_cases)
     
-    # Encode image
-    base64_image = encode_image_to_base64(image_file)
-    if not base64_image:
-        return None
+    if req_count > 0:
+        coverage_ratio = (test_case_count / req_count) * 100
+        if coverage_ratio >= 95:  # Allow for slight variation
+            st.markdown('<div class="success-box">✅ Test cases generated successfully! Perfect 1:1 requirement coverage achieved!</div>', 
+                      unsafe_allow_html=True)
+            st.success(f"🎯 Generated {test_case_count} test cases for {req_count} requirements (1:1 mapping)")
+        else:
+            st.markdown('<div class="success-box">✅ Test cases generated successfully! Check the "View Results" tab.</div>', 
+                      unsafe_allow_html=True)
+            st.info(f"📊 Generated {test_case_count} test cases for {req_count} identified requirements")
+    else:
+        st.markdown('<div class="success-box">✅ Test cases generated successfully! Check the "View Results" tab.</div>', 
+                  unsafe_allow_html=True)
     
-    prompt = """Analyze this UI screenshot and extract all interactive elements.
-
-For each UI element, identify:
-1. Element type (input_field, button, link, checkbox, dropdown, radio_button, textarea, etc.)
-2. Element label/text (visible text or placeholder)
-3. Whether it's required (look for * or "required" indicators)
-4. Any validation hints or helper text
-
-IMPORTANT: Return ONLY valid JSON. No markdown, no code blocks, no explanations. Just pure JSON.
-
-JSON structure:
-{
-  "screen_type": "login/form/dashboard/etc",
-  "elements": [
-    {
-      "type": "input_field",
-      "label": "Email Address",
-      "required": true,
-      "placeholder": "Enter your email",
-      "description": "Brief description of what this element does"
-    }
-  ]
-}
-
-Be thorough and extract ALL interactive elements you can see. Return the JSON now:"""
-
-    try:
-        with st.spinner(f'🔍 Analyzing {screen_name}...'):
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {"type": "text", "text": prompt},
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{base64_image}",
-                                    "detail": "high"
-                                }
-                            }
-                        ]
-                    }
-                ],
-                max_tokens=2000,
-                temperature=0.1
+    # Quick stats
+    df = convert_to_dataframe(test_cases)
+    col1, col2, col3, col4, col5, col6 = st.columns(6)
+    with col1:
+        st.metric("Total Test Cases", len(df))
+    with col2:
+        st.metric("Requirements Found", req_count if req_count > 0 else "N/A")
+    with col3:
+        field_level = len(df[df['Test Type'] == 'Field-Level']) if 'Test Type' in df.columns else 0
+        st.metric("Field-Level", field_level)
+    with col4:
+        functional = len(df[df['Test Type'] == 'Functional']) if 'Test Type' in df.columns else 0
+        st.metric("Functional", functional)
+    with col5:
+        negative = len(df[df['Test Type'] == 'Negative']) if 'Test Type' in df.columns else 0
+        st.metric("Negative", negative)
+    with col6:
+        modules = df['TC Module'].nunique()
+        st.metric("Modules", modules)
+
+def show_near_duplicates(test_cases):
+    """Find near-duplicate test cases and offer to collapse or merge each group into its first test case"""
+    with st.expander("🧬 Near-Duplicate Test Cases"):
+        notice = st.session_state.pop('dedup_notice', None)
+        if notice:
+            st.success(notice)
+        
+        threshold = st.slider(
+            "Similarity threshold",
+            min_value=0.5,
+            max_value=0.95,
+            value=DEFAULT_THRESHOLD,
+            step=0.05,
+            help="How much of the test condition and description two test cases must share to count as duplicates"
+        )
+        key = hashlib.sha256(json.dumps([test_cases, threshold], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        
+        if st.button("🔍 Find Near-Duplicates"):
+            with st.spinner("Comparing test cases..."):
+                st.session_state['duplicate_groups'] = {'key': key, 'groups': find_near_duplicates(test_cases, threshold)}
+        
+        found = st.session_state.get('duplicate_groups')
+        if not found or found['key'] != key:
+            return
+        groups = found['groups']
+        if not groups:
+            st.success("✅ No near-duplicate test cases found")
+            return
+        
+        st.warning(
+            f"⚠️ Found {len(groups)} group(s) of near-duplicates; "
+            f"{sum(len(members) - 1 for members in groups)} test case(s) could be removed"
+        )
+        st.dataframe(
+            pd.DataFrame([{
+                'Group': number,
+                'Keep': position == members[0],
+                'Test Case ID': test_cases[position].get('test_case_id', 'N/A'),
+                'Test Condition': test_cases[position].get('test_condition', ''),
+                'Test Case Description': test_cases[position].get('test_case_description', ''),
+            } for number, members in enumerate(groups, 1) for position in members]),
+            use_container_width=True,
+            hide_index=True
+        )
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            collapse_button = st.button(
+                "🗜️ Collapse Duplicates", use_container_width=True,
+                help="Keep the first test case of each group and drop the others"
             )
-            
-            response_text = response.choices[0].message.content
-            
-            # Try to parse JSON
-            try:
-                result = json.loads(response_text)
-                return result
-            except json.JSONDecodeError as je:
-                st.error(f"JSON parsing error. Raw response: {response_text[:500]}")
-                
-                # Try to extract JSON from markdown code blocks
-                if "```json" in response_text:
-                    start = response_text.find("```json") + 7
-                    end = response_text.find("```", start)
-                    if end > start:
-                        json_text = response_text[start:end].strip()
-                        try:
-                            result = json.loads(json_text)
-                            return result
-                        except:
-                            pass
-                
-                # Try to find JSON object
-                start = response_text.find('{')
-                end = response_text.rfind('}') + 1
-                if start >= 0 and end > start:
-                    try:
-                        json_text = response_text[start:end]
-                        result = json.loads(json_text)
-                        return result
-                    except:
-                        pass
-                
-                st.error(f"Could not extract valid JSON from response")
-                return None
-            
-    except Exception as e:
-        st.error(f"Error analyzing screenshot: {str(e)}")
-        return None
-
-def map_ui_elements_to_test_cases(ui_elements, test_cases, screen_name, api_key):
-    """Map UI elements to test cases using AI"""
-    
-    try:
-        client = OpenAI(api_key=api_key)
-    except Exception as e:
-        st.error(f"Error initializing OpenAI client for UI mapping: {str(e)}")
-        return test_cases
-    
-    # Create UI elements summary
-    elements_summary = "\n".join([
-        f"- {elem.get('type', 'N/A')}: {elem.get('label', 'N/A')} (Required: {elem.get('required', False)})"
-        for elem in ui_elements
-    ])
-    
-    # Create test case summary
-    test_case_summary = "\n".join([
-        f"- {tc.get('test_case_id', 'N/A')}: {tc.get('test_condition', 'N/A')} | Description: {tc.get('test_case_description', 'N/A')[:150]}"
-        for tc in test_cases[:100]
-    ])
-    
-    prompt = f"""You are a QA analyst mapping UI elements to test cases.
-
-**SCREEN:** {screen_name}
-
-**UI ELEMENTS FOUND:**
-{elements_summary}
-
-**AVAILABLE TEST CASES:**
-{test_case_summary}
-
-**TASK:**
-For each UI element, find which test cases cover it. Match based on:
-- Element label mentions in test case description
-- Element type and actions (enter, click, select, verify)
-- Semantic similarity (e.g., "user email" matches "email field")
-
-Return ONLY a JSON object:
-{{
-  "mappings": [
-    {{
-      "element_type": "input_field",
-      "element_label": "Email Address",
-      "covered_by": ["TC_001", "TC_002"],
-      "coverage_level": "Full" or "Partial" or "None",
-      "confidence": 0.95,
-      "missing_scenarios": ["List any missing test scenarios for this element"]
-    }}
-  ],
-  "overall_coverage": 85.5,
-  "summary": "Brief summary of UI coverage"
-}}
-
-Analyze now:"""
-
-    try:
-        with st.spinner(f'🔗 Mapping UI elements to test cases...'):
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert QA analyst specialized in UI test coverage analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=3000,
-                temperature=0.2,
-                response_format={"type": "json_object"}
+        with col2:
+            merge_button = st.button(
+                "🔗 Merge Duplicates", use_container_width=True,
+                help="Keep the first test case of each group, adding the others' requirement links and any fields it lacks"
             )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-    except Exception as e:
-        st.error(f"Error mapping elements: {str(e)}")
-        return None
+        
+        if collapse_button or merge_button:
+            combine = collapse_duplicates if collapse_button else merge_duplicates
+            st.session_state['test_cases'] = combine(test_cases, groups)
+            st.session_state.pop('duplicate_groups', None)
+            st.session_state['dedup_notice'] = (
+                f"✅ {'Collapsed' if collapse_button else 'Merged'} {len(groups)} duplicate group(s): "
+                f"{len(test_cases)} → {len(st.session_state['test_cases'])} test cases"
+            )
+            st.rerun()
 
-def analyze_requirements_coverage(brd_text, test_cases, api_key):
+def analyze_requirements_coverage(brd_text, test_cases, api_key, section_index=None, requirements=None, base_url=None):
     """Analyze coverage of BRD requirements by generated test cases using AI"""
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(api_key, base_url)
     except Exception as e:
         st.error(f"Error initializing OpenAI client for coverage analysis: {str(e)}")
         return "Error initializing OpenAI client"
     
-    # Create test case summary
-    test_case_summary = "\n".join([
-        f"- {tc.get('test_case_id', 'N/A')}: {tc.get('test_condition', 'N/A')} (Module: {tc.get('tc_module', 'N/A')})"
-        for tc in test_cases[:100]  # Limit to first 100 for token management
-    ])
-    
-    prompt = f"""You are a QA analyst performing requirements coverage analysis.
-
-**BRD DOCUMENT:**
-{brd_text[:15000]}  
-
-**GENERATED TEST CASES (Summary):**
-{test_case_summary}
-
-**TASK:**
-Analyze the BRD and identify:
-1. All functional requirements, features, and business rules mentioned in the BRD
-2. Which requirements are covered by the generated test cases
-3. Which requirements are NOT covered (gaps)
-
-**OUTPUT FORMAT:**
-Return ONLY a JSON object with this structure:
-{{
-  "total_requirements": <number>,
-  "covered_requirements": [
-    {{
-      "requirement": "Requirement description",
-      "requirement_id": "REQ-001",
-      "covered_by": ["TC_001", "TC_002"],
-      "coverage_level": "Full" or "Partial"
-    }}
-  ],
-  "missing_requirements": [
-    {{
-      "requirement": "Requirement description",
-      "requirement_id": "REQ-XXX",
-      "reason": "Why it's not covered",
-      "priority": "High" or "Medium" or "Low"
-    }}
-  ],
-  "coverage_percentage": <number>,
-  "summary": "Brief analysis summary"
-}}
-
-Analyze now:"""
-    
     try:
         with st.spinner('🔍 Analyzing requirements coverage...'):
-            response = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {"role": "system", "content": "You are an expert QA analyst specialized in requirements traceability and coverage analysis."},
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=8192,
-                temperature=0.2,
-                response_format={"type": "json_object"}
+            response = cached_completion(
+                client, coverage_request(brd_text, test_cases, section_index, requirements), *response_cache_settings()
             )
             
             result = json.loads(response.choices[0].message.content)
@@ -817,158 +429,6 @@ Analyze now:"""
         st.error(f"Error analyzing coverage: {str(e)}")
         return None
 
-def convert_to_dataframe(test_cases):
-    """Convert test cases JSON to DataFrame"""
-    if not test_cases:
-        return None
-    
-    # Column mapping
-    columns = {
-        'product_name': 'Product Name',
-        'process_category': 'Process Category',
-        'business_process_id': 'Business Process ID',
-        'business_process': 'Business Process',
-        'scenario_id': 'Scenario ID',
-        'scenario_description': 'Scenario Description',
-        'category': 'Category',
-        'importance': 'Importance',
-        'test_case_id': 'Test Case ID',
-        'tc_module': 'TC Module',
-        'test_condition': 'Test Condition',
-        'prerequisite': 'Pre-requisite',
-        'test_case_description': 'Test Case Description',
-        'expected_result': 'Expected Result'
-    }
-    
-    df = pd.DataFrame(test_cases)
-    df = df.rename(columns=columns)
-    
-    # Add Test Type column for categorization
-    df['Test Type'] = df['TC Module'].apply(categorize_test_case_type)
-    
-    # Reorder columns (add Test Type after TC Module)
-    column_order = list(columns.values())
-    # Insert Test Type after TC Module
-    tc_module_idx = column_order.index('TC Module')
-    column_order.insert(tc_module_idx + 1, 'Test Type')
-    
-    df = df[[col for col in column_order if col in df.columns]]
-    
-    return df
-
-def create_excel_output(df):
-    """Create formatted Excel output with separate sheets for different test types"""
-    output = io.BytesIO()
-    
-    with pd.ExcelWriter(output, engine='openpyxl') as writer:
-        # Helper function to format sheet
-        def format_sheet(worksheet, column_count=15):
-            header_fill = openpyxl.styles.PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-            header_font = openpyxl.styles.Font(color='FFFFFF', bold=True)
-            
-            for cell in worksheet[1]:
-                cell.fill = header_fill
-                cell.font = header_font
-                cell.alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center', wrap_text=True)
-            
-            # Adjust column widths
-            column_widths = {
-                'A': 20, 'B': 30, 'C': 15, 'D': 40, 'E': 12, 'F': 40,
-                'G': 18, 'H': 12, 'I': 15, 'J': 20, 'K': 15, 'L': 40, 
-                'M': 30, 'N': 50, 'O': 50
-            }
-            
-            for col, width in column_widths.items():
-                if col in worksheet.column_dimensions:
-                    worksheet.column_dimensions[col].width = width
-        
-        # Write all test cases
-        df.to_excel(writer, sheet_name='All Test Cases', index=False)
-        format_sheet(writer.sheets['All Test Cases'])
-        
-        # Separate by Test Type
-        if 'Test Type' in df.columns:
-            # Field-Level Test Cases
-            field_df = df[df['Test Type'] == 'Field-Level']
-            if not field_df.empty:
-                field_df.to_excel(writer, sheet_name='Field-Level Tests', index=False)
-                format_sheet(writer.sheets['Field-Level Tests'])
-            
-            # Functional/Workflow Test Cases
-            functional_df = df[df['Test Type'] == 'Functional']
-            if not functional_df.empty:
-                functional_df.to_excel(writer, sheet_name='Functional Tests', index=False)
-                format_sheet(writer.sheets['Functional Tests'])
-            
-            # Negative Test Cases
-            negative_df = df[df['Test Type'] == 'Negative']
-            if not negative_df.empty:
-                negative_df.to_excel(writer, sheet_name='Negative Tests', index=False)
-                format_sheet(writer.sheets['Negative Tests'])
-            
-            # Other Test Cases (Reports, Modifications, etc.)
-            other_df = df[~df['Test Type'].isin(['Field-Level', 'Functional', 'Negative'])]
-            if not other_df.empty:
-                other_df.to_excel(writer, sheet_name='Other Tests', index=False)
-                format_sheet(writer.sheets['Other Tests'])
-        
-        # Add enhanced summary sheet
-        test_type_counts = df['Test Type'].value_counts().to_dict() if 'Test Type' in df.columns else {}
-        
-        summary_data = {
-            'Metric': [
-                'Total Test Cases',
-                'Field-Level Tests',
-                'Functional/Workflow Tests',
-                'Negative Tests',
-                'Other Tests',
-                '',
-                'Functional Positive',
-                'Functional Negative',
-                '',
-                'Critical Priority',
-                'High Priority',
-                'Medium Priority',
-                'Low Priority',
-                '',
-                'Unique Modules',
-                'Unique Scenarios'
-            ],
-            'Value': [
-                len(df),
-                test_type_counts.get('Field-Level', 0),
-                test_type_counts.get('Functional', 0),
-                test_type_counts.get('Negative', 0),
-                sum([v for k, v in test_type_counts.items() if k not in ['Field-Level', 'Functional', 'Negative']]),
-                '',
-                len(df[df['Category'].str.contains('Positive', case=False, na=False)]),
-                len(df[df['Category'].str.contains('negative', case=False, na=False)]),
-                '',
-                len(df[df['Importance'] == 'Critical']),
-                len(df[df['Importance'] == 'High']),
-                len(df[df['Importance'] == 'Medium']),
-                len(df[df['Importance'] == 'Low']),
-                '',
-                df['TC Module'].nunique(),
-                df['Scenario Description'].nunique()
-            ]
-        }
-        
-        summary_df = pd.DataFrame(summary_data)
-        summary_df.to_excel(writer, sheet_name='Summary', index=False)
-        
-        # Format summary sheet
-        summary_sheet = writer.sheets['Summary']
-        for cell in summary_sheet[1]:
-            cell.fill = openpyxl.styles.PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-            cell.font = openpyxl.styles.Font(color='FFFFFF', bold=True)
-        
-        summary_sheet.column_dimensions['A'].width = 30
-        summary_sheet.column_dimensions['B'].width = 20
-    
-    output.seek(0)
-    return output
-
 # Main app
 def main():
     # Header
@@ -987,6 +447,15 @@ def main():
             help="Enter your OpenAI API key (from platform.openai.com)"
         )
         
+        # Kept per session (widget state) and passed to every call; never shared across sessions
+        base_url = st.text_input(
+            "API base URL (optional)",
+            value=DEFAULT_BASE_URL or "",
+            key="base_url_input",
+            help="Leave empty for api.openai.com, or point at an OpenAI-compatible server such as "
+                 "mock_openai_server.py (http://127.0.0.1:8765/v1) for offline and load testing"
+        ).strip() or None
+        
         st.divider()
         
         st.subheader("Generation Options")
@@ -1025,7 +494,7 @@ def main():
         
         # Determine final domain
         if selected_domain == "Auto-detect from BRD":
-            domain_context = "Analyze the BRD and identify the application domain automatically"
+            domain_context = AUTO_DOMAIN_CONTEXT
         elif selected_domain == "Other (specify below)" and custom_domain:
             domain_context = custom_domain
         else:
@@ -1063,6 +532,103 @@ def main():
         
         st.divider()
         
+        st.subheader("Document Processing")
+        
+        parallel_extraction = st.checkbox(
+            "Parallel document extraction",
+            value=True,
+            help="Parse multiple uploaded files at the same time in separate worker processes"
+        )
+        
+        use_extraction_cache = st.checkbox(
+            "Reuse cached extractions",
+            value=True,
+            help="Skip parsing for files whose exact content was extracted before"
+        )
+        
+        normalize_text = st.checkbox(
+            "Normalize extracted text",
+            value=True,
+            help="Strip page headers/footers, page numbers, tables of contents and extra whitespace to save tokens"
+        )
+        
+        st.divider()
+        
+        st.subheader("AI Requests")
+        
+        max_concurrency = st.slider(
+            "Max concurrent AI requests",
+            min_value=1,
+            max_value=16,
+            value=DEFAULT_MAX_CONCURRENCY,
+            help="Independent AI calls (screenshots, document chunks) run in parallel up to this limit"
+        )
+        
+        # Quotas are shared by every session, so their caps are a server setting, not a sidebar one
+        rpm_cap, tpm_cap = rate_limit_caps()
+        st.caption(
+            f"🚦 Rate limit caps: {rpm_cap or 'API limit'} requests/min · {tpm_cap or 'API limit'} tokens/min "
+            "(set TCG_RATE_LIMIT_RPM / TCG_RATE_LIMIT_TPM on the server)"
+        )
+        
+        stream_generation = st.checkbox(
+            "Stream test cases as they are generated",
+            value=True,
+            help="Show each test case in a live table as soon as the model finishes writing it"
+        )
+        
+        batched_generation = st.checkbox(
+            "Batch generation by requirement group",
+            value=False,
+            help="Generate test cases for groups of requirements in parallel calls, for suites larger than one response can hold"
+        )
+        
+        incremental_generation = st.checkbox(
+            "Incremental regeneration for revised BRDs",
+            value=False,
+            help=(
+                "When a revised version of the last generated BRD is uploaded, regenerate test cases only for the "
+                "sections that changed and keep the rest. Uses section chunks and batches so suites stay traceable"
+            )
+        )
+        
+        batch_size = st.number_input(
+            "Requirements per batch",
+            min_value=3,
+            max_value=40,
+            value=DEFAULT_BATCH_SIZE,
+            disabled=not (batched_generation or incremental_generation),
+            help="Smaller batches finish faster and rarely hit the token limit"
+        )
+        
+        max_continuations = st.number_input(
+            "Auto-continue rounds",
+            min_value=0,
+            max_value=10,
+            value=DEFAULT_CONTINUATION_ROUNDS,
+            help="When the output hits the token limit, ask the model to continue after the last complete test case up to this many times"
+        )
+        
+        chunk_large_brds = st.checkbox(
+            "Split large BRDs into section chunks",
+            value=True,
+            help="Extract requirements from BRDs larger than one prompt section by section in parallel, then merge and de-duplicate them"
+        )
+        
+        bypass_llm_cache = st.checkbox(
+            "Bypass AI response cache",
+            value=False,
+            key="bypass_llm_cache",
+            help="Always call the API for identical requests; fresh responses still replace cached ones"
+        )
+        
+        # Filled in at the end of the run so the counters include this run's calls
+        response_cache_stats = st.empty()
+        prompt_cache_status = st.empty()
+        rate_limit_status = st.empty()
+        
+        st.divider()
+        
         st.subheader("📚 Framework Info")
         st.info("""
         This app generates comprehensive test cases for ANY domain:
@@ -1082,6 +648,28 @@ def main():
     # Main content area
     tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["📤 Upload & Generate", "📊 View Results", "🎯 Coverage Analysis", "📸 UI Coverage", "💾 Download", "📖 Help"])
     
+    # Prepare options (target_count will be determined automatically based on BRD content)
+    generation_options = {
+        'target_count': 'auto',  # Will be calculated based on BRD requirements
+        'negative_ratio': negative_ratio,
+        'variations': variations,
+        'focus_modules': focus_modules,
+        'domain_context': domain_context,
+        'chunked_requirements': None if chunk_large_brds else False,
+        'max_concurrency': max_concurrency,
+        'stream': stream_generation,
+        'batched': batched_generation,
+        'batch_size': int(batch_size),
+        'max_continuations': int(max_continuations),
+        'base_url': base_url
+    }
+    if incremental_generation:
+        generation_options = incremental_options(generation_options)
+    
+    # Apply a finished background generation before any tab reads the results
+    generation_job = current_generation_job()
+    generation_running = bool(generation_job) and generation_job['status'] in ACTIVE_STATUSES
+    
     with tab1:
         st.header("Upload BRD Documents")
         
@@ -1103,15 +691,20 @@ def main():
             col1, col2 = st.columns([1, 4])
             
             with col1:
-                generate_button = st.button("🚀 Generate Test Cases", type="primary", use_container_width=True)
+                generate_button = st.button(
+                    "🚀 Generate Test Cases", type="primary", use_container_width=True,
+                    disabled=generation_running,
+                    help="Generation is running in the background" if generation_running else None
+                )
             
             with col2:
                 preview_button = st.button("👁️ Preview Extracted Text", use_container_width=True)
             
             if preview_button:
                 with st.spinner("Extracting text from documents..."):
-                    brd_text = process_uploaded_files(uploaded_files)
+                    brd_text = process_uploaded_files(uploaded_files, parallel=parallel_extraction, use_cache=use_extraction_cache, normalize=normalize_text)
                     st.session_state['brd_text'] = brd_text
+                    st.session_state['brd_sections'] = build_section_index(brd_text)
                     
                 with st.expander("📄 Extracted BRD Text (Preview)", expanded=True):
                     st.text_area(
@@ -1119,6 +712,12 @@ def main():
                         brd_text[:5000] + "\n\n... (showing first 5000 characters)",
                         height=300
                     )
+                
+                with st.expander("🧭 Section Outline"):
+                    st.text(section_outline(st.session_state['brd_sections'], max_level=3) or "No headings detected")
+            
+            if st.session_state.get('brd_text') and not generate_button:
+                show_preflight_plan(st.session_state['brd_text'], generation_options)
             
             if generate_button:
                 if not api_key:
@@ -1126,8 +725,9 @@ def main():
                 else:
                     # Process documents
                     with st.spinner("📖 Extracting text from documents..."):
-                        brd_text = process_uploaded_files(uploaded_files)
+                        brd_text = process_uploaded_files(uploaded_files, parallel=parallel_extraction, use_cache=use_extraction_cache, normalize=normalize_text)
                         st.session_state['brd_text'] = brd_text
+                        st.session_state['brd_sections'] = build_section_index(brd_text)
                     
                     st.success("✅ Text extraction completed")
                     
@@ -1136,73 +736,16 @@ def main():
                     if not prompt_template:
                         st.stop()
                     
-                    # Prepare options (target_count will be determined automatically based on BRD content)
-                    options = {
-                        'target_count': 'auto',  # Will be calculated based on BRD requirements
-                        'negative_ratio': negative_ratio,
-                        'variations': variations,
-                        'focus_modules': focus_modules,
-                        'domain_context': domain_context
-                    }
-                    
-                    # Generate test cases
-                    test_cases, raw_response = generate_test_cases_with_ai(
-                        brd_text, prompt_template, api_key, options
-                    )
+                    options = dict(generation_options, section_index=st.session_state['brd_sections'])
                     
-                    if test_cases:
-                        st.session_state['test_cases'] = test_cases
-                        st.session_state['raw_response'] = raw_response
-                        st.session_state['generation_time'] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                        
-                        # Store requirements count for display
-                        if 'requirements_count' not in st.session_state:
-                            # Re-analyze to get requirements count for display
-                            requirements, req_count = analyze_requirements_from_brd(brd_text, api_key)
-                            st.session_state['requirements_count'] = req_count
-                        
-                        # Display success message with requirements coverage info
-                        req_count = st.session_state.get('requirements_count', 0)
-                        test_case_count = len(test_cases)
-                        
-                        if req_count > 0:
-                            coverage_ratio = (test_case_count / req_count) * 100
-                            if coverage_ratio >= 95:  # Allow for slight variation
-                                st.markdown('<div class="success-box">✅ Test cases generated successfully! Perfect 1:1 requirement coverage achieved!</div>', 
-                                          unsafe_allow_html=True)
-                                st.success(f"🎯 Generated {test_case_count} test cases for {req_count} requirements (1:1 mapping)")
-                            else:
-                                st.markdown('<div class="success-box">✅ Test cases generated successfully! Check the "View Results" tab.</div>', 
-                                          unsafe_allow_html=True)
-                                st.info(f"📊 Generated {test_case_count} test cases for {req_count} identified requirements")
-                        else:
-                            st.markdown('<div class="success-box">✅ Test cases generated successfully! Check the "View Results" tab.</div>', 
-                                      unsafe_allow_html=True)
-                        
-                        # Quick stats
-                        df = convert_to_dataframe(test_cases)
-                        col1, col2, col3, col4, col5, col6 = st.columns(6)
-                        with col1:
-                            st.metric("Total Test Cases", len(df))
-                        with col2:
-                            st.metric("Requirements Found", req_count if req_count > 0 else "N/A")
-                        with col3:
-                            field_level = len(df[df['Test Type'] == 'Field-Level']) if 'Test Type' in df.columns else 0
-                            st.metric("Field-Level", field_level)
-                        with col4:
-                            functional = len(df[df['Test Type'] == 'Functional']) if 'Test Type' in df.columns else 0
-                            st.metric("Functional", functional)
-                        with col5:
-                            negative = len(df[df['Test Type'] == 'Negative']) if 'Test Type' in df.columns else 0
-                            st.metric("Negative", negative)
-                        with col6:
-                            modules = df['TC Module'].nunique()
-                            st.metric("Modules", modules)
-                    else:
-                        st.warning("⚠️ Could not extract structured test cases. Showing raw response:")
-                        st.text_area("Raw AI Response", raw_response, height=400)
+                    # Generate test cases in the background; the page polls the job until it finishes
+                    start_generation_job(brd_text, prompt_template, api_key, options, incremental=incremental_generation)
+                    generation_job = current_generation_job()
         else:
             st.info("👆 Upload BRD documents to get started")
+        
+        if generation_job:
+            show_generation_job(generation_job)
     
     with tab2:
         st.header("Generated Test Cases")
@@ -1242,6 +785,17 @@ def main():
                 modules = df['TC Module'].nunique()
                 st.metric("Modules", modules)
             
+            requirements = current_requirements(st.session_state.get('brd_text', ''))
+            if requirements:
+                with st.expander(f"📋 Analyzed Requirements ({len(requirements)})"):
+                    st.dataframe(
+                        pd.DataFrame(requirements),
+                        use_container_width=True,
+                        hide_index=True
+                    )
+            
+            show_near_duplicates(st.session_state['test_cases'])
+            
             st.divider()
             
             # Filters
@@ -1361,7 +915,10 @@ def main():
                     coverage_result = analyze_requirements_coverage(
                         st.session_state['brd_text'],
                         st.session_state['test_cases'],
-                        api_key
+                        api_key,
+                        section_index=st.session_state.get('brd_sections'),
+                        requirements=current_requirements(st.session_state['brd_text']),
+                        base_url=base_url
                     )
                     
                     if coverage_result:
@@ -1628,24 +1185,28 @@ COVERED REQUIREMENTS ({covered_count})
                 st.session_state['ui_analyses'] = {}
             
             if uploaded_screenshots:
+                # Keep screenshots on disk instead of holding UploadedFile buffers in session state
+                screenshot_records = spool_session_uploads(uploaded_screenshots, 'screenshots')
+                
                 st.divider()
                 
                 # Screen naming
                 st.subheader("🏷️ Label Your Screenshots")
                 
                 screen_names = {}
-                for idx, screenshot in enumerate(uploaded_screenshots):
+                for idx, screenshot in enumerate(screenshot_records):
                     col1, col2 = st.columns([3, 1])
                     with col1:
                         screen_name = st.text_input(
-                            f"Screen Name for {screenshot.name}",
-                            value=screenshot.name.replace('.png', '').replace('.jpg', '').replace('.jpeg', '').replace('_', ' ').title(),
+                            f"Screen Name for {screenshot['name']}",
+                            value=screenshot['name'].replace('.png', '').replace('.jpg', '').replace('.jpeg', '').replace('_', ' ').title(),
                             key=f"screen_name_{idx}"
                         )
-                        screen_names[screenshot.name] = screen_name
+                        screen_names[screenshot['name']] = screen_name
                     with col2:
                         # Show thumbnail
-                        image = Image.open(screenshot)
+                        image = Image.open(screenshot['path'])
+                        image.thumbnail((200, 200))
                         st.image(image, width=100)
                 
                 st.divider()
@@ -1664,35 +1225,42 @@ COVERED REQUIREMENTS ({covered_count})
                     if not api_key:
                         st.error("⚠️ Please enter your OpenAI API key in the sidebar")
                     else:
-                        # Analyze each screenshot
-                        for screenshot in uploaded_screenshots:
-                            screen_name = screen_names.get(screenshot.name, screenshot.name)
-                            
-                            # Reset file pointer
-                            screenshot.seek(0)
-                            
-                            # Step 1: Extract UI elements
-                            ui_analysis = analyze_ui_screenshot(screenshot, screen_name, api_key)
-                            
-                            if ui_analysis and 'elements' in ui_analysis:
-                                elements = ui_analysis['elements']
-                                
-                                # Step 2: Map to test cases
-                                mapping = map_ui_elements_to_test_cases(
-                                    elements,
-                                    st.session_state['test_cases'],
-                                    screen_name,
-                                    api_key
-                                )
-                                
-                                if mapping:
-                                    # Store results
-                                    st.session_state['ui_analyses'][screen_name] = {
-                                        'screenshot': screenshot,
-                                        'elements': elements,
-                                        'mapping': mapping,
-                                        'screen_type': ui_analysis.get('screen_type', 'Unknown')
-                                    }
+                        # Every screenshot is analyzed and mapped concurrently
+                        tasks = [
+                            screen_analysis_task(
+                                screenshot['path'],
+                                screen_names.get(screenshot['name'], screenshot['name']),
+                                st.session_state['test_cases']
+                            )
+                            for screenshot in screenshot_records
+                        ]
+                        progress = st.progress(0.0, text=f"🔍 Analyzing {len(tasks)} screen(s)...")
+                        finished = []
+                        
+                        def on_screen_done(position, result):
+                            finished.append(position)
+                            progress.progress(len(finished) / len(tasks), text=f"🔍 Analyzed {len(finished)} of {len(tasks)} screen(s)")
+                        
+                        cache, refresh_cache = response_cache_settings()
+                        results = run_tasks(
+                            tasks, api_key, max_concurrency=max_concurrency, on_done=on_screen_done,
+                            cache=cache, refresh_cache=refresh_cache, base_url=base_url
+                        )
+                        progress.empty()
+                        
+                        for screenshot, result in zip(screenshot_records, results):
+                            if isinstance(result, Exception):
+                                st.error(f"Error analyzing {screenshot['name']}: {str(result)}")
+                            elif result.get('error'):
+                                st.error(f"{result['screen_name']}: {result['error']}")
+                            elif result.get('mapping'):
+                                # Store results
+                                st.session_state['ui_analyses'][result['screen_name']] = {
+                                    'screenshot_path': screenshot['path'],
+                                    'elements': result['elements'],
+                                    'mapping': result['mapping'],
+                                    'screen_type': result['screen_type']
+                                }
                         
                         if st.session_state['ui_analyses']:
                             st.success("✅ UI analysis completed! Scroll down to see results.")
@@ -1752,10 +1320,12 @@ COVERED REQUIREMENTS ({covered_count})
                             
                             with col1:
                                 # Show screenshot
-                                screenshot = analysis['screenshot']
-                                screenshot.seek(0)
-                                image = Image.open(screenshot)
-                                st.image(image, caption=screen_name, use_column_width=True)
+                                screenshot_path = analysis.get('screenshot_path')
+                                if screenshot_path and os.path.exists(screenshot_path):
+                                    image = Image.open(screenshot_path)
+                                    st.image(image, caption=screen_name, use_column_width=True)
+                                else:
+                                    st.caption(f"🖼️ {screen_name} (screenshot no longer uploaded)")
                             
                             with col2:
                                 mapping = analysis.get('mapping', {})
@@ -2063,6 +1633,15 @@ Not Covered: {total_uncovered}
         - Review the Test_Case_Generation_Prompt.md
         - Refer to the CASA example (TC_CASA_For AI.xlsx)
         """)
+    
+    show_response_cache_stats(response_cache_stats)
+    show_prompt_cache_stats(prompt_cache_status)
+    show_rate_limit_stats(rate_limit_status)
+    
+    # Poll a running generation job; the job keeps running whatever the script does meanwhile
+    if generation_running:
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
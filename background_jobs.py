@@ -0,0 +1,191 @@
+"""
+Background Jobs
+Thread-pool runner for long pipeline stages; job state is persisted to SQLite and polled by the UI
+"""
+
+import hashlib
+import json
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from sqlite_cache import SQLiteCache
+
+JOB_STORE_FILE = 'background_jobs.sqlite'
+JOB_STORE_MAX_BYTES = 256 * 1024 * 1024
+JOB_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Jobs running at once; each one already runs its own AI calls concurrently
+DEFAULT_JOB_WORKERS = 2
+
+# Progress of a running job is written through to the store at most this often
+PERSIST_INTERVAL_SECONDS = 1.0
+
+# Only the most recent messages of a job are kept
+MAX_JOB_EVENTS = 200
+
+# Finished jobs kept in memory; older ones are still readable from the store
+MAX_FINISHED_JOBS = 50
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+_job_runner = None
+_job_runner_lock = threading.Lock()
+
+
+def job_key(*parts):
+    """Stable key for a job's inputs, so resubmitting identical work attaches to the running job"""
+    canonical = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+
+class Job:
+    """Handle passed to a job function for reporting progress from the worker thread"""
+
+    def __init__(self, runner, state):
+        self._runner = runner
+        self._state = state
+
+    @property
+    def id(self):
+        return self._state['id']
+
+    def report(self, level, message):
+        """Record a message; the signature matches brd_pipeline reporters"""
+        self._runner._update(self._state, event=(level, message))
+
+    def progress(self, fraction=None, message=None, partial=None):
+        """Update the completed fraction (0-1), status message and partial results shown while running"""
+        self._runner._update(self._state, fraction=fraction, message=message, partial=partial)
+
+
+class JobRunner:
+    """Runs job functions on a thread pool and keeps their state.
+
+    A job's state is a plain dict with 'id', 'kind', 'status' (queued,
+    running, done, failed or interrupted), 'progress', 'message', 'events',
+    'partial', 'result' and 'error'. Running jobs are read from memory;
+    every state is also persisted, so finished results survive a page
+    reload, and a job that was still running when its server process
+    stopped reads back as interrupted.
+    """
+
+    def __init__(self, store=None, max_workers=DEFAULT_JOB_WORKERS):
+        self.store = store or SQLiteCache(JOB_STORE_FILE, max_bytes=JOB_STORE_MAX_BYTES, ttl_seconds=JOB_TTL_SECONDS)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='job')
+        self.lock = threading.Lock()
+        self.jobs = {}
+        self.active_keys = {}
+
+    def submit(self, kind, fn, *args, key=None, **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the job id.
+
+        If a job with the same key is still queued or running, its id is
+        returned instead and nothing new is started.
+        """
+        with self.lock:
+            existing = self.jobs.get(self.active_keys.get(key)) if key else None
+            if existing is not None and existing['status'] in ACTIVE_STATUSES:
+                return existing['id']
+
+            now = time.time()
+            state = {
+                'id': uuid.uuid4().hex,
+                'kind': kind,
+                'key': key,
+                'status': 'queued',
+                'progress': 0.0,
+                'message': 'Waiting to start',
+                'events': [],
+                'partial': None,
+                'result': None,
+                'error': None,
+                'created_at': now,
+                'updated_at': now,
+                'finished_at': None,
+            }
+            self.jobs[state['id']] = state
+            if key:
+                self.active_keys[key] = state['id']
+            self._prune()
+        self._persist(state, force=True)
+        self.executor.submit(self._run, state, fn, args, kwargs)
+        return state['id']
+
+    def _run(self, state, fn, args, kwargs):
+        self._update(state, status='running', message='Running')
+        try:
+            result = fn(Job(self, state), *args, **kwargs)
+        except Exception as e:
+            self._update(state, status='failed', error=str(e), event=('error', f"Job failed: {str(e)}"),
+                         traceback=traceback.format_exc())
+        else:
+            self._update(state, status='done', fraction=1.0, message='Finished', result=result)
+
+    def _update(self, state, status=None, fraction=None, message=None, partial=None, event=None, **fields):
+        with self.lock:
+            if status is not None:
+                state['status'] = status
+                if status not in ACTIVE_STATUSES:
+                    state['finished_at'] = time.time()
+            if fraction is not None:
+                state['progress'] = max(0.0, min(1.0, float(fraction)))
+            if message is not None:
+                state['message'] = message
+            if partial is not None:
+                state['partial'] = partial
+            if event is not None:
+                state['events'] = (state['events'] + [list(event)])[-MAX_JOB_EVENTS:]
+            state.update(fields)
+            state['updated_at'] = time.time()
+        self._persist(state, force=status is not None or event is not None)
+
+    def _persist(self, state, force=False):
+        with self.lock:
+            if not force and time.time() - state.get('_persisted_at', 0) < PERSIST_INTERVAL_SECONDS:
+                return
+            state['_persisted_at'] = time.time()
+            payload = json.dumps({name: value for name, value in state.items() if not name.startswith('_')},
+                                 default=str)
+        self.store.set_text(f"job:{state['id']}", payload)
+
+    def _prune(self):
+        """Drop the oldest finished jobs from memory (caller holds the lock)"""
+        finished = sorted((s for s in self.jobs.values() if s['status'] not in ACTIVE_STATUSES),
+                          key=lambda s: s['finished_at'] or 0)
+        for state in finished[:max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[state['id']]
+            if self.active_keys.get(state['key']) == state['id']:
+                del self.active_keys[state['key']]
+
+    def get(self, job_id):
+        """Snapshot of a job's state, or None if it is unknown"""
+        with self.lock:
+            state = self.jobs.get(job_id)
+            if state is not None:
+                return {name: (list(value) if name == 'events' else value)
+                        for name, value in state.items() if not name.startswith('_')}
+
+        stored = self.store.get_text(f"job:{job_id}")
+        if stored is None:
+            return None
+        state = json.loads(stored)
+        if state['status'] in ACTIVE_STATUSES:
+            # Persisted by a server process that has since stopped
+            state['status'] = 'interrupted'
+            state['error'] = 'The server restarted before the job finished'
+        return state
+
+    def shutdown(self, wait=True):
+        self.executor.shutdown(wait=wait)
+
+
+def get_job_runner():
+    """Return the process-wide job runner, creating it on first use"""
+    global _job_runner
+    with _job_runner_lock:
+        if _job_runner is None:
+            _job_runner = JobRunner()
+        return _job_runner
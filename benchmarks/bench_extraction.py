@@ -0,0 +1,363 @@
+"""
+Extraction Benchmarks
+Generates synthetic BRD documents and measures wall time, peak memory and output size per extractor.
+Each case runs in a fresh process so peak RSS is not shared between cases. Peak RSS is the
+measuring process only; parallel runs report their extraction workers' peak separately. Where
+the resource module is missing (Windows), memory is Python allocations traced by tracemalloc.
+
+Usage:
+    python benchmarks/bench_extraction.py
+    python benchmarks/bench_extraction.py --quick --output results.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Benchmarks live one level below the app modules
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT_DIR)
+
+import openpyxl
+from docx import Document
+
+import document_extraction
+
+PAGE_SIZES = [10, 100, 1000]
+ROW_SIZES = [1000, 10000, 100000]
+QUICK_PAGE_SIZES = [10, 100]
+QUICK_ROW_SIZES = [1000, 10000]
+
+# Roughly one printed page of BRD prose
+PARAGRAPHS_PER_PAGE = 8
+
+WORDS = (
+    "account customer cheque overdraft product dormant branch teller approve reject limit "
+    "maker checker authorise validate mandatory field amount currency interest tenure "
+    "deposit withdrawal statement closure freeze nominee signatory mandate system shall"
+).split()
+
+EXTRACTORS = {
+    'docx': {
+        'python-docx': document_extraction.extract_text_from_docx,
+        'streaming': document_extraction.extract_text_from_docx_streaming,
+    },
+    'pdf': {
+        'streaming': document_extraction.extract_text_from_pdf,
+    },
+    'xlsx': {
+        'pandas': document_extraction.extract_text_from_excel,
+        'streaming': document_extraction.extract_text_from_excel_streaming,
+    },
+    'txt': {
+        'decode': lambda path: _read_text(path),
+    },
+}
+
+
+def _read_text(path):
+    with open(path, 'rb') as f:
+        return f.read().decode('utf-8')
+
+
+def _sentence(rng, words=12):
+    """Random BRD-like sentence"""
+    return ' '.join(rng.choice(WORDS) for _ in range(words)).capitalize() + '.'
+
+
+def generate_docx(path, pages, seed=7):
+    """Write a Word document with headings, prose and one table every two pages"""
+    rng = random.Random(seed)
+    document = Document()
+    for page in range(pages):
+        document.add_heading(f"{page + 1} Section {page + 1}", level=1 + page % 3)
+        for _ in range(PARAGRAPHS_PER_PAGE):
+            document.add_paragraph(_sentence(rng, 18))
+        if page % 2 == 0:
+            table = document.add_table(rows=6, cols=4)
+            for row in table.rows:
+                for cell in row.cells:
+                    cell.text = rng.choice(WORDS)
+    document.save(path)
+
+
+def _pdf_escape(text):
+    return text.replace('\\', '\\\\').replace('(', '\\(').replace(')', '\\)')
+
+
+def generate_pdf(path, pages, seed=7):
+    """Write a minimal text PDF (Helvetica, one content stream per page) with headers and footers"""
+    rng = random.Random(seed)
+    objects = {
+        1: b"<< /Type /Catalog /Pages 2 0 R >>",
+        3: b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    }
+    page_ids = []
+    next_id = 4
+    for page in range(pages):
+        lines = ["ACME Bank - CASA BRD v1.4 - Confidential", f"{page + 1}.1 Requirement block {page + 1}"]
+        lines += [_sentence(rng, 12) for _ in range(PARAGRAPHS_PER_PAGE * 3)]
+        lines.append(f"Page {page + 1} of {pages}")
+
+        content = ["BT", "/F1 10 Tf", "14 TL", "50 780 Td"]
+        for line in lines:
+            content.append(f"({_pdf_escape(line)}) Tj T*")
+        content.append("ET")
+        stream = zlib.compress('\n'.join(content).encode('latin-1'))
+
+        content_id, page_id = next_id, next_id + 1
+        next_id += 2
+        objects[content_id] = (
+            f"<< /Length {len(stream)} /Filter /FlateDecode >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+        objects[page_id] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_id} 0 R >>"
+        ).encode()
+        page_ids.append(page_id)
+
+    kids = ' '.join(f"{page_id} 0 R" for page_id in page_ids)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_ids)} >>".encode()
+
+    with open(path, 'wb') as pdf:
+        pdf.write(b"%PDF-1.4\n")
+        offsets = {}
+        for object_id in sorted(objects):
+            offsets[object_id] = pdf.tell()
+            pdf.write(f"{object_id} 0 obj\n".encode() + objects[object_id] + b"\nendobj\n")
+        xref_offset = pdf.tell()
+        pdf.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for object_id in sorted(objects):
+            pdf.write(f"{offsets[object_id]:010d} 00000 n \n".encode())
+        pdf.write(f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode())
+
+
+def generate_xlsx(path, rows, seed=7):
+    """Write a field-spec style workbook with a sparse trailing column"""
+    rng = random.Random(seed)
+    workbook = openpyxl.Workbook(write_only=True)
+    worksheet = workbook.create_sheet('Field Specs')
+    worksheet.append(['Field ID', 'Screen', 'Field Name', 'Type', 'Length', 'Mandatory', 'Validation', None, 'Notes'])
+    for row in range(rows):
+        worksheet.append([
+            row + 1, f"Screen {row % 40}", rng.choice(WORDS).title(), rng.choice(['Text', 'Number', 'Date']),
+            rng.randint(1, 120), rng.choice(['Y', 'N']), _sentence(rng, 6), None,
+            _sentence(rng, 4) if row % 10 == 0 else None,
+        ])
+    workbook.save(path)
+
+
+def generate_txt(path, pages, seed=7):
+    """Write plain text with the same volume of prose as the DOCX fixture"""
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as txt:
+        for page in range(pages):
+            txt.write(f"{page + 1} Section {page + 1}\n")
+            for _ in range(PARAGRAPHS_PER_PAGE):
+                txt.write(_sentence(rng, 18) + '\n')
+
+
+def build_fixtures(fixtures_dir, page_sizes, row_sizes):
+    """Generate (or reuse) every synthetic fixture; returns a list of case dicts"""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    cases = []
+
+    generators = [('docx', generate_docx, page_sizes, 'pages'), ('pdf', generate_pdf, page_sizes, 'pages'),
+                  ('txt', generate_txt, page_sizes, 'pages'), ('xlsx', generate_xlsx, row_sizes, 'rows')]
+    for file_type, generator, sizes, unit in generators:
+        for size in sizes:
+            path = os.path.join(fixtures_dir, f"brd_{size}_{unit}.{file_type}")
+            if not os.path.exists(path):
+                print(f"Generating {os.path.basename(path)}...", flush=True)
+                generator(path, size)
+            cases.append({'file_type': file_type, 'size': size, 'unit': unit, 'path': path})
+
+    return cases
+
+
+def _max_rss_bytes(who):
+    """Peak RSS of this process or of its exited children (resource.RUSAGE_*)"""
+    # ru_maxrss is KiB on Linux and bytes on macOS; it also sees lxml/C allocations
+    rss_scale = 1 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(who).ru_maxrss * rss_scale
+
+
+def _measure(function, *args):
+    """Run function once in this process and report time, memory and output size.
+
+    Memory covers this process only, not worker processes it starts.
+    """
+    if resource is not None:
+        rss_before = _max_rss_bytes(resource.RUSAGE_SELF)
+    else:
+        tracemalloc.start()
+    started = time.perf_counter()
+    output = function(*args)
+    wall_time = time.perf_counter() - started
+
+    if resource is not None:
+        peak_rss = _max_rss_bytes(resource.RUSAGE_SELF)
+        memory = {'memory_source': 'ru_maxrss', 'peak_rss_bytes': peak_rss,
+                  'peak_rss_growth_bytes': max(0, peak_rss - rss_before)}
+    else:
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {'memory_source': 'tracemalloc', 'peak_rss_bytes': None, 'peak_rss_growth_bytes': traced_peak}
+
+    if isinstance(output, list):
+        output_chars = sum(len(result.get('text') or '') for result in output)
+    else:
+        output_chars = len(output)
+
+    return {'wall_time_s': round(wall_time, 4), **memory, 'output_chars': output_chars}
+
+
+def _run_extractor_case(file_type, extractor_name, path):
+    return _measure(EXTRACTORS[file_type][extractor_name], path)
+
+
+def _run_pipeline_case(paths, parallel):
+    if parallel:
+        # A long-running server keeps its extraction pool warm; don't time worker start-up
+        document_extraction.extract_documents([('warmup_a.txt', b'a'), ('warmup_b.txt', b'b')], True)
+    documents = [(os.path.basename(path), path) for path in paths]
+    result = _measure(document_extraction.extract_documents, documents, parallel)
+    if parallel:
+        # Workers only show up in RUSAGE_CHILDREN once they have exited; this is the largest worker's peak
+        document_extraction._extraction_pool.shutdown(wait=True)
+        result['worker_peak_rss_bytes'] = _max_rss_bytes(resource.RUSAGE_CHILDREN) if resource is not None else None
+    return result
+
+
+def _run_case(case):
+    """Run one case description (as passed to --run-case) in this process"""
+    if case['kind'] == 'pipeline':
+        return _run_pipeline_case(case['paths'], case['parallel'])
+    return _run_extractor_case(case['file_type'], case['extractor'], case['path'])
+
+
+def _isolated(case):
+    """Run one measurement in a fresh interpreter so peak memory is not shared between cases"""
+    output = subprocess.check_output(
+        [sys.executable, os.path.abspath(__file__), '--run-case', json.dumps(case)], cwd=ROOT_DIR
+    )
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def run_benchmarks(cases, repeat=1):
+    """Benchmark every extractor on every fixture, plus the combined pipeline per size"""
+    results = []
+
+    for case in cases:
+        for extractor_name in EXTRACTORS[case['file_type']]:
+            case_spec = {'kind': 'extractor', 'file_type': case['file_type'],
+                         'extractor': extractor_name, 'path': case['path']}
+            runs = [_isolated(case_spec) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['wall_time_s'])
+            result = {
+                'benchmark': f"{case['file_type']}/{extractor_name}",
+                'size': case['size'],
+                'unit': case['unit'],
+                'file_bytes': os.path.getsize(case['path']),
+                **best,
+            }
+            results.append(result)
+            _print_result(result)
+
+    # process_uploaded_files path: one BRD pack (all file types) per size step
+    page_cases = [case for case in cases if case['unit'] == 'pages']
+    row_cases = [case for case in cases if case['unit'] == 'rows']
+    for step, page_size in enumerate(sorted({case['size'] for case in page_cases})):
+        pack = [case['path'] for case in page_cases if case['size'] == page_size]
+        if step < len(row_cases):
+            pack.append(sorted(row_cases, key=lambda case: case['size'])[step]['path'])
+        for parallel in (False, True):
+            case_spec = {'kind': 'pipeline', 'paths': pack, 'parallel': parallel}
+            runs = [_isolated(case_spec) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['wall_time_s'])
+            result = {
+                'benchmark': f"extract_documents/{'parallel' if parallel else 'serial'}",
+                'size': page_size,
+                'unit': 'pages',
+                'file_bytes': sum(os.path.getsize(path) for path in pack),
+                **best,
+            }
+            results.append(result)
+            _print_result(result)
+
+    return results
+
+
+def _print_result(result):
+    workers = result.get('worker_peak_rss_bytes')
+    print(
+        f"{result['benchmark']:<32} {result['size']:>7} {result['unit']:<5} "
+        f"{result['wall_time_s']:>9.3f}s {result['peak_rss_growth_bytes'] / 1024 / 1024:>8.1f} MB peak growth "
+        f"{result['output_chars']:>11,} chars"
+        + (f" ({workers / 1024 / 1024:.1f} MB largest worker)" if workers else ""),
+        flush=True
+    )
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT_DIR, stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark BRD text extraction")
+    parser.add_argument('--quick', action='store_true', help="Skip the 1000-page and 100k-row fixtures")
+    parser.add_argument('--repeat', type=int, default=1, help="Runs per case; the fastest is kept")
+    parser.add_argument('--fixtures-dir', default=os.path.join(tempfile.gettempdir(), 'tcg_bench_fixtures'),
+                        help="Where synthetic documents are generated and reused")
+    parser.add_argument('--output', default=None, help="JSON results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument('--run-case', default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        print(json.dumps(_run_case(json.loads(args.run_case))))
+        return
+
+    page_sizes = QUICK_PAGE_SIZES if args.quick else PAGE_SIZES
+    row_sizes = QUICK_ROW_SIZES if args.quick else ROW_SIZES
+
+    cases = build_fixtures(args.fixtures_dir, page_sizes, row_sizes)
+    results = run_benchmarks(cases, repeat=args.repeat)
+
+    output = args.output or os.path.join(
+        ROOT_DIR, 'benchmarks', 'results', f"extraction_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({
+            'generated_at': datetime.now().isoformat(timespec='seconds'),
+            'git_commit': _git_commit(),
+            'extractor_version': document_extraction.EXTRACTOR_VERSION,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'results': results,
+        }, f, indent=2)
+    print(f"\nResults saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
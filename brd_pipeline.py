@@ -0,0 +1,500 @@
+"""
+BRD Pipeline
+Streamlit-free pipeline from BRD documents to requirements and test cases, reporting progress through a callback
+"""
+
+import json
+import os
+import threading
+
+from ai_pipeline import DEFAULT_MAX_CONCURRENCY
+from brd_revisions import get_suite_store, load_suite, plan_revision, save_suite
+from brd_sections import build_section_index
+from document_extraction import combine_extracted_text, extract_documents
+from llm_cache import cached_completion, iter_completion_stream
+from openai_clients import get_openai_client
+from text_normalization import normalize_brd_text
+from test_case_generation import (
+    DEFAULT_BATCH_SIZE, DEFAULT_CONTINUATION_ROUNDS, StreamingTestCaseParser, build_generation_prompt,
+    continue_test_case_ids, format_requirements_summary, generate_in_batches, generate_with_continuation,
+    generation_request, group_requirements
+)
+from requirements_analysis import (
+    artifact_matches, brd_fingerprint, extract_requirements_chunked, get_requirements_store,
+    load_requirements_artifact, make_requirements_artifact, merge_revised_requirements, parse_requirements_response,
+    requirements_request, save_requirements_artifact, use_chunked_extraction
+)
+
+PROMPT_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'Test_Case_Generation_Prompt.md')
+
+AUTO_DOMAIN_CONTEXT = "Analyze the BRD and identify the application domain automatically"
+
+# Test cases asked for when requirements analysis finds nothing or too little
+MIN_TEST_CASES = 35
+MIN_REQUIREMENTS = 30
+
+# The sidebar defaults, for callers without a UI
+DEFAULT_OPTIONS = {
+    'target_count': 'auto',
+    'negative_ratio': 15,
+    'variations': [],
+    'focus_modules': [],
+    'domain_context': AUTO_DOMAIN_CONTEXT,
+    'chunked_requirements': None,
+    'max_concurrency': DEFAULT_MAX_CONCURRENCY,
+    'stream': False,
+    'batched': False,
+    'batch_size': DEFAULT_BATCH_SIZE,
+    'max_continuations': DEFAULT_CONTINUATION_ROUNDS,
+    'base_url': None,
+}
+
+_templates = {}
+_templates_lock = threading.Lock()
+
+
+def silent_report(level, message):
+    """Reporter that discards messages.
+
+    A reporter is called as report(level, message) with level one of
+    'info', 'success', 'warning', 'error' or 'caption'.
+    """
+
+
+def read_prompt_template(path=PROMPT_FILE):
+    """Prompt template text, re-read only after the file's mtime or size changes; raises FileNotFoundError"""
+    stat = os.stat(path)
+    version = (stat.st_mtime_ns, stat.st_size)
+    with _templates_lock:
+        cached = _templates.get(path)
+        if cached and cached[0] == version:
+            return cached[1]
+    with open(path, 'r') as f:
+        text = f.read()
+    with _templates_lock:
+        _templates[path] = (version, text)
+    return text
+
+
+def extract_brd_text(documents, parallel=False, max_workers=None, cache=None, normalize=True, report=silent_report):
+    """Combined, optionally normalized text of (name, path-or-bytes[, sha256]) documents"""
+    results = extract_documents(documents, parallel=parallel, max_workers=max_workers, cache=cache)
+
+    for result in results:
+        if result.get('cached'):
+            report('caption', f"♻️ {result['name']}: reused cached extraction")
+        elif result.get('unsupported'):
+            report('warning', result['error'])
+        elif result.get('error'):
+            report('error', f"Error processing {result['name']}: {result['error']}")
+
+    combined_text = combine_extracted_text(results)
+
+    if normalize and combined_text:
+        combined_text, stats = normalize_brd_text(combined_text)
+        if stats['original_chars']:
+            saved_pct = stats['chars_saved'] / stats['original_chars'] * 100
+            report('caption', (
+                f"🧹 Normalization removed {stats['chars_saved']:,} characters "
+                f"(~{stats['estimated_tokens_saved']:,} tokens, {saved_pct:.1f}%)"
+            ))
+
+    return combined_text
+
+
+def analyze_requirements(brd_text, api_key, section_index=None, chunked=None, max_concurrency=DEFAULT_MAX_CONCURRENCY,
+                         report=silent_report, cache=None, refresh_cache=False, base_url=None):
+    """Identify and count all functional requirements; returns (requirements, total_count, chunked).
+
+    BRDs larger than one prompt (or chunked=True) are split along section
+    boundaries, extracted in parallel and merged without duplicates. The
+    returned chunked is the mode actually used: a single-call reply that
+    hits the output limit is redone section by section.
+    base_url is the endpoint (see openai_clients.resolve_base_url).
+    """
+    if use_chunked_extraction(brd_text, chunked):
+        try:
+            requirements, stats = extract_requirements_chunked(
+                brd_text, api_key, section_index=section_index, max_concurrency=max_concurrency,
+                cache=cache, refresh_cache=refresh_cache, base_url=base_url
+            )
+        except Exception as e:
+            report('error', f"Error analyzing requirements: {str(e)}")
+            return [], 0, True
+
+        for error in stats['errors']:
+            report('warning', f"⚠️ Requirements extraction failed for {error}")
+        report('caption', (
+            f"🧩 {stats['raw_requirements']} requirements extracted from {stats['chunks']} section chunk(s)"
+            + (f" ({stats['splits']} split after hitting the output limit)" if stats['splits'] else "")
+            + f", {len(requirements)} after removing duplicates"
+        ))
+        return requirements, len(requirements), True
+
+    try:
+        client = get_openai_client(api_key, base_url)
+        response = cached_completion(client, requirements_request(brd_text), cache, refresh_cache)
+    except Exception as e:
+        report('error', f"Error analyzing requirements: {str(e)}")
+        return [], 0, False
+
+    if response.choices[0].finish_reason == 'length':
+        report('caption', "🧩 Requirements reply hit the output limit; extracting section by section instead")
+        return analyze_requirements(brd_text, api_key, section_index, True, max_concurrency, report, cache, refresh_cache,
+                                    base_url)
+
+    try:
+        return parse_requirements_response(response.choices[0].message.content) + (False,)
+    except json.JSONDecodeError as e:
+        report('error', f"Error parsing requirements analysis: {str(e)}")
+        return [], 0, False
+
+
+def requirements_artifact(brd_text, api_key, options, report=silent_report, cache=None, refresh_cache=False,
+                          store=None, previous=None):
+    """Requirements for this exact BRD text, analyzed once and reused afterwards.
+
+    previous (e.g. the artifact kept in a UI session) is reused when it
+    matches, then the artifact store by BRD fingerprint; refresh_cache
+    forces a fresh analysis. New artifacts are saved to the store.
+    """
+    chunked = use_chunked_extraction(brd_text, options.get('chunked_requirements'))
+    if store is None:
+        store = get_requirements_store()
+
+    if not refresh_cache:
+        # A single-call analysis may have fallen back to chunked mode, so its artifact is saved as chunked
+        modes = (chunked,) if chunked else (False, True)
+        artifact = previous if any(artifact_matches(previous, brd_text, mode) for mode in modes) else None
+        for mode in modes:
+            if artifact is not None:
+                break
+            artifact = load_requirements_artifact(store, brd_fingerprint(brd_text), mode)
+        if artifact:
+            report('caption', f"♻️ Reusing {len(artifact['requirements'])} requirements analyzed on {artifact['created_at']} for this BRD")
+            return artifact
+
+    requirements, total_count, chunked = analyze_requirements(
+        brd_text, api_key,
+        section_index=options.get('section_index'),
+        chunked=chunked,
+        max_concurrency=options.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+        report=report, cache=cache, refresh_cache=refresh_cache, base_url=options.get('base_url')
+    )
+    artifact = make_requirements_artifact(brd_text, requirements, total_count, chunked)
+    if requirements:
+        save_requirements_artifact(store, artifact)
+    return artifact
+
+
+def generation_target(artifact, report=silent_report):
+    """(requirements, test case count, requirements summary) for the generation prompt"""
+    requirements, total_requirements_count = artifact['requirements'], artifact['total_count']
+
+    if not requirements:
+        report('warning', "Could not identify requirements. Falling back to automatic detection...")
+        return [], MIN_TEST_CASES, f"Analyze BRD and identify at least {MIN_TEST_CASES} granular requirements automatically"
+
+    if total_requirements_count < MIN_REQUIREMENTS:
+        report('warning', f"⚠️ Only {total_requirements_count} requirements found. Expanding analysis...")
+        total_requirements_count = max(MIN_TEST_CASES, total_requirements_count)
+        report('info', f"📈 Targeting {total_requirements_count} test cases with granular requirement breakdown")
+    else:
+        report('success', f"✅ Found {total_requirements_count} requirements in the BRD")
+
+    return requirements, total_requirements_count, format_requirements_summary(requirements, total_requirements_count)
+
+
+def generate_test_cases(brd_text, prompt_template, api_key, options, artifact, report=silent_report, cache=None,
+                        refresh_cache=False, call=None, on_batch_done=None):
+    """Generate test cases for an analyzed BRD; returns (test_cases or None, raw_response).
+
+    With options['batched'] requirement groups are generated in parallel
+    calls and on_batch_done(position, test_cases_so_far, batch) is called as
+    each finishes. Otherwise one call is made and continued while it stops
+    at the token limit; call(request) -> (text, finish_reason) replaces the
+    default non-streaming call, e.g. to stream into a UI.
+    """
+    requirements, total_requirements_count, requirements_summary = generation_target(artifact, report)
+
+    report('info', "🤖 Step 2: Generating test cases for each identified requirement...")
+
+    if options.get('batched') and requirements:
+        return generate_test_case_batches(
+            brd_text, prompt_template, api_key, requirements, options, report, cache, refresh_cache, on_batch_done
+        )
+
+    request = generation_request(build_generation_prompt(
+        prompt_template, brd_text, requirements_summary, total_requirements_count, options
+    ))
+
+    if call is None:
+        def call(request):
+            response = cached_completion(get_openai_client(api_key, options.get('base_url')), request, cache,
+                                         refresh_cache)
+            return response.choices[0].message.content, response.choices[0].finish_reason
+
+    max_rounds = options.get('max_continuations', DEFAULT_CONTINUATION_ROUNDS)
+    try:
+        test_cases, info = generate_with_continuation(call, request, max_rounds, total_requirements_count)
+    except Exception as e:
+        report('error', f"Error calling OpenAI API: {str(e)}")
+        return None, str(e)
+
+    if info['rounds']:
+        report('info', f"🔁 Output hit the token limit; continued generation {info['rounds']} time(s) to complete the suite")
+    if info['truncated']:
+        report('warning', (
+            f"⚠️ Output was still cut off at the token limit after {info['rounds']} continuation round(s). "
+            f"Kept the {len(test_cases or [])} complete test cases."
+        ))
+    elif info['recovered'] and not info['rounds']:
+        report('warning', "⚠️ JSON response was incomplete. Recovered the complete test cases only.")
+
+    return test_cases, '\n'.join(info['responses'])
+
+
+def generate_test_case_batches(brd_text, prompt_template, api_key, requirements, options, report=silent_report,
+                               cache=None, refresh_cache=False, on_batch_done=None):
+    """Batched generation with per-batch warnings; returns (test_cases or None, raw_response)"""
+    try:
+        test_cases, batches = generate_in_batches(
+            prompt_template, brd_text, requirements, options, api_key,
+            section_index=options.get('section_index'),
+            batch_size=options.get('batch_size', DEFAULT_BATCH_SIZE),
+            max_concurrency=options.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+            on_done=on_batch_done,
+            cache=cache,
+            refresh_cache=refresh_cache,
+            max_rounds=options.get('max_continuations', DEFAULT_CONTINUATION_ROUNDS)
+        )
+    except Exception as e:
+        report('error', f"Error calling OpenAI API: {str(e)}")
+        return None, str(e)
+
+    for position, batch in enumerate(batches, 1):
+        if batch['error']:
+            report('warning', f"⚠️ Batch {position} of {len(batches)} failed: {batch['error']}")
+        elif batch['recovered']:
+            report('warning', f"⚠️ Batch {position} of {len(batches)} was cut off at the token limit; kept {len(batch['test_cases'])} complete test cases")
+    continuation_rounds = sum(batch['rounds'] for batch in batches)
+    report('info', (
+        f"🧩 Generated {len(test_cases)} test cases in {len(batches)} parallel batches"
+        + (f" ({continuation_rounds} continuation call(s) for truncated output)" if continuation_rounds else "")
+    ))
+
+    return test_cases or None, json.dumps({'test_cases': test_cases}, indent=2)
+
+
+def streaming_call(api_key, cache=None, refresh_cache=False, on_test_cases=None, base_url=None):
+    """A call(request) for generate_test_cases that streams the response.
+
+    on_test_cases(test_cases_so_far) is called whenever a test case object
+    completes; the list accumulates across continuation rounds.
+    """
+    streamed_test_cases = []
+
+    def call(request):
+        parser = StreamingTestCaseParser()
+        parts = []
+        finish_reason = None
+        for delta, finish_reason in iter_completion_stream(get_openai_client(api_key, base_url), request, cache, refresh_cache):
+            parts.append(delta)
+            completed = parser.feed(delta)
+            if completed:
+                streamed_test_cases.extend(completed)
+                if on_test_cases:
+                    on_test_cases(streamed_test_cases)
+        return ''.join(parts), finish_reason
+
+    return call
+
+
+def _no_progress(fraction, message, test_cases_so_far=None):
+    pass
+
+
+def _batch_progress(requirements, options, on_progress, offset=0.2):
+    """on_batch_done callback that reports batched generation as the part of the run after offset"""
+    total_batches = len(group_requirements(requirements, options.get('batch_size', DEFAULT_BATCH_SIZE)))
+    finished = []
+
+    def on_batch_done(position, test_cases_so_far, batch):
+        finished.append(position)
+        on_progress(
+            offset + (1 - offset) * len(finished) / total_batches,
+            f"🤖 {len(finished)} of {total_batches} batches done, {len(test_cases_so_far)} test case(s) so far",
+            list(test_cases_so_far)
+        )
+
+    return on_batch_done
+
+
+def incremental_options(options):
+    """Options that keep a suite traceable section by section, so its next revision can be regenerated incrementally.
+
+    Requirements are extracted in section chunks (each one citing its
+    source section) and test cases generated in batches (each one citing
+    its requirements).
+    """
+    return dict(options, chunked_requirements=True, batched=True)
+
+
+def generate_suite(brd_text, prompt_template, api_key, options, report=silent_report, cache=None, refresh_cache=False,
+                   previous_artifact=None, on_progress=None):
+    """Requirements analysis then generation, reporting progress as it goes.
+
+    on_progress(fraction, message, test_cases_so_far) is called with the
+    overall fraction done (None when unknown) and, for batched or streamed
+    generation, the test cases produced so far. Returns a dict with
+    'artifact', 'test_cases' (None if generation failed) and 'raw_response'.
+    """
+    on_progress = on_progress or _no_progress
+
+    report('info', "🔍 Step 1: Analyzing BRD to identify all requirements...")
+    on_progress(0.05, "🔍 Analyzing BRD to identify all requirements...", None)
+    artifact = requirements_artifact(
+        brd_text, api_key, options, report, cache, refresh_cache, previous=previous_artifact
+    )
+    on_progress(0.2, "🤖 Generating test cases...", None)
+
+    call = None
+    on_batch_done = None
+    if options.get('batched') and artifact['requirements']:
+        on_batch_done = _batch_progress(artifact['requirements'], options, on_progress)
+    elif options.get('stream'):
+        expected = max(artifact['total_count'], MIN_TEST_CASES)
+
+        def on_test_cases(test_cases_so_far):
+            on_progress(
+                0.2 + 0.75 * min(1.0, len(test_cases_so_far) / expected),
+                f"🤖 Generating... {len(test_cases_so_far)} test case(s) so far",
+                list(test_cases_so_far)
+            )
+
+        call = streaming_call(api_key, cache, refresh_cache, on_test_cases, options.get('base_url'))
+
+    test_cases, raw_response = generate_test_cases(
+        brd_text, prompt_template, api_key, options, artifact, report, cache, refresh_cache,
+        call=call, on_batch_done=on_batch_done
+    )
+    return {'artifact': artifact, 'test_cases': test_cases, 'raw_response': raw_response}
+
+
+def regenerate_suite(brd_text, prompt_template, api_key, options, previous, report=silent_report, cache=None,
+                     refresh_cache=False, on_progress=None):
+    """Incremental generation for a revised BRD: regenerate only what its changed sections affect.
+
+    previous is the stored suite of the earlier version (see
+    brd_revisions.load_suite). Requirements and test cases traced to
+    unchanged sections are kept as they are; requirements are re-extracted
+    from changed and added sections only, and test cases generated in
+    batches for them. Falls back to generate_suite when the previous suite
+    is not traceable section by section. Returns the generate_suite dict,
+    plus 'revision' counts when the run was incremental.
+    """
+    on_progress = on_progress or _no_progress
+    section_index = options.get('section_index') or build_section_index(brd_text)
+    plan, reason = plan_revision(previous, brd_text, section_index)
+    if plan is None:
+        report('warning', f"⚠️ Regenerating the whole suite: {reason}")
+        return generate_suite(brd_text, prompt_template, api_key, options, report, cache, refresh_cache,
+                              on_progress=on_progress)
+
+    diff = plan['diff']
+    report('info', (
+        f"🔀 Since the version of {previous['created_at']}: {len(diff['changed'])} changed, {len(diff['added'])} added, "
+        f"{len(diff['removed'])} removed and {len(diff['unchanged'])} unchanged section(s)"
+    ))
+
+    revised_requirements = []
+    if plan['sections_to_extract']:
+        report('info', f"🔍 Step 1: Extracting requirements from {len(plan['sections_to_extract'])} changed or added section(s)...")
+        on_progress(0.05, "🔍 Extracting requirements from changed sections...", None)
+        revised_requirements, stats = extract_requirements_chunked(
+            brd_text, api_key, section_index=section_index,
+            max_concurrency=options.get('max_concurrency', DEFAULT_MAX_CONCURRENCY),
+            cache=cache, refresh_cache=refresh_cache, section_ids=plan['sections_to_extract'],
+            base_url=options.get('base_url')
+        )
+        for error in stats['errors']:
+            report('warning', f"⚠️ Requirements extraction failed for {error}")
+
+    requirements, added = merge_revised_requirements(plan['kept_requirements'], revised_requirements)
+    artifact = make_requirements_artifact(brd_text, requirements, len(requirements), True)
+    save_requirements_artifact(get_requirements_store(), artifact)
+    on_progress(0.2, "🤖 Generating test cases...", None)
+
+    new_test_cases, raw_response = [], ''
+    if added:
+        report('info', f"🤖 Step 2: Generating test cases for {len(added)} new or changed requirement(s)...")
+        new_test_cases, raw_response = generate_test_case_batches(
+            brd_text, prompt_template, api_key, added, options, report, cache, refresh_cache,
+            _batch_progress(added, options, on_progress)
+        )
+        if new_test_cases is None:
+            return {'artifact': artifact, 'test_cases': None, 'raw_response': raw_response}
+
+    kept_test_cases = plan['kept_test_cases']
+    continue_test_case_ids(kept_test_cases, new_test_cases)
+    report('success', (
+        f"✅ Kept {len(kept_test_cases)} unchanged test case(s), replaced {len(plan['dropped_test_cases'])} "
+        f"with {len(new_test_cases)} regenerated for {len(added)} requirement(s)"
+    ))
+    return {
+        'artifact': artifact,
+        'test_cases': kept_test_cases + new_test_cases,
+        'raw_response': raw_response,
+        'revision': {
+            'sections_changed': len(diff['changed']),
+            'sections_added': len(diff['added']),
+            'sections_removed': len(diff['removed']),
+            'requirements_kept': len(plan['kept_requirements']),
+            'requirements_added': len(added),
+            'test_cases_kept': len(kept_test_cases),
+            'test_cases_dropped': len(plan['dropped_test_cases']),
+            'test_cases_generated': len(new_test_cases),
+        },
+    }
+
+
+def run_pipeline(documents, api_key, options=None, report=silent_report, cache=None, refresh_cache=False,
+                 extraction_cache=None, normalize=True, prompt_template=None, previous_documents=None):
+    """Extraction, requirements analysis and generation for one BRD made of one or more documents.
+
+    options are the sidebar's generation options; missing keys take
+    DEFAULT_OPTIONS. With previous_documents (the earlier version of the
+    BRD) the suite stored for that version is revised incrementally. Every
+    generated suite is stored as the baseline for the next revision.
+    Returns a dict with 'brd_text', 'requirements', 'requirements_count',
+    'test_cases' (empty if generation failed) and 'raw_response'. Raises
+    ValueError if no text could be extracted.
+    """
+    options = dict(DEFAULT_OPTIONS, **(options or {}))
+    brd_text = extract_brd_text(documents, cache=extraction_cache, normalize=normalize, report=report)
+    if not brd_text.strip():
+        raise ValueError("No text could be extracted from the documents")
+    options.setdefault('section_index', build_section_index(brd_text))
+    if prompt_template is None:
+        prompt_template = read_prompt_template()
+
+    previous = None
+    if previous_documents:
+        previous_text = extract_brd_text(previous_documents, cache=extraction_cache, normalize=normalize)
+        previous = load_suite(get_suite_store(), brd_fingerprint(previous_text))
+        if previous is None:
+            report('warning', "⚠️ No suite was stored for the previous BRD version; generating the whole suite")
+
+    if previous:
+        suite = regenerate_suite(brd_text, prompt_template, api_key, options, previous, report, cache, refresh_cache)
+    else:
+        suite = generate_suite(brd_text, prompt_template, api_key, options, report, cache, refresh_cache)
+    if suite['test_cases']:
+        save_suite(get_suite_store(), brd_text, suite['artifact'], suite['test_cases'])
+    return {
+        'brd_text': brd_text,
+        'requirements': suite['artifact']['requirements'],
+        'requirements_count': suite['artifact']['total_count'],
+        'test_cases': suite['test_cases'] or [],
+        'raw_response': suite['raw_response'],
+    }
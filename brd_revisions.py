@@ -0,0 +1,142 @@
+"""
+BRD Revisions
+Stored suites per BRD version and a section-by-section diff that decides what a revised BRD needs regenerated
+"""
+
+import difflib
+import hashlib
+import json
+import threading
+import time
+
+from brd_sections import build_section_index, iter_leaf_blocks
+from requirements_analysis import brd_fingerprint
+from sqlite_cache import SQLiteCache
+
+SUITE_STORE_FILE = 'generated_suites.sqlite'
+
+_suite_store = None
+_suite_store_lock = threading.Lock()
+
+
+def get_suite_store():
+    """Return the process-wide store of generated suites"""
+    global _suite_store
+    with _suite_store_lock:
+        if _suite_store is None:
+            _suite_store = SQLiteCache(SUITE_STORE_FILE, max_bytes=512 * 1024 * 1024)
+        return _suite_store
+
+
+def save_suite(store, brd_text, artifact, test_cases):
+    """Persist a generated suite under its BRD fingerprint, as the baseline for the next revision"""
+    suite = {
+        'fingerprint': brd_fingerprint(brd_text),
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'brd_text': brd_text,
+        'artifact': artifact,
+        'test_cases': test_cases,
+    }
+    store.set_text(f"suite:{suite['fingerprint']}", json.dumps(suite))
+
+
+def load_suite(store, fingerprint):
+    """Return the stored suite for a BRD fingerprint, or None"""
+    stored = store.get_text(f"suite:{fingerprint}")
+    return json.loads(stored) if stored is not None else None
+
+
+def _section_key(section):
+    """What identifies a section across versions; file names carry version numbers, so they are ignored"""
+    if section['kind'] == 'file':
+        return 'file', None, ''
+    return section['kind'], section['number'], ' '.join(section['title'].lower().split())
+
+
+def _section_blocks(text, section_index):
+    """(key, section ID, content hash) per section in document order.
+
+    The hash covers the section's own content without its heading line and
+    ignores whitespace, so reflowed text does not count as a change.
+    """
+    blocks = []
+    for section, start, end in iter_leaf_blocks(section_index):
+        block = text[start:end]
+        body = block if section['kind'] == 'preamble' else block.partition('\n')[2]
+        digest = hashlib.sha256(' '.join(body.split()).encode('utf-8')).hexdigest()
+        blocks.append((_section_key(section), section['id'], digest))
+    return blocks
+
+
+def diff_sections(old_text, new_text, old_index=None, new_index=None):
+    """Match the sections of two BRD versions and classify them.
+
+    Sections are aligned in document order by kind, clause number and
+    title. Returns a dict with 'unchanged' and 'changed' lists of
+    (old ID, new ID) pairs, and 'added' (new IDs) and 'removed' (old IDs)
+    for sections without a counterpart, e.g. after a heading was renamed.
+    """
+    old_blocks = _section_blocks(old_text, old_index or build_section_index(old_text))
+    new_blocks = _section_blocks(new_text, new_index or build_section_index(new_text))
+    matcher = difflib.SequenceMatcher(
+        None, [block[0] for block in old_blocks], [block[0] for block in new_blocks], autojunk=False
+    )
+
+    diff = {'unchanged': [], 'changed': [], 'added': [], 'removed': []}
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == 'equal':
+            for old, new in zip(old_blocks[i1:i2], new_blocks[j1:j2]):
+                diff['unchanged' if old[2] == new[2] else 'changed'].append((old[1], new[1]))
+            continue
+        diff['removed'].extend(block[1] for block in old_blocks[i1:i2])
+        diff['added'].extend(block[1] for block in new_blocks[j1:j2])
+    return diff
+
+
+def plan_revision(previous, new_text, new_index=None):
+    """Work out what a revised BRD needs regenerated, given the stored suite of the previous version.
+
+    Returns (plan, None), or (None, reason) when the previous suite cannot
+    be traced section by section: its requirements need a source_section
+    and its test cases requirement_ids. The plan has the 'diff', the
+    'kept_requirements' (source sections mapped to the new version), the
+    'dropped_requirements', the 'kept_test_cases' and 'dropped_test_cases',
+    and the new 'sections_to_extract' (changed and added sections).
+    """
+    old_text = previous['brd_text']
+    old_index = build_section_index(old_text)
+    requirements = previous['artifact']['requirements']
+    test_cases = previous['test_cases'] or []
+
+    if not requirements or any(req.get('source_section') not in old_index['by_id'] for req in requirements):
+        return None, "the previous requirements were not extracted section by section"
+    if not test_cases or any(not tc.get('requirement_ids') for tc in test_cases):
+        return None, "the previous test cases are not traced to requirements (generated without batches)"
+
+    diff = diff_sections(old_text, new_text, old_index, new_index)
+    section_map = dict(diff['unchanged'])
+
+    kept_requirements = []
+    dropped_ids = set()
+    for requirement in requirements:
+        if requirement['source_section'] in section_map:
+            kept_requirements.append(dict(requirement, source_section=section_map[requirement['source_section']]))
+        else:
+            dropped_ids.add(requirement.get('requirement_id'))
+
+    kept_test_cases = []
+    dropped_test_cases = []
+    for test_case in test_cases:
+        if dropped_ids.intersection(test_case['requirement_ids']):
+            dropped_test_cases.append(test_case)
+        else:
+            kept_test_cases.append(dict(test_case))
+
+    return {
+        'diff': diff,
+        'kept_requirements': kept_requirements,
+        'dropped_requirements': [req for req in requirements if req.get('requirement_id') in dropped_ids],
+        'kept_test_cases': kept_test_cases,
+        'dropped_test_cases': dropped_test_cases,
+        'sections_to_extract': [new_id for _, new_id in diff['changed']] + diff['added'],
+    }, None
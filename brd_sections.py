@@ -0,0 +1,246 @@
+"""
+BRD Sections
+Section tree over extracted BRD text: headings, numbered clauses and tables with offsets
+"""
+
+import re
+
+_FILE_RE = re.compile(r'^FILE: (.+)$')
+_MARKDOWN_HEADING_RE = re.compile(r'^(#{1,9}) (.+)$')
+_NUMBERED_CLAUSE_RE = re.compile(r'^(\d{1,3}(?:\.\d{1,3}){0,5})\.?\s+([A-Za-z].{0,118})$')
+
+# How the extractors write table rows: Word/PDF cells joined by ' | ', Excel cells by '|'
+_TABLE_ROW_DELIMITERS = (' | ', '|')
+
+
+def _is_table_row(line):
+    """Whether a line has an extracted table row's shape: two or more cells joined by one delimiter"""
+    line = line.rstrip('\r\n')
+    for delimiter in _TABLE_ROW_DELIMITERS:
+        cells = line.split(delimiter)
+        if len(cells) >= 2 and all('|' not in cell and cell == cell.strip() for cell in cells):
+            return True
+    return False
+
+
+def _classify_line(line):
+    """Return (kind, level, number, title) for a heading line, or None"""
+    stripped = line.strip()
+    if not stripped:
+        return None
+
+    file_match = _FILE_RE.match(stripped)
+    if file_match:
+        return 'file', 0, None, file_match.group(1)
+
+    heading_match = _MARKDOWN_HEADING_RE.match(stripped)
+    if heading_match:
+        return 'heading', len(heading_match.group(1)), None, heading_match.group(2).strip()
+
+    clause_match = _NUMBERED_CLAUSE_RE.match(stripped)
+    if clause_match:
+        number, title = clause_match.groups()
+        # A bare "1 Something." is usually a list item, not a clause heading
+        if '.' in number or (len(title) <= 80 and not title.rstrip().endswith('.')):
+            return 'clause', number.count('.') + 1, number, title.strip()
+
+    return None
+
+
+def build_section_index(text):
+    """Build a section tree over BRD text.
+
+    Returns a dict with 'sections' (list in document order) and 'by_id'
+    (section ID -> list position). Every section records its kind ('file',
+    'heading', 'clause' or 'table'), level, parent ID, title, clause number
+    and offsets into the text: 'start', 'body_end' (end of its own content)
+    and 'end' (end including sub-sections). Offsets are str indices, so
+    text[section['start']:section['end']] fetches a section directly.
+    """
+    sections = []
+    stack = []
+    last_heading = None
+    table_start = None
+    table_rows = 0
+    offset = 0
+
+    def close_table(end_offset):
+        if table_start is not None and table_rows >= 2:
+            parent = stack[-1] if stack else None
+            sections.append({
+                'id': f"SEC-{len(sections) + 1:04d}",
+                'kind': 'table',
+                'level': (parent['level'] + 1) if parent else 1,
+                'parent': parent['id'] if parent else None,
+                'number': None,
+                'title': f"Table ({table_rows} rows)",
+                'start': table_start,
+                'body_end': end_offset,
+                'end': end_offset,
+            })
+
+    for line in text.splitlines(keepends=True):
+        line_start = offset
+        offset += len(line)
+
+        # A heading that merely contains a pipe ("4.2 Fees | Charges") only counts as a row inside a table
+        if _is_table_row(line) and (table_start is not None or _classify_line(line) is None):
+            if table_start is None:
+                table_start, table_rows = line_start, 0
+            table_rows += 1
+            continue
+        if line.strip():
+            close_table(line_start)
+            table_start = None
+
+        heading = _classify_line(line)
+        if heading is None:
+            continue
+
+        kind, level, number, title = heading
+        if last_heading is not None:
+            last_heading['body_end'] = line_start
+
+        while stack and stack[-1]['level'] >= level:
+            stack.pop()['end'] = line_start
+
+        section = {
+            'id': f"SEC-{len(sections) + 1:04d}",
+            'kind': kind,
+            'level': level,
+            'parent': stack[-1]['id'] if stack else None,
+            'number': number,
+            'title': title,
+            'start': line_start,
+            'body_end': None,
+            'end': None,
+        }
+        sections.append(section)
+        stack.append(section)
+        last_heading = section
+
+    close_table(offset)
+    for section in sections:
+        if section['end'] is None:
+            section['end'] = offset
+        if section['body_end'] is None:
+            section['body_end'] = section['end']
+
+    # Text before the first heading still needs an addressable home
+    if text.strip() and (not sections or sections[0]['start'] > 0 and text[:sections[0]['start']].strip()):
+        first_start = sections[0]['start'] if sections else offset
+        sections.insert(0, {
+            'id': 'SEC-0000', 'kind': 'preamble', 'level': 0, 'parent': None, 'number': None,
+            'title': 'Preamble', 'start': 0, 'body_end': first_start, 'end': first_start,
+        })
+
+    sections.sort(key=lambda section: (section['start'], section['kind'] == 'table'))
+    return {
+        'sections': sections,
+        'by_id': {section['id']: position for position, section in enumerate(sections)},
+        'by_number': {section['number']: section['id'] for section in sections if section['number']},
+        'text_length': len(text),
+    }
+
+
+def get_section(section_index, section_id):
+    """Return the section dict for an ID, or None"""
+    position = section_index['by_id'].get(section_id)
+    return section_index['sections'][position] if position is not None else None
+
+
+def get_section_text(text, section_index, section_id, include_children=True):
+    """Return the text of one section, optionally without its sub-sections"""
+    section = get_section(section_index, section_id)
+    if section is None:
+        return ''
+    end = section['end'] if include_children else section['body_end']
+    return text[section['start']:end]
+
+
+def iter_leaf_blocks(section_index):
+    """Yield non-overlapping (section, start, end) blocks covering each section's own content"""
+    for section in section_index['sections']:
+        if section['kind'] == 'table':
+            continue
+        if section['body_end'] > section['start']:
+            yield section, section['start'], section['body_end']
+
+
+def section_label(section):
+    """Human-readable label used when citing a section"""
+    prefix = f"{section['number']} " if section['number'] else ''
+    return f"[{section['id']}] {prefix}{section['title']}"
+
+
+def section_outline(section_index, max_level=None):
+    """Return an indented outline of the section tree"""
+    lines = []
+    for section in section_index['sections']:
+        if section['kind'] == 'table' or (max_level is not None and section['level'] > max_level):
+            continue
+        lines.append(f"{'  ' * section['level']}{section_label(section)}")
+    return '\n'.join(lines)
+
+
+# Ends a truncated section body; the section's heading is always kept above it
+TRUNCATION_MARKER = "\n[... truncated ...]\n"
+
+
+def _fair_share(sizes, budget):
+    """Water-filling: the cap at which sizes kept whole plus capped ones fill the budget"""
+    remaining_budget = budget
+    remaining = len(sizes)
+    for size in sorted(sizes):
+        share = remaining_budget // remaining
+        if size > share:
+            return share
+        remaining_budget -= size
+        remaining -= 1
+    return budget
+
+
+def build_section_excerpt(text, section_index, max_chars):
+    """Fit the BRD into max_chars while keeping every section represented.
+
+    Unlike text[:max_chars], each section keeps its heading and its body
+    receives a fair share of the rest of the budget (truncation markers
+    included), so late sections are not silently dropped. When even the
+    headings do not fit, only headings are kept, as many as fit, followed
+    by a count of the sections left out.
+    """
+    if len(text) <= max_chars:
+        return text
+
+    blocks = []
+    for section, start, end in iter_leaf_blocks(section_index):
+        block = text[start:end]
+        if section['kind'] == 'preamble':
+            blocks.append((section, '', block))
+        else:
+            heading, newline, body = block.partition('\n')
+            blocks.append((section, heading + newline, body))
+    if not blocks:
+        return text[:max_chars]
+
+    heading_chars = sum(len(heading) for _, heading, _ in blocks)
+    if heading_chars > max_chars:
+        omitted_note = f"[... {len(blocks)} more section(s) omitted ...]\n"
+        budget = max_chars - len(omitted_note)
+        parts = []
+        for _, heading, _ in blocks:
+            if len(heading) > budget:
+                break
+            parts.append(heading)
+            budget -= len(heading)
+        parts.append(f"[... {len(blocks) - len(parts)} more section(s) omitted ...]\n")
+        return ''.join(parts) if budget >= 0 else text[:max_chars]
+
+    share = _fair_share([len(body) for _, _, body in blocks], max_chars - heading_chars)
+    parts = []
+    for _, heading, body in blocks:
+        if len(body) > share:
+            keep = share - len(TRUNCATION_MARKER)
+            body = body[:keep].rstrip() + TRUNCATION_MARKER if keep > 0 else ''
+        parts.append(heading + body)
+    return ''.join(parts)
@@ -0,0 +1,231 @@
+"""
+Command Line
+Headless BRD-to-test-case generation without Streamlit: extraction, requirements analysis, generation
+and export for BRD files or directories, several BRDs in parallel.
+
+Usage:
+    python cli.py "CASA and TD BRD (1).docx" -o casa_test_cases.xlsx
+    python cli.py brds/ --output-dir suites/ --format csv --jobs 4 --domain-context "Banking & Finance"
+    python cli.py "CASA BRD v1.4.docx" --previous "CASA BRD v1.3.docx" -o casa_v1.4_test_cases.xlsx
+
+Each input file is one BRD; directories contribute every supported file in them. The API key comes
+from --api-key or OPENAI_API_KEY, and --base-url (or OPENAI_BASE_URL) points at a compatible server
+such as mock_openai_server.py. Every generated suite is stored, so the next version of a BRD can be
+revised with --previous, regenerating only the test cases its changed sections affect.
+"""
+
+import argparse
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from ai_pipeline import DEFAULT_MAX_CONCURRENCY
+from brd_pipeline import AUTO_DOMAIN_CONTEXT, DEFAULT_OPTIONS, incremental_options, read_prompt_template, run_pipeline
+from document_extraction import SUPPORTED_EXTENSIONS, get_file_extension
+from llm_cache import get_response_cache
+from openai_clients import close_openai_clients
+from rate_limits import rate_limit_caps, rate_limit_stats, set_rate_limit_caps
+from sqlite_cache import SQLiteCache
+from test_case_export import EXPORT_FORMATS, export_format, write_test_cases
+from test_case_generation import DEFAULT_BATCH_SIZE, DEFAULT_CONTINUATION_ROUNDS
+
+# BRDs processed at once; their AI calls share the process-wide rate limiter
+DEFAULT_JOBS = 2
+
+_print_lock = threading.Lock()
+
+
+def log(message):
+    with _print_lock:
+        print(message, file=sys.stderr, flush=True)
+
+
+def make_reporter(name, verbose=False):
+    """Pipeline reporter that prefixes messages with the BRD name; captions only when verbose"""
+    def report(level, message):
+        if level == 'caption' and not verbose:
+            return
+        prefix = {'warning': 'WARNING ', 'error': 'ERROR '}.get(level, '')
+        log(f"[{name}] {prefix}{message}")
+    return report
+
+
+def find_brds(inputs, recursive=False):
+    """Supported BRD files named by inputs (files or directories), in a stable order"""
+    paths = []
+    for item in inputs:
+        if os.path.isdir(item):
+            if recursive:
+                found = [os.path.join(root, name) for root, _, names in os.walk(item) for name in names]
+            else:
+                found = [os.path.join(item, name) for name in os.listdir(item)]
+            paths.extend(sorted(
+                path for path in found
+                if os.path.isfile(path) and get_file_extension(path) in SUPPORTED_EXTENSIONS
+                and not os.path.basename(path).startswith(('~$', '.'))
+            ))
+        elif os.path.isfile(item):
+            paths.append(item)
+        else:
+            raise FileNotFoundError(f"No such file or directory: {item}")
+    return list(dict.fromkeys(paths))
+
+
+def output_path_for(brd_path, output_dir, output_format):
+    stem = os.path.splitext(os.path.basename(brd_path))[0]
+    return os.path.join(output_dir, f"{stem}_test_cases.{output_format}")
+
+
+def split_list(value):
+    return [item.strip() for item in (value or '').split(',') if item.strip()]
+
+
+def generation_options(args):
+    """The sidebar's generation options from command-line arguments"""
+    options = dict(
+        DEFAULT_OPTIONS,
+        negative_ratio=args.negative_ratio,
+        variations=split_list(args.variations),
+        focus_modules=split_list(args.focus_modules),
+        domain_context=args.domain_context or AUTO_DOMAIN_CONTEXT,
+        chunked_requirements=False if args.no_chunking else None,
+        max_concurrency=args.max_concurrency,
+        batched=args.batched,
+        batch_size=args.batch_size,
+        max_continuations=args.max_continuations,
+        base_url=args.base_url,
+    )
+    return incremental_options(options) if args.incremental or args.previous else options
+
+
+def process_brd(brd_path, output_path, args, options, prompt_template, extraction_cache):
+    """Run the pipeline for one BRD file and write its output; returns a result dict"""
+    name = os.path.basename(brd_path)
+    report = make_reporter(name, args.verbose)
+    started = time.monotonic()
+    result = {'brd': brd_path, 'output': None, 'test_cases': 0, 'requirements': 0, 'error': None}
+    try:
+        outcome = run_pipeline(
+            [(name, brd_path)], args.api_key, options, report,
+            cache=None if args.no_cache else get_response_cache(),
+            refresh_cache=args.refresh_cache,
+            extraction_cache=extraction_cache,
+            normalize=not args.no_normalize,
+            prompt_template=prompt_template,
+            previous_documents=[(os.path.basename(path), path) for path in args.previous or []],
+        )
+        result['requirements'] = outcome['requirements_count']
+        result['test_cases'] = len(outcome['test_cases'])
+        if not outcome['test_cases']:
+            raise ValueError("No test cases could be generated")
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        result['output'] = write_test_cases(outcome['test_cases'], output_path)
+    except Exception as e:
+        result['error'] = str(e)
+        report('error', f"Failed: {e}")
+    result['seconds'] = round(time.monotonic() - started, 1)
+    if not result['error']:
+        log(f"[{name}] Wrote {result['test_cases']} test cases for {result['requirements']} requirements "
+            f"to {result['output']} in {result['seconds']}s")
+    return result
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='BRD files and/or directories of BRD files')
+    parser.add_argument('-o', '--output', help='Output file for a single BRD (.xlsx, .csv or .json)')
+    parser.add_argument('--output-dir', default='.', help='Directory for <BRD name>_test_cases.<format> files')
+    parser.add_argument('--format', choices=EXPORT_FORMATS, default='xlsx', help='Output format with --output-dir')
+    parser.add_argument('-r', '--recursive', action='store_true', help='Include BRDs in subdirectories')
+    parser.add_argument('-j', '--jobs', type=int, default=DEFAULT_JOBS, help='BRDs processed in parallel')
+
+    parser.add_argument('--api-key', default=os.environ.get('OPENAI_API_KEY'), help='Defaults to OPENAI_API_KEY')
+    parser.add_argument('--base-url', default=None, help='OpenAI-compatible endpoint; defaults to OPENAI_BASE_URL')
+
+    parser.add_argument('--domain-context', default=None, help='Application domain; auto-detected from the BRD by default')
+    parser.add_argument('--negative-ratio', type=int, default=DEFAULT_OPTIONS['negative_ratio'],
+                        help='Percentage of negative test cases')
+    parser.add_argument('--variations', default='', help='Comma-separated user/customer/product variations')
+    parser.add_argument('--focus-modules', default='', help='Comma-separated modules to focus on')
+
+    parser.add_argument('--incremental', action='store_true',
+                        help='Keep the suite traceable by section so later BRD revisions can be regenerated incrementally')
+    parser.add_argument('--previous', nargs='+', metavar='FILE',
+                        help='Previous version of the BRD; regenerate only what its changed sections affect '
+                             '(its suite must have been generated with --incremental)')
+    parser.add_argument('--batched', action='store_true', help='Generate requirement groups in parallel batches')
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE, help='Requirements per batch')
+    parser.add_argument('--max-continuations', type=int, default=DEFAULT_CONTINUATION_ROUNDS,
+                        help='Follow-up calls when output hits the token limit')
+    parser.add_argument('--max-concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY,
+                        help='Concurrent AI calls within one BRD')
+    parser.add_argument('--no-chunking', action='store_true', help='Never split large BRDs into section chunks')
+    parser.add_argument('--no-normalize', action='store_true', help='Keep page headers/footers and extra whitespace')
+    parser.add_argument('--rpm', type=int, default=0, help='Requests per minute limit (0 = TCG_RATE_LIMIT_RPM, else from the API)')
+    parser.add_argument('--tpm', type=int, default=0, help='Tokens per minute limit (0 = TCG_RATE_LIMIT_TPM, else from the API)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not use the AI response cache')
+    parser.add_argument('--refresh-cache', action='store_true', help='Call the API even for cached requests')
+    parser.add_argument('-v', '--verbose', action='store_true', help='Show cache and chunking details')
+    return parser
+
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+
+    if not args.api_key:
+        parser.error("an API key is required (--api-key or OPENAI_API_KEY)")
+    try:
+        brd_paths = find_brds(args.inputs, args.recursive)
+    except FileNotFoundError as e:
+        parser.error(str(e))
+    if not brd_paths:
+        parser.error("no supported BRD files found (" + ', '.join(SUPPORTED_EXTENSIONS) + ")")
+    if args.output:
+        if len(brd_paths) > 1:
+            parser.error("--output takes a single BRD; use --output-dir for several")
+        try:
+            export_format(args.output)
+        except ValueError as e:
+            parser.error(str(e))
+
+    if args.previous and len(brd_paths) > 1:
+        parser.error("--previous takes a single BRD")
+    for path in args.previous or []:
+        if not os.path.isfile(path):
+            parser.error(f"No such file: {path}")
+
+    rpm_cap, tpm_cap = rate_limit_caps()
+    set_rate_limit_caps(args.rpm or rpm_cap, args.tpm or tpm_cap)
+    options = generation_options(args)
+    prompt_template = read_prompt_template()
+    extraction_cache = SQLiteCache('extraction_cache.sqlite', max_bytes=1024 * 1024 * 1024)
+
+    def run(brd_path):
+        output_path = args.output or output_path_for(brd_path, args.output_dir, args.format)
+        return process_brd(brd_path, output_path, args, options, prompt_template, extraction_cache)
+
+    log(f"Processing {len(brd_paths)} BRD(s), {min(args.jobs, len(brd_paths))} at a time")
+    started = time.monotonic()
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as executor:
+            results = list(executor.map(run, brd_paths))
+    finally:
+        close_openai_clients()
+
+    failed = [result for result in results if result['error']]
+    stats = rate_limit_stats()
+    log(
+        f"Done in {time.monotonic() - started:.1f}s: {len(results) - len(failed)} succeeded, {len(failed)} failed, "
+        f"{sum(result['test_cases'] for result in results)} test cases; "
+        f"{stats['requests']} API requests, {stats['retries']} retries"
+    )
+    for result in failed:
+        log(f"  FAILED {result['brd']}: {result['error']}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
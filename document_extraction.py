@@ -0,0 +1,505 @@
+"""
+Document Extraction
+Streamlit-free text extraction for BRD documents (Word, PDF, Excel, Text)
+"""
+
+import hashlib
+import io
+import os
+import re
+import multiprocessing
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from concurrent.futures.process import BrokenProcessPool
+
+import openpyxl
+import pandas as pd
+import PyPDF2
+from docx import Document
+from lxml import etree
+
+from text_normalization import PAGE_BREAK
+from upload_storage import open_mapped, hash_file
+
+SUPPORTED_EXTENSIONS = ['docx', 'pdf', 'xlsx', 'xls', 'txt']
+
+# Bump whenever an extractor's output changes so cached text is not reused
+EXTRACTOR_VERSION = '6'
+
+# WordprocessingML namespace used by word/document.xml and word/styles.xml
+W_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+_DOCX_BLOCK_TAGS = [f'{W_NS}p', f'{W_NS}tbl', f'{W_NS}tr', f'{W_NS}tc']
+_DOCX_TEXT_TAGS = [f'{W_NS}t', f'{W_NS}tab', f'{W_NS}br', f'{W_NS}cr', f'{W_NS}noBreakHyphen']
+
+# Upper bounds for a single PDF so very large documents stop gracefully
+PDF_MAX_PAGES = 1000
+PDF_MAX_TEXT_BYTES = 20 * 1024 * 1024
+
+# Rows taken from any single worksheet; field-spec workbooks can hold many thousands
+EXCEL_MAX_ROWS_PER_SHEET = 2000
+
+# Process pool shared by every session of the server process
+_extraction_pool = None
+_extraction_pool_size = 0
+
+
+def extract_text_from_docx(file):
+    """Extract text from Word document"""
+    doc = Document(file)
+    full_text = []
+    for para in doc.paragraphs:
+        full_text.append(para.text)
+
+    # Extract tables
+    for table in doc.tables:
+        for row in table.rows:
+            row_text = [cell.text for cell in row.cells]
+            full_text.append(' | '.join(row_text))
+
+    return '\n'.join(full_text)
+
+
+def _read_docx_heading_styles(docx_zip):
+    """Map paragraph style IDs to heading levels using word/styles.xml"""
+    try:
+        styles_root = etree.fromstring(docx_zip.read('word/styles.xml'))
+    except KeyError:
+        return {}
+
+    style_levels = {}
+    based_on = {}
+    for style in styles_root.iter(f'{W_NS}style'):
+        style_id = style.get(f'{W_NS}styleId')
+        if not style_id:
+            continue
+
+        level = None
+        name = style.find(f'{W_NS}name')
+        style_name = (name.get(f'{W_NS}val') or '') if name is not None else ''
+        heading_match = re.match(r'heading\s*(\d)$', style_name.strip(), re.IGNORECASE)
+        if heading_match:
+            level = int(heading_match.group(1))
+        elif style_name.strip().lower() == 'title':
+            level = 1
+        else:
+            outline = style.find(f'{W_NS}pPr/{W_NS}outlineLvl')
+            if outline is not None and outline.get(f'{W_NS}val', '').isdigit():
+                level = int(outline.get(f'{W_NS}val')) + 1
+
+        style_levels[style_id] = level
+        parent = style.find(f'{W_NS}basedOn')
+        if parent is not None:
+            based_on[style_id] = parent.get(f'{W_NS}val')
+
+    # Styles derived from a heading style inherit its level
+    for style_id in style_levels:
+        parent_id = based_on.get(style_id)
+        seen = set()
+        while style_levels[style_id] is None and parent_id and parent_id not in seen:
+            seen.add(parent_id)
+            style_levels[style_id] = style_levels.get(parent_id)
+            parent_id = based_on.get(parent_id)
+
+    # Body text sometimes carries outline levels 10+ meaning "not a heading"
+    return {style_id: level for style_id, level in style_levels.items() if level and level <= 9}
+
+
+def _docx_paragraph_text(paragraph):
+    """Return the visible text of a w:p element"""
+    parts = []
+    for node in paragraph.iter(*_DOCX_TEXT_TAGS):
+        if node.tag == f'{W_NS}t':
+            if node.text:
+                parts.append(node.text)
+        elif node.tag == f'{W_NS}tab':
+            # w:pPr/w:tabs holds tab stop definitions, not tab characters
+            if node.getparent().tag != f'{W_NS}tabs':
+                parts.append('\t')
+        elif node.tag == f'{W_NS}noBreakHyphen':
+            parts.append('-')
+        else:
+            parts.append('\n')
+    return ''.join(parts)
+
+
+def _is_toc_target(paragraph, style_id):
+    """Whether the table of contents links to this paragraph (a _Toc bookmark that is not a figure caption)"""
+    if style_id and 'caption' in style_id.lower():
+        return False
+    return any((bookmark.get(f'{W_NS}name') or '').startswith('_Toc')
+               for bookmark in paragraph.iter(f'{W_NS}bookmarkStart'))
+
+
+def _docx_paragraph_heading_level(paragraph, heading_styles):
+    """Return the heading level of a w:p element, or None for body text.
+
+    A direct outline level wins over the paragraph style's level. A
+    paragraph with neither that the table of contents still links to (a
+    heading typed in some other style) is a top-level heading.
+    """
+    paragraph_props = paragraph.find(f'{W_NS}pPr')
+    outline = paragraph_props.find(f'{W_NS}outlineLvl') if paragraph_props is not None else None
+    if outline is not None and outline.get(f'{W_NS}val', '').isdigit():
+        level = int(outline.get(f'{W_NS}val')) + 1
+        return level if level <= 9 else None
+
+    style = paragraph_props.find(f'{W_NS}pStyle') if paragraph_props is not None else None
+    style_id = style.get(f'{W_NS}val') if style is not None else None
+    if style_id in heading_styles:
+        return heading_styles[style_id]
+    return 1 if _is_toc_target(paragraph, style_id) else None
+
+
+def iter_docx_blocks(file):
+    """Yield the lines of a Word document in document order.
+
+    Streams word/document.xml with lxml's iterparse instead of building the
+    python-docx object model. Headings are prefixed with '#' per level and
+    every table row is emitted where the table sits, as 'cell | cell'.
+    """
+    with zipfile.ZipFile(file) as docx_zip:
+        heading_styles = _read_docx_heading_styles(docx_zip)
+
+        with docx_zip.open('word/document.xml') as document_xml:
+            table_depth = 0
+            row_cells = None
+            cell_parts = None
+
+            events = etree.iterparse(document_xml, events=('start', 'end'), tag=_DOCX_BLOCK_TAGS)
+            for event, elem in events:
+                tag = elem.tag
+
+                if event == 'start':
+                    if tag == f'{W_NS}tbl':
+                        table_depth += 1
+                    elif table_depth == 1 and tag == f'{W_NS}tr':
+                        row_cells = []
+                    elif table_depth == 1 and tag == f'{W_NS}tc':
+                        cell_parts = []
+                    continue
+
+                if tag == f'{W_NS}p':
+                    text = _docx_paragraph_text(elem)
+                    if table_depth:
+                        # Nested table text is folded into the outer cell
+                        if cell_parts is not None and text.strip():
+                            cell_parts.append(' '.join(text.split()))
+                    elif text.strip():
+                        level = _docx_paragraph_heading_level(elem, heading_styles)
+                        yield f"{'#' * level} {text.strip()}" if level else text.strip()
+                    # Cleared so enclosing elements (text boxes, cells) don't repeat it
+                    elem.clear()
+                elif tag == f'{W_NS}tc' and table_depth == 1:
+                    row_cells.append(' '.join(cell_parts))
+                    cell_parts = None
+                elif tag == f'{W_NS}tr' and table_depth == 1:
+                    if any(row_cells):
+                        yield ' | '.join(row_cells)
+                    row_cells = None
+                    elem.clear()
+                elif tag == f'{W_NS}tbl':
+                    table_depth -= 1
+
+                # Drop finished blocks outside tables so memory stays flat on large documents;
+                # that includes blocks nested in content controls (w:sdt) and text boxes
+                parent = elem.getparent()
+                if parent is not None and not table_depth and tag in (f'{W_NS}p', f'{W_NS}tbl'):
+                    elem.clear()
+                    while elem.getprevious() is not None:
+                        del parent[0]
+
+
+def extract_text_from_docx_streaming(file):
+    """Extract text from Word document in document order without python-docx"""
+    return '\n'.join(iter_docx_blocks(file))
+
+
+def iter_pdf_pages(file, max_pages=None, max_bytes=None, stats=None):
+    """Yield the text of each PDF page as it is extracted.
+
+    Extraction stops cleanly once max_pages pages or max_bytes bytes of UTF-8
+    text have been produced, so a huge document cannot exhaust the worker.
+    If a stats dict is given it is filled with pages_read, bytes_read,
+    total_pages and truncated.
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'pages_read': 0, 'bytes_read': 0, 'total_pages': 0, 'truncated': False})
+
+    pdf_reader = PyPDF2.PdfReader(file)
+    stats['total_pages'] = len(pdf_reader.pages)
+
+    for page_index in range(stats['total_pages']):
+        if max_pages is not None and page_index >= max_pages:
+            stats['truncated'] = True
+            return
+
+        page_text = pdf_reader.pages[page_index].extract_text() or ''
+        page_bytes = len(page_text.encode('utf-8'))
+
+        if max_bytes is not None and stats['bytes_read'] + page_bytes > max_bytes:
+            stats['truncated'] = True
+            return
+
+        stats['pages_read'] += 1
+        stats['bytes_read'] += page_bytes
+        yield page_text
+
+
+def extract_text_from_pdf(file, max_pages=PDF_MAX_PAGES, max_bytes=PDF_MAX_TEXT_BYTES):
+    """Extract text from PDF document"""
+    stats = {}
+    full_text = io.StringIO()
+    for page_number, page_text in enumerate(iter_pdf_pages(file, max_pages, max_bytes, stats)):
+        if page_number:
+            # Page breaks let the normalizer spot running headers and footers
+            full_text.write(PAGE_BREAK + '\n')
+        full_text.write(page_text)
+
+    if stats['truncated']:
+        full_text.write(
+            f"\n[PDF extraction stopped after {stats['pages_read']} of {stats['total_pages']} pages: "
+            f"size limit reached]"
+        )
+    return full_text.getvalue()
+
+
+def extract_text_from_excel(file):
+    """Extract text from Excel document"""
+    df = pd.read_excel(file, sheet_name=None)  # Read all sheets
+    full_text = []
+    for sheet_name, sheet_df in df.items():
+        full_text.append(f"\n--- Sheet: {sheet_name} ---\n")
+        full_text.append(sheet_df.to_string())
+    return '\n'.join(full_text)
+
+
+def _format_excel_cell(value, delimiter):
+    """Render one cell value compactly on a single line"""
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    elif hasattr(value, 'isoformat'):
+        value = value.isoformat()
+        if value.endswith('T00:00:00'):
+            value = value[:-9]
+    text = ' '.join(str(value).split())
+    return text.replace(delimiter, '/')
+
+
+def iter_excel_sheets(file, max_rows_per_sheet=EXCEL_MAX_ROWS_PER_SHEET, delimiter='|'):
+    """Yield (sheet_name, rows, truncated) for each worksheet of an .xlsx file.
+
+    The workbook is opened read-only so openpyxl streams rows from the XML
+    instead of loading whole sheets. Empty rows are skipped as they are read,
+    at most max_rows_per_sheet non-empty rows are kept per sheet, and columns
+    that are empty in every kept row are dropped.
+    """
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    try:
+        for worksheet in workbook.worksheets:
+            rows = []
+            truncated = False
+            for values in worksheet.iter_rows(values_only=True):
+                cells = [_format_excel_cell(value, delimiter) for value in values]
+                if not any(cells):
+                    continue
+                if len(rows) >= max_rows_per_sheet:
+                    truncated = True
+                    break
+                rows.append(cells)
+
+            width = max((len(cells) for cells in rows), default=0)
+            used_columns = [
+                column for column in range(width)
+                if any(column < len(cells) and cells[column] for cells in rows)
+            ]
+            rows = [
+                [cells[column] if column < len(cells) else '' for column in used_columns]
+                for cells in rows
+            ]
+            yield worksheet.title, rows, truncated
+    finally:
+        workbook.close()
+
+
+def extract_text_from_excel_streaming(file, max_rows_per_sheet=EXCEL_MAX_ROWS_PER_SHEET, delimiter='|'):
+    """Extract text from .xlsx workbook as compact delimiter-separated rows"""
+    full_text = []
+    for sheet_name, rows, truncated in iter_excel_sheets(file, max_rows_per_sheet, delimiter):
+        full_text.append(f"\n--- Sheet: {sheet_name} ---\n")
+        full_text.extend(delimiter.join(cells) for cells in rows)
+        if truncated:
+            full_text.append(f"[Sheet truncated after {max_rows_per_sheet} rows]")
+    return '\n'.join(full_text)
+
+
+def get_file_extension(file_name):
+    """Return the lower-case extension of a file name"""
+    return file_name.split('.')[-1].lower()
+
+
+@contextmanager
+def _open_source(source):
+    """Open a document source: raw bytes, or the path of a spooled upload (memory-mapped)"""
+    if isinstance(source, (bytes, bytearray)):
+        yield io.BytesIO(source)
+    else:
+        with open_mapped(source) as mapped:
+            yield mapped
+
+
+def extract_document(file_name, source):
+    """Extract text from one document given its name and raw bytes or spooled path.
+
+    Returns a result dict with 'name', 'text' and 'error' keys. Errors are
+    captured per file so one bad upload never hides the others.
+    """
+    result = {'name': file_name, 'text': None, 'error': None}
+    file_extension = get_file_extension(file_name)
+
+    if file_extension not in SUPPORTED_EXTENSIONS:
+        result['error'] = f"Unsupported file type: {file_extension}"
+        result['unsupported'] = True
+        return result
+
+    try:
+        with _open_source(source) as stream:
+            if file_extension == 'docx':
+                try:
+                    result['text'] = extract_text_from_docx_streaming(stream)
+                except (zipfile.BadZipFile, KeyError, etree.XMLSyntaxError):
+                    # Unusual packages (e.g. renamed main part) still go through python-docx
+                    stream.seek(0)
+                    result['text'] = extract_text_from_docx(stream)
+            elif file_extension == 'pdf':
+                result['text'] = extract_text_from_pdf(stream)
+            elif file_extension == 'xlsx':
+                result['text'] = extract_text_from_excel_streaming(stream)
+            elif file_extension == 'xls':
+                # Legacy binary workbooks are not readable by openpyxl
+                result['text'] = extract_text_from_excel(stream)
+            elif file_extension == 'txt':
+                result['text'] = stream.read().decode('utf-8')
+    except Exception as e:
+        result['error'] = str(e)
+
+    return result
+
+
+def _get_extraction_pool(max_workers):
+    """Return the shared extraction process pool, recreating it if the size changed"""
+    global _extraction_pool, _extraction_pool_size
+
+    if _extraction_pool is None or _extraction_pool_size != max_workers:
+        _discard_extraction_pool()
+        # Spawn instead of fork: the Streamlit server is multi-threaded
+        _extraction_pool = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn')
+        )
+        _extraction_pool_size = max_workers
+
+    return _extraction_pool
+
+
+def _discard_extraction_pool():
+    """Drop the shared extraction pool so the next call starts a fresh one"""
+    global _extraction_pool, _extraction_pool_size
+
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False)
+    _extraction_pool = None
+    _extraction_pool_size = 0
+
+
+def extraction_cache_key(file_name, source, content_hash=None):
+    """Build the extraction cache key from the file content, type and extractor version.
+
+    content_hash is the source's sha256 when the caller already has it
+    (spool_uploads records one per upload), which saves re-reading the file.
+    """
+    if not content_hash:
+        if isinstance(source, (bytes, bytearray)):
+            content_hash = hashlib.sha256(source).hexdigest()
+        else:
+            content_hash = hash_file(source)
+    return f"{content_hash}:{get_file_extension(file_name)}:v{EXTRACTOR_VERSION}"
+
+
+def _extract_uncached(documents, parallel, max_workers):
+    """Extract (file_name, source) pairs, in a process pool when parallel is set"""
+    if not parallel or len(documents) < 2:
+        return [extract_document(name, source) for name, source, *_ in documents]
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    pool = _get_extraction_pool(max_workers)
+    futures = [pool.submit(extract_document, name, source) for name, source, *_ in documents]
+
+    results = []
+    for (name, *_), future in zip(documents, futures):
+        try:
+            results.append(future.result())
+        except BrokenProcessPool as e:
+            # A worker died (e.g. out of memory); the pool is unusable, rebuild it next call
+            _discard_extraction_pool()
+            results.append({'name': name, 'text': None, 'error': f"Extraction worker failed: {str(e)}"})
+        except Exception as e:
+            results.append({'name': name, 'text': None, 'error': f"Extraction worker failed: {str(e)}"})
+
+    return results
+
+
+def extract_documents(documents, parallel=False, max_workers=None, cache=None):
+    """Extract text from a list of (file_name, source) pairs.
+
+    A source is either the raw bytes or the path of a spooled upload; paths
+    keep large files off the heap and are cheap to hand to worker
+    processes. A document may carry its content's sha256 as a third item,
+    so the cache lookup does not hash the file again. With parallel=True
+    the files are parsed in a process pool. When a SQLiteCache is given,
+    files whose content was extracted before are served from it and never
+    parsed. Results are always returned in the same order as the input
+    documents.
+    """
+    documents = list(documents)
+    results = [None] * len(documents)
+    cache_keys = {}
+    pending = []
+
+    for index, (name, source, *content_hash) in enumerate(documents):
+        if cache is not None and get_file_extension(name) in SUPPORTED_EXTENSIONS:
+            cache_keys[index] = extraction_cache_key(name, source, *content_hash)
+            cached_text = cache.get_text(cache_keys[index])
+            if cached_text is not None:
+                results[index] = {'name': name, 'text': cached_text, 'error': None, 'cached': True}
+                continue
+        pending.append(index)
+
+    extracted = _extract_uncached([documents[index] for index in pending], parallel, max_workers)
+
+    for index, result in zip(pending, extracted):
+        results[index] = result
+        if index in cache_keys and not result.get('error'):
+            cache.set_text(cache_keys[index], result['text'])
+
+    return results
+
+
+def combine_extracted_text(results):
+    """Combine successful extraction results into one text with FILE banners"""
+    combined_text = []
+
+    for result in results:
+        if result.get('error'):
+            continue
+        combined_text.append(f"\n{'='*80}\n")
+        combined_text.append(f"FILE: {result['name']}\n")
+        combined_text.append(f"{'='*80}\n")
+        combined_text.append(result['text'])
+
+    return '\n'.join(combined_text)
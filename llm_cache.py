@@ -0,0 +1,178 @@
+"""
+LLM Cache
+On-disk cache of chat completion responses keyed by the full request
+"""
+
+import hashlib
+import json
+import threading
+
+from openai.types.chat import ChatCompletion
+
+from rate_limits import create_completion, create_completion_async
+from sqlite_cache import SQLiteCache
+
+LLM_CACHE_FILE = 'llm_response_cache.sqlite'
+LLM_CACHE_MAX_BYTES = 256 * 1024 * 1024
+LLM_CACHE_TTL_SECONDS = 7 * 24 * 60 * 60
+
+# Bump when the stored response format or the key changes
+LLM_CACHE_VERSION = '2'
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+# Token usage of API calls (not cache hits) in this process
+_usage_totals = {'calls': 0, 'prompt_tokens': 0, 'cached_tokens': 0, 'completion_tokens': 0}
+_usage_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide response cache, creating it on first use"""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = SQLiteCache(LLM_CACHE_FILE, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS)
+        return _response_cache
+
+
+def response_cache_key(params, base_url=None):
+    """Key over the endpoint and every request argument: model, messages, temperature, max_tokens, ...
+
+    The endpoint keeps a mock server's canned replies apart from the real
+    API's. Streamed and non-streamed requests share a key, since they
+    produce the same response.
+    """
+    params = {name: value for name, value in params.items() if name != 'stream'}
+    params['__endpoint__'] = str(base_url or '')
+    canonical = json.dumps(params, sort_keys=True, ensure_ascii=False, separators=(',', ':'), default=str)
+    return f"v{LLM_CACHE_VERSION}:{hashlib.sha256(canonical.encode('utf-8')).hexdigest()}"
+
+
+def _usage_field(value, name):
+    """Read a usage field from a model or, for fields this SDK version does not know, a plain dict"""
+    if value is None:
+        return None
+    if isinstance(value, dict):
+        return value.get(name)
+    return getattr(value, name, None)
+
+
+def record_usage(usage):
+    """Add one API response's usage to the process totals.
+
+    cached_tokens is the part of the prompt the provider served from its
+    prompt cache (usage.prompt_tokens_details.cached_tokens); responses
+    without the field count as uncached.
+    """
+    if usage is None:
+        return
+    cached_tokens = _usage_field(_usage_field(usage, 'prompt_tokens_details'), 'cached_tokens')
+    with _usage_lock:
+        _usage_totals['calls'] += 1
+        _usage_totals['prompt_tokens'] += _usage_field(usage, 'prompt_tokens') or 0
+        _usage_totals['cached_tokens'] += cached_tokens or 0
+        _usage_totals['completion_tokens'] += _usage_field(usage, 'completion_tokens') or 0
+
+
+def usage_totals():
+    """Copy of the token usage recorded so far"""
+    with _usage_lock:
+        return dict(_usage_totals)
+
+
+def _load(cache, key):
+    cached = cache.get_text(key)
+    return ChatCompletion.model_validate_json(cached) if cached is not None else None
+
+
+def _store(cache, key, completion):
+    """Store a completion unless it was cut off at max_tokens; a truncated reply would fail the same way every rerun"""
+    if completion.choices and all(choice.finish_reason != 'length' for choice in completion.choices):
+        cache.set_text(key, completion.model_dump_json())
+
+
+def cached_completion(client, params, cache=None, refresh=False):
+    """client.chat.completions.create(**params) through the response cache.
+
+    With cache=None the call goes straight to the API. refresh=True skips
+    the lookup but still stores the fresh response. API calls go through
+    the rate limiter (see rate_limits.create_completion).
+    """
+    if cache is None:
+        completion = create_completion(client, params)
+        record_usage(completion.usage)
+        return completion
+
+    key = response_cache_key(params, getattr(client, 'base_url', None))
+    completion = None if refresh else _load(cache, key)
+    if completion is None:
+        completion = create_completion(client, params)
+        record_usage(completion.usage)
+        _store(cache, key, completion)
+    return completion
+
+
+async def cached_completion_async(client, params, cache=None, refresh=False):
+    """Async counterpart of cached_completion for AsyncOpenAI clients"""
+    if cache is None:
+        completion = await create_completion_async(client, params)
+        record_usage(completion.usage)
+        return completion
+
+    key = response_cache_key(params, getattr(client, 'base_url', None))
+    completion = None if refresh else _load(cache, key)
+    if completion is None:
+        completion = await create_completion_async(client, params)
+        record_usage(completion.usage)
+        _store(cache, key, completion)
+    return completion
+
+
+def iter_completion_stream(client, params, cache=None, refresh=False):
+    """Stream a chat completion through the response cache.
+
+    Yields (text_delta, finish_reason) pairs; finish_reason is None until
+    the final piece. A cache hit is replayed as a single piece, and a
+    finished stream is stored like a regular completion.
+    """
+    key = response_cache_key(params, getattr(client, 'base_url', None)) if cache is not None else None
+    if key is not None and not refresh:
+        completion = _load(cache, key)
+        if completion is not None:
+            choice = completion.choices[0]
+            yield choice.message.content or '', choice.finish_reason
+            return
+
+    parts = []
+    finish_reason = None
+    last_chunk = None
+    usage = None
+    # Ask for a final usage chunk; this SDK version has no stream_options argument
+    stream_params = dict(params, stream=True, extra_body={'stream_options': {'include_usage': True}})
+    for chunk in create_completion(client, stream_params):
+        last_chunk = chunk
+        usage = getattr(chunk, 'usage', None) or usage
+        if not chunk.choices:
+            continue
+        choice = chunk.choices[0]
+        delta = choice.delta.content or ''
+        finish_reason = choice.finish_reason
+        if delta or finish_reason:
+            parts.append(delta)
+            yield delta, finish_reason
+    record_usage(usage)
+
+    if key is not None and finish_reason is not None:
+        _store(cache, key, ChatCompletion.model_validate({
+            'id': last_chunk.id,
+            'object': 'chat.completion',
+            'created': last_chunk.created,
+            'model': last_chunk.model,
+            'choices': [{
+                'index': 0,
+                'finish_reason': finish_reason,
+                'message': {'role': 'assistant', 'content': ''.join(parts)},
+            }],
+            'usage': usage,
+        }))
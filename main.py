@@ -5,7 +5,8 @@ Streamlit application to generate test cases from BRD documents using AI
 
 import streamlit as st
 import pandas as pd
-from openai import OpenAI
+from openai_clients import DEFAULT_BASE_URL, get_openai_client
+from llm_cache import cached_completion, get_response_cache
 from docx import Document
 import PyPDF2
 import io
@@ -66,6 +67,18 @@ def load_prompt():
         st.error("Test_Case_Generation_Prompt.md not found. Please ensure it's in the same directory.")
         return None
 
+def response_cache_settings():
+    """Response cache and refresh flag for AI calls, as chosen in the sidebar"""
+    return get_response_cache(), st.session_state.get('bypass_llm_cache', False)
+
+def show_response_cache_stats(placeholder):
+    """Render response cache counters into a sidebar placeholder"""
+    stats = get_response_cache().stats()
+    placeholder.caption(
+        f"💾 Response cache: {stats['hits']} hits · {stats['misses']} misses · "
+        f"{stats['entries']} entries ({stats['bytes'] / 1024 / 1024:.1f} MB)"
+    )
+
 # Document processing functions
 def extract_text_from_docx(file):
     """Extract text from Word document"""
@@ -131,11 +144,11 @@ def process_uploaded_files(uploaded_files):
     
     return '\n'.join(combined_text)
 
-def generate_test_cases_with_ai(brd_text, prompt_template, api_key, options):
+def generate_test_cases_with_ai(brd_text, prompt_template, api_key, options, base_url=None):
     """Generate test cases using OpenAI GPT-4 API"""
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(api_key, base_url)
     except Exception as e:
         st.error(f"Error initializing OpenAI client: {str(e)}")
         return [], ""
@@ -243,7 +256,7 @@ Start generating now:"""
     
     with st.spinner('🤖 AI is analyzing BRD and generating test cases...'):
         try:
-            response = client.chat.completions.create(
+            response = cached_completion(client, dict(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are an expert QA Test Analyst specialized in creating comprehensive test cases from Business Requirements Documents."},
@@ -252,7 +265,7 @@ Start generating now:"""
                 max_tokens=4096,
                 temperature=0.3,
                 response_format={"type": "json_object"}
-            )
+            ), *response_cache_settings())
             
             response_text = response.choices[0].message.content
             
@@ -326,11 +339,11 @@ def encode_image_to_base64(image_file):
         st.error(f"Error encoding image: {str(e)}")
         return None
 
-def analyze_ui_screenshot(image_file, screen_name, api_key):
+def analyze_ui_screenshot(image_file, screen_name, api_key, base_url=None):
     """Analyze UI screenshot using GPT-4 Vision to extract UI elements"""
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(api_key, base_url)
     except Exception as e:
         st.error(f"Error initializing OpenAI client for UI analysis: {str(e)}")
         return []
@@ -368,7 +381,7 @@ Be thorough and extract ALL interactive elements you can see. Return the JSON no
 
     try:
         with st.spinner(f'🔍 Analyzing {screen_name}...'):
-            response = client.chat.completions.create(
+            response = cached_completion(client, dict(
                 model="gpt-4-vision-preview",
                 messages=[
                     {
@@ -387,7 +400,7 @@ Be thorough and extract ALL interactive elements you can see. Return the JSON no
                 ],
                 max_tokens=2000,
                 temperature=0.1
-            )
+            ), *response_cache_settings())
             
             response_text = response.choices[0].message.content
             
@@ -428,11 +441,11 @@ Be thorough and extract ALL interactive elements you can see. Return the JSON no
         st.error(f"Error analyzing screenshot: {str(e)}")
         return None
 
-def map_ui_elements_to_test_cases(ui_elements, test_cases, screen_name, api_key):
+def map_ui_elements_to_test_cases(ui_elements, test_cases, screen_name, api_key, base_url=None):
     """Map UI elements to test cases using AI"""
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(api_key, base_url)
     except Exception as e:
         st.error(f"Error initializing OpenAI client for UI mapping: {str(e)}")
         return test_cases
@@ -485,7 +498,7 @@ Analyze now:"""
 
     try:
         with st.spinner(f'🔗 Mapping UI elements to test cases...'):
-            response = client.chat.completions.create(
+            response = cached_completion(client, dict(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are an expert QA analyst specialized in UI test coverage analysis."},
@@ -494,7 +507,7 @@ Analyze now:"""
                 max_tokens=3000,
                 temperature=0.2,
                 response_format={"type": "json_object"}
-            )
+            ), *response_cache_settings())
             
             result = json.loads(response.choices[0].message.content)
             return result
@@ -503,11 +516,11 @@ Analyze now:"""
         st.error(f"Error mapping elements: {str(e)}")
         return None
 
-def analyze_requirements_coverage(brd_text, test_cases, api_key):
+def analyze_requirements_coverage(brd_text, test_cases, api_key, base_url=None):
     """Analyze coverage of BRD requirements by generated test cases using AI"""
     
     try:
-        client = OpenAI(api_key=api_key)
+        client = get_openai_client(api_key, base_url)
     except Exception as e:
         st.error(f"Error initializing OpenAI client for coverage analysis: {str(e)}")
         return "Error initializing OpenAI client"
@@ -560,7 +573,7 @@ Analyze now:"""
     
     try:
         with st.spinner('🔍 Analyzing requirements coverage...'):
-            response = client.chat.completions.create(
+            response = cached_completion(client, dict(
                 model="gpt-4-turbo-preview",
                 messages=[
                     {"role": "system", "content": "You are an expert QA analyst specialized in requirements traceability and coverage analysis."},
@@ -569,7 +582,7 @@ Analyze now:"""
                 max_tokens=4096,
                 temperature=0.2,
                 response_format={"type": "json_object"}
-            )
+            ), *response_cache_settings())
             
             result = json.loads(response.choices[0].message.content)
             return result
@@ -748,6 +761,15 @@ def main():
             help="Enter your OpenAI API key (from platform.openai.com)"
         )
         
+        # Kept per session (widget state) and passed to every call; never shared across sessions
+        base_url = st.text_input(
+            "API base URL (optional)",
+            value=DEFAULT_BASE_URL or "",
+            key="base_url_input",
+            help="Leave empty for api.openai.com, or point at an OpenAI-compatible server such as "
+                 "mock_openai_server.py (http://127.0.0.1:8765/v1) for offline and load testing"
+        ).strip() or None
+        
         st.divider()
         
         st.subheader("Generation Options")
@@ -833,6 +855,20 @@ def main():
         
         st.divider()
         
+        st.subheader("AI Requests")
+        
+        bypass_llm_cache = st.checkbox(
+            "Bypass AI response cache",
+            value=False,
+            key="bypass_llm_cache",
+            help="Always call the API for identical requests; fresh responses still replace cached ones"
+        )
+        
+        # Filled in at the end of the run so the counters include this run's calls
+        response_cache_stats = st.empty()
+        
+        st.divider()
+        
         st.subheader("📚 Framework Info")
         st.info("""
         This app generates comprehensive test cases for ANY domain:
@@ -915,7 +951,7 @@ def main():
                     
                     # Generate test cases
                     test_cases, raw_response = generate_test_cases_with_ai(
-                        brd_text, prompt_template, api_key, options
+                        brd_text, prompt_template, api_key, options, base_url
                     )
                     
                     if test_cases:
@@ -1097,7 +1133,8 @@ def main():
                     coverage_result = analyze_requirements_coverage(
                         st.session_state['brd_text'],
                         st.session_state['test_cases'],
-                        api_key
+                        api_key,
+                        base_url
                     )
                     
                     if coverage_result:
@@ -1408,7 +1445,7 @@ COVERED REQUIREMENTS ({covered_count})
                             screenshot.seek(0)
                             
                             # Step 1: Extract UI elements
-                            ui_analysis = analyze_ui_screenshot(screenshot, screen_name, api_key)
+                            ui_analysis = analyze_ui_screenshot(screenshot, screen_name, api_key, base_url)
                             
                             if ui_analysis and 'elements' in ui_analysis:
                                 elements = ui_analysis['elements']
@@ -1418,7 +1455,8 @@ COVERED REQUIREMENTS ({covered_count})
                                     elements,
                                     st.session_state['test_cases'],
                                     screen_name,
-                                    api_key
+                                    api_key,
+                                    base_url
                                 )
                                 
                                 if mapping:
@@ -1794,6 +1832,8 @@ Not Covered: {total_uncovered}
         - Review the Test_Case_Generation_Prompt.md
         - Refer to the CASA example (TC_CASA_For AI.xlsx)
         """)
+    
+    show_response_cache_stats(response_cache_stats)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,510 @@
+"""
+Mock OpenAI Server
+Local OpenAI-compatible stand-in for /v1/chat/completions (text and vision) that returns schema-valid
+canned responses for every prompt the app sends, with configurable latency, token rate, truncation,
+rate limits and injected 429/500 errors. Meant for load tests, benchmarks and offline runs.
+
+Usage:
+    python mock_openai_server.py --port 8765
+    python mock_openai_server.py --latency 1.5 --tokens-per-second 60 --rpm 60 --tpm 150000 --rate-limit-rate 0.1
+
+Then set the app's "API base URL" (or OPENAI_BASE_URL) to http://127.0.0.1:8765/v1; any API key works.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from token_budget import estimate_message_tokens, estimate_tokens
+
+DEFAULT_PORT = 8765
+
+DEFAULT_SETTINGS = {
+    'latency': 0.2,                 # seconds before the first token
+    'tokens_per_second': 0,         # output rate; 0 returns the whole response at once
+    'max_output_tokens': None,      # truncate every response at this many tokens (finish_reason 'length')
+    'rpm': 10000,                   # requests per minute before 429s
+    'tpm': 2000000,                 # tokens per minute (prompt + max_tokens) before 429s
+    'rate_limit_rate': 0.0,         # probability of an injected 429
+    'error_rate': 0.0,              # probability of an injected 500
+    'requirements': 40,             # requirements returned for a whole-BRD extraction
+    'seed': None,
+}
+
+# Prompt caching kicks in from 1024 tokens and grows in 128-token steps
+PROMPT_CACHE_MIN_TOKENS = 1024
+PROMPT_CACHE_STEP_TOKENS = 128
+PROMPT_CACHE_ENTRIES = 64
+
+MODULES = ['Account Opening', 'Customer Onboarding', 'Deposits', 'Approvals', 'Reports', 'User Management']
+REQUIREMENT_TYPES = ['UI', 'Workflow', 'Data', 'Integration', 'Report', 'Security', 'Business Rule', 'Calculation']
+TEST_CASE_TYPES = ['Field Validation', 'Workflow', 'Workflow', 'Negative Test']
+ELEMENT_TYPES = ['input_field', 'input_field', 'button', 'dropdown', 'checkbox', 'link']
+ELEMENT_LABELS = ['Customer Name', 'Email Address', 'Mobile Number', 'Date of Birth', 'Account Type',
+                  'Branch', 'Initial Deposit', 'Accept Terms', 'Submit', 'Cancel']
+
+_SECTION_RE = re.compile(r'\[(SEC-[0-9A-Za-z.-]+)\]')
+_TEST_CASE_LINE_RE = re.compile(r'^- (TC_\w+):', re.M)
+_REQUIREMENT_LINE_RE = re.compile(r'^- (REQ-\w+)[: ]', re.M)
+_BATCH_LINE_RE = re.compile(r'^- (REQ-\w+) \[(.*?)\] (.*?) \(Type: (.*?)\)', re.M)
+_ELEMENT_LINE_RE = re.compile(r'^- (\w+): (.*?) \(Required:', re.M)
+
+
+def _message_text(message):
+    content = message.get('content')
+    if isinstance(content, list):
+        return '\n'.join(part.get('text', '') for part in content if part.get('type') == 'text')
+    return content or ''
+
+
+def _has_image(messages):
+    return any(isinstance(m.get('content'), list) and any(p.get('type') == 'image_url' for p in m['content'])
+               for m in messages)
+
+
+def request_kind(messages):
+    """Which app prompt a request carries: screenshot, ui_mapping, coverage, requirements, test_cases or text"""
+    if _has_image(messages):
+        return 'screenshot'
+    # Only the system message and the start of the prompt are checked, so BRD text cannot mislead it
+    text = '\n'.join(_message_text(m)[:400] for m in messages[:2])
+    if 'mapping UI elements to test cases' in text:
+        return 'ui_mapping'
+    if 'requirements coverage analysis' in text:
+        return 'coverage'
+    if 'requirements extraction' in text:
+        return 'requirements'
+    if '"test_cases"' in text or 'test cases' in text.lower():
+        return 'test_cases'
+    return 'text'
+
+
+def _requirement(number, rng, module=None, title=None, requirement_type=None, section=None):
+    requirement = {
+        'requirement_id': f"REQ-{number:03d}",
+        'requirement_type': requirement_type or rng.choice(REQUIREMENT_TYPES),
+        'module': module or rng.choice(MODULES),
+        'title': title or f"Requirement {number} - {rng.choice(ELEMENT_LABELS)} handling" + (f" ({section})" if section else ''),
+        'description': f"The system shall support requirement {number} with validation, error handling and audit logging.",
+        'priority': rng.choice(['Critical', 'High', 'Medium', 'Low']),
+        'testable': True,
+    }
+    if section:
+        requirement['source_section'] = section
+    return requirement
+
+
+def requirements_response(text, rng, settings):
+    """Requirements JSON; chunk prompts get requirements citing their [SEC-....] markers"""
+    excerpt = text.split('## BRD EXCERPT', 1)[1] if '## BRD EXCERPT' in text else ''
+    sections = list(dict.fromkeys(_SECTION_RE.findall(excerpt)))
+    if excerpt:
+        requirements = [_requirement(n + 1, rng, section=section)
+                        for n, section in enumerate(section for section in sections for _ in range(2))]
+        if not requirements:
+            requirements = [_requirement(n + 1, rng) for n in range(5)]
+    else:
+        requirements = [_requirement(n + 1, rng) for n in range(settings['requirements'])]
+    return {'total_requirements': len(requirements), 'requirements': requirements}
+
+
+def _test_case(number, rng, requirement=None):
+    module = requirement['module'] if requirement else rng.choice(MODULES)
+    title = requirement['title'] if requirement else f"{rng.choice(ELEMENT_LABELS)} behaviour"
+    kind = rng.choice(TEST_CASE_TYPES)
+    test_case = {
+        'product_name': 'Banking Application',
+        'process_category': module,
+        'business_process_id': f"BP_{(number - 1) // 5 + 1:03d}",
+        'business_process': f"{module} process",
+        'scenario_id': f"SC_{number:03d}",
+        'scenario_description': f"Verify {title.lower()}",
+        'category': 'Negative' if kind == 'Negative Test' else 'Positive',
+        'importance': rng.choice(['High', 'Medium', 'Low']),
+        'test_case_id': f"TC_{number:03d}",
+        'tc_module': f"{module} - {kind}",
+        'test_condition': f"Verify {title} ({kind.lower()}) - case {number}",
+        'prerequisite': 'User is logged in with the required role',
+        'test_case_description': (
+            f"1. Navigate to {module}\n2. Exercise '{title}' with representative data\n"
+            f"3. Submit the form\n4. Observe the system response"
+        ),
+        'expected_result': f"The system handles '{title}' as specified and records an audit entry",
+    }
+    if requirement and requirement.get('requirement_id'):
+        test_case['requirement_id'] = requirement['requirement_id']
+    return test_case
+
+
+def test_cases_response(messages, rng):
+    """Test case JSON sized by the prompt's count, continuing after earlier cases for follow-ups"""
+    first = '\n'.join(_message_text(m) for m in messages if m.get('role') == 'user')
+    last = _message_text(messages[-1])
+    batch = [{'requirement_id': rid, 'module': module, 'title': title, 'requirement_type': rtype}
+             for rid, module, title, rtype in _BATCH_LINE_RE.findall(first)]
+
+    count = None
+    for pattern in (r'TEST CASE COUNT: (\d+)', r'Generate EXACTLY (\d+) test cases'):
+        match = re.search(pattern, first)
+        if match:
+            count = int(match.group(1))
+            break
+    count = count or len(batch) or 35
+
+    start = 1
+    if 'Test cases already generated:' in last:
+        start = len(_TEST_CASE_LINE_RE.findall(last)) + 1
+        remaining = re.search(r'About (\d+) test cases are still needed', last)
+        count = start - 1 + int(remaining.group(1)) if remaining else count
+
+    test_cases = [_test_case(number, rng, batch[(number - 1) % len(batch)] if batch else None)
+                  for number in range(start, max(start, count + 1))]
+    return {'test_cases': test_cases}
+
+
+def screenshot_response(rng):
+    labels = rng.sample(ELEMENT_LABELS, 6)
+    return {
+        'screen_type': rng.choice(['form', 'login', 'dashboard']),
+        'elements': [
+            {
+                'type': 'button' if label in ('Submit', 'Cancel') else rng.choice(ELEMENT_TYPES),
+                'label': label,
+                'required': rng.random() < 0.5,
+                'placeholder': f"Enter {label.lower()}",
+                'description': f"{label} control",
+            }
+            for label in labels
+        ],
+    }
+
+
+def ui_mapping_response(text, rng):
+    test_case_ids = _TEST_CASE_LINE_RE.findall(text)
+    elements = _ELEMENT_LINE_RE.findall(text.split('**UI ELEMENTS FOUND:**', 1)[-1])
+    mappings = []
+    for element_type, label in elements:
+        covered_by = rng.sample(test_case_ids, min(len(test_case_ids), rng.randint(0, 2)))
+        mappings.append({
+            'element_type': element_type,
+            'element_label': label,
+            'covered_by': covered_by,
+            'coverage_level': 'Full' if len(covered_by) > 1 else 'Partial' if covered_by else 'None',
+            'confidence': round(rng.uniform(0.6, 0.98), 2),
+            'missing_scenarios': [] if covered_by else [f"Validate {label} input"],
+        })
+    covered = sum(1 for mapping in mappings if mapping['covered_by'])
+    return {
+        'mappings': mappings,
+        'overall_coverage': round(100.0 * covered / len(mappings), 1) if mappings else 0.0,
+        'summary': f"{covered} of {len(mappings)} UI elements are covered by test cases.",
+    }
+
+
+def coverage_response(text, rng):
+    test_case_ids = _TEST_CASE_LINE_RE.findall(text)
+    requirement_ids = list(dict.fromkeys(_REQUIREMENT_LINE_RE.findall(text))) or [f"REQ-{n:03d}" for n in range(1, 21)]
+    covered, missing = [], []
+    for requirement_id in requirement_ids:
+        if test_case_ids and rng.random() < 0.8:
+            covered.append({
+                'requirement': f"Requirement {requirement_id}",
+                'requirement_id': requirement_id,
+                'covered_by': rng.sample(test_case_ids, min(len(test_case_ids), rng.randint(1, 2))),
+                'coverage_level': rng.choice(['Full', 'Full', 'Partial']),
+            })
+        else:
+            missing.append({
+                'requirement': f"Requirement {requirement_id}",
+                'requirement_id': requirement_id,
+                'reason': 'No test case exercises this requirement',
+                'priority': rng.choice(['High', 'Medium', 'Low']),
+            })
+    return {
+        'total_requirements': len(requirement_ids),
+        'covered_requirements': covered,
+        'missing_requirements': missing,
+        'coverage_percentage': round(100.0 * len(covered) / len(requirement_ids), 1),
+        'summary': f"{len(covered)} of {len(requirement_ids)} requirements are covered.",
+    }
+
+
+def canned_content(params, rng, settings):
+    """Response text for a chat.completions request, valid for the prompt it answers"""
+    messages = params.get('messages', [])
+    kind = request_kind(messages)
+    text = '\n'.join(_message_text(m) for m in messages)
+    if kind == 'screenshot':
+        body = screenshot_response(rng)
+    elif kind == 'ui_mapping':
+        body = ui_mapping_response(text, rng)
+    elif kind == 'coverage':
+        body = coverage_response(text, rng)
+    elif kind == 'requirements':
+        body = requirements_response(text, rng, settings)
+    elif kind == 'test_cases':
+        body = test_cases_response(messages, rng)
+    else:
+        return 'This is a canned response from the mock OpenAI server.'
+    return json.dumps(body, indent=2)
+
+
+def truncate_to_tokens(text, max_tokens, model):
+    """(text, finish_reason) with text cut to about max_tokens"""
+    tokens = estimate_tokens(text, model)
+    if not max_tokens or tokens <= max_tokens:
+        return text, 'stop'
+    return text[:int(len(text) * max_tokens / tokens)], 'length'
+
+
+class MockState:
+    """Shared server state: settings, rate-limit windows and recent prompts for prompt caching"""
+
+    def __init__(self, settings):
+        self.settings = dict(DEFAULT_SETTINGS, **settings)
+        self.rng = random.Random(self.settings['seed'])
+        self.lock = threading.Lock()
+        self.window = []  # (timestamp, tokens) of requests in the last minute
+        self.prompts = []
+        self.counters = {'requests': 0, 'rate_limited': 0, 'errors': 0}
+
+    def admit(self, tokens):
+        """None if the request is within the limits, else the seconds until it would be"""
+        with self.lock:
+            now = time.monotonic()
+            self.window = [(stamp, used) for stamp, used in self.window if now - stamp < 60]
+            used_tokens = sum(used for _, used in self.window)
+            if len(self.window) >= self.settings['rpm'] or used_tokens + tokens > self.settings['tpm']:
+                self.counters['rate_limited'] += 1
+                return max(0.05, 60 - (now - self.window[0][0])) if self.window else 1.0
+            self.window.append((now, tokens))
+            self.counters['requests'] += 1
+            return None
+
+    def limit_headers(self):
+        with self.lock:
+            now = time.monotonic()
+            recent = [(stamp, used) for stamp, used in self.window if now - stamp < 60]
+            reset = f"{max(0.0, 60 - (now - recent[0][0])) if recent else 0:.3f}s"
+            return {
+                'x-ratelimit-limit-requests': str(self.settings['rpm']),
+                'x-ratelimit-remaining-requests': str(max(0, self.settings['rpm'] - len(recent))),
+                'x-ratelimit-reset-requests': reset,
+                'x-ratelimit-limit-tokens': str(self.settings['tpm']),
+                'x-ratelimit-remaining-tokens': str(max(0, self.settings['tpm'] - sum(used for _, used in recent))),
+                'x-ratelimit-reset-tokens': reset,
+            }
+
+    def inject(self, name):
+        with self.lock:
+            return self.rng.random() < self.settings[name]
+
+    def cached_tokens(self, prompt, model):
+        """Tokens of the longest prefix shared with a recent prompt, rounded like provider prompt caching"""
+        with self.lock:
+            shared = max((len(os.path.commonprefix([prompt, earlier])) for earlier in self.prompts), default=0)
+            if prompt not in self.prompts:
+                self.prompts = (self.prompts + [prompt])[-PROMPT_CACHE_ENTRIES:]
+        tokens = estimate_tokens(prompt[:shared], model)
+        if tokens < PROMPT_CACHE_MIN_TOKENS:
+            return 0
+        return tokens - tokens % PROMPT_CACHE_STEP_TOKENS
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    state = None
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, body, headers=None):
+        payload = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status, message, error_type, code=None, headers=None):
+        self._send_json(status, {'error': {'message': message, 'type': error_type, 'param': None, 'code': code}}, headers)
+
+    def do_GET(self):
+        if self.path.rstrip('/').endswith('/models'):
+            self._send_json(200, {'object': 'list', 'data': [
+                {'id': model, 'object': 'model', 'created': 0, 'owned_by': 'mock'}
+                for model in ('gpt-4o', 'gpt-4o-mini', 'gpt-4-turbo', 'gpt-3.5-turbo')
+            ]})
+        else:
+            self._send_error(404, f"Unknown path {self.path}", 'invalid_request_error')
+
+    def do_POST(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b'{}')
+        except json.JSONDecodeError:
+            self._send_error(400, 'Request body is not valid JSON', 'invalid_request_error')
+            return
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_error(404, f"Unknown path {self.path}", 'invalid_request_error')
+            return
+        if not params.get('model') or not params.get('messages'):
+            self._send_error(400, "'model' and 'messages' are required", 'invalid_request_error')
+            return
+        self.complete(params)
+
+    def complete(self, params):
+        state = self.state
+        settings = state.settings
+        model = params['model']
+        prompt_tokens = estimate_message_tokens(params['messages'], model)
+        max_tokens = params.get('max_tokens') or 4096
+
+        retry_after = state.admit(prompt_tokens + max_tokens)
+        if retry_after is None and state.inject('rate_limit_rate'):
+            retry_after = round(state.rng.uniform(0.1, 1.0), 3)
+            with state.lock:
+                state.counters['rate_limited'] += 1
+        if retry_after is not None:
+            self._send_error(429, f"Rate limit reached for {model}. Please try again in {retry_after:.3f}s.",
+                             'requests', 'rate_limit_exceeded',
+                             dict(state.limit_headers(), **{'retry-after-ms': str(int(retry_after * 1000))}))
+            return
+        if state.inject('error_rate'):
+            with state.lock:
+                state.counters['errors'] += 1
+            self._send_error(500, 'The server had an error while processing your request.', 'server_error')
+            return
+
+        # Canned content is a function of the request, so identical requests get identical responses
+        request_hash = hashlib.sha256(json.dumps(params, sort_keys=True).encode('utf-8')).hexdigest()
+        rng = random.Random(request_hash)
+        content = canned_content(params, rng, settings)
+        limit = min(max_tokens, settings['max_output_tokens'] or max_tokens)
+        content, finish_reason = truncate_to_tokens(content, limit, model)
+        completion_tokens = estimate_tokens(content, model)
+        prompt_text = json.dumps(params['messages'], sort_keys=True)
+        usage = {
+            'prompt_tokens': prompt_tokens,
+            'completion_tokens': completion_tokens,
+            'total_tokens': prompt_tokens + completion_tokens,
+            'prompt_tokens_details': {'cached_tokens': state.cached_tokens(prompt_text, model)},
+        }
+        completion_id = f"chatcmpl-mock-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+
+        time.sleep(settings['latency'])
+        if params.get('stream'):
+            include_usage = (params.get('stream_options') or {}).get('include_usage')
+            self.stream(completion_id, created, model, content, finish_reason, usage if include_usage else None)
+            return
+
+        if settings['tokens_per_second']:
+            time.sleep(completion_tokens / settings['tokens_per_second'])
+        self._send_json(200, {
+            'id': completion_id,
+            'object': 'chat.completion',
+            'created': created,
+            'model': model,
+            'choices': [{
+                'index': 0,
+                'message': {'role': 'assistant', 'content': content},
+                'finish_reason': finish_reason,
+            }],
+            'usage': usage,
+        }, state.limit_headers())
+
+    def stream(self, completion_id, created, model, content, finish_reason, usage):
+        """Send content as server-sent chunk events, paced at the configured token rate"""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Cache-Control', 'no-cache')
+        self.send_header('Connection', 'close')
+        for name, value in self.state.limit_headers().items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.close_connection = True
+
+        def event(choices, extra=None):
+            body = {'id': completion_id, 'object': 'chat.completion.chunk', 'created': created, 'model': model,
+                    'choices': choices}
+            body.update(extra or {})
+            self.wfile.write(f"data: {json.dumps(body)}\n\n".encode('utf-8'))
+            self.wfile.flush()
+
+        tokens_per_second = self.state.settings['tokens_per_second']
+        # About four tokens per chunk, as the real API sends
+        piece_chars = 16
+        event([{'index': 0, 'delta': {'role': 'assistant', 'content': ''}, 'finish_reason': None}])
+        for start in range(0, len(content), piece_chars):
+            piece = content[start:start + piece_chars]
+            event([{'index': 0, 'delta': {'content': piece}, 'finish_reason': None}])
+            if tokens_per_second:
+                time.sleep(estimate_tokens(piece, model) / tokens_per_second)
+        event([{'index': 0, 'delta': {}, 'finish_reason': finish_reason}])
+        if usage is not None:
+            event([], {'usage': usage})
+        self.wfile.write(b"data: [DONE]\n\n")
+        self.wfile.flush()
+
+
+def create_server(host='127.0.0.1', port=DEFAULT_PORT, **settings):
+    """Build a threading HTTP server with its own state; port 0 picks a free port"""
+    handler = type('BoundMockHandler', (MockHandler,), {'state': MockState(settings)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    server.state = handler.state
+    return server
+
+
+def start_server(host='127.0.0.1', port=0, **settings):
+    """Start a server on a background thread; returns (server, base_url). Stop it with server.shutdown()"""
+    server = create_server(host, port, **settings)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    parser.add_argument('--latency', type=float, default=DEFAULT_SETTINGS['latency'], help='Seconds before the first token')
+    parser.add_argument('--tokens-per-second', type=float, default=DEFAULT_SETTINGS['tokens_per_second'],
+                        help='Output token rate; 0 sends the response at once')
+    parser.add_argument('--max-output-tokens', type=int, default=None,
+                        help="Cut every response at this many tokens with finish_reason 'length'")
+    parser.add_argument('--rpm', type=int, default=DEFAULT_SETTINGS['rpm'], help='Requests per minute before 429s')
+    parser.add_argument('--tpm', type=int, default=DEFAULT_SETTINGS['tpm'], help='Tokens per minute before 429s')
+    parser.add_argument('--rate-limit-rate', type=float, default=0.0, help='Probability of an injected 429')
+    parser.add_argument('--error-rate', type=float, default=0.0, help='Probability of an injected 500')
+    parser.add_argument('--requirements', type=int, default=DEFAULT_SETTINGS['requirements'],
+                        help='Requirements returned for a whole-BRD extraction')
+    parser.add_argument('--seed', type=int, default=None, help='Seed for injected errors')
+    args = parser.parse_args()
+
+    server = create_server(
+        args.host, args.port, latency=args.latency, tokens_per_second=args.tokens_per_second,
+        max_output_tokens=args.max_output_tokens, rpm=args.rpm, tpm=args.tpm,
+        rate_limit_rate=args.rate_limit_rate, error_rate=args.error_rate,
+        requirements=args.requirements, seed=args.seed,
+    )
+    print(f"Mock OpenAI server on http://{args.host}:{server.server_address[1]}/v1 (Ctrl+C to stop)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()
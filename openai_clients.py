@@ -0,0 +1,75 @@
+"""
+OpenAI Clients
+Process-wide registry of OpenAI clients that share a tuned, keep-alive HTTP connection pool
+"""
+
+import hashlib
+import os
+import threading
+
+import httpx
+from openai import AsyncOpenAI, OpenAI
+
+# Completions for large BRDs stream for minutes, so reads get a long timeout
+# while connecting to the API should fail fast
+CLIENT_TIMEOUT = httpx.Timeout(connect=10.0, read=300.0, write=60.0, pool=30.0)
+
+# Retries are left to the rate limiter, which backs off across all calls sharing a quota
+CLIENT_MAX_RETRIES = 0
+
+# Enough connections for the parallel stages; idle ones are kept warm between stages
+CLIENT_LIMITS = httpx.Limits(max_connections=32, max_keepalive_connections=16, keepalive_expiry=120.0)
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+# Server-side default endpoint; a session's own base URL overrides it, and None means api.openai.com
+DEFAULT_BASE_URL = os.environ.get('OPENAI_BASE_URL') or None
+
+
+def resolve_base_url(base_url=None):
+    """The endpoint a call goes to: base_url if given, else the server default"""
+    return (base_url or '').strip().rstrip('/') or DEFAULT_BASE_URL
+
+
+def _client_key(api_key, base_url=None):
+    """Registry key for an API key and endpoint; the raw key is never used as a dict key"""
+    return hashlib.sha256(f"{base_url or ''}\n{api_key}".encode('utf-8')).hexdigest()
+
+
+def get_openai_client(api_key, base_url=None):
+    """Return the shared OpenAI client for an API key and endpoint, creating it on first use.
+
+    Every AI stage reuses the same client, so TLS handshakes and connections
+    are paid once per server process rather than once per call. Clients are
+    pooled per (api_key, base_url), so sessions never share one endpoint.
+    """
+    base_url = resolve_base_url(base_url)
+    with _clients_lock:
+        key = _client_key(api_key, base_url)
+        client = _clients.get(key)
+        if client is None:
+            http_client = httpx.Client(timeout=CLIENT_TIMEOUT, limits=CLIENT_LIMITS)
+            client = OpenAI(api_key=api_key, base_url=base_url, timeout=CLIENT_TIMEOUT,
+                            max_retries=CLIENT_MAX_RETRIES, http_client=http_client)
+            _clients[key] = client
+        return client
+
+
+def create_async_openai_client(api_key, base_url=None):
+    """Create an AsyncOpenAI client with the same pool limits and timeouts.
+
+    Async clients are bound to the event loop they first run on, so one is
+    created per pipeline run and shared by every call in that run.
+    """
+    http_client = httpx.AsyncClient(timeout=CLIENT_TIMEOUT, limits=CLIENT_LIMITS)
+    return AsyncOpenAI(api_key=api_key, base_url=resolve_base_url(base_url), timeout=CLIENT_TIMEOUT,
+                       max_retries=CLIENT_MAX_RETRIES, http_client=http_client)
+
+
+def close_openai_clients():
+    """Close every pooled client and its connections"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
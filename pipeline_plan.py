@@ -0,0 +1,148 @@
+"""
+Pipeline Plan
+Pre-flight plan of calls, tokens and wall time per stage, built from the requests each stage sends
+"""
+
+import math
+
+from brd_pipeline import MIN_REQUIREMENTS, MIN_TEST_CASES
+from requirements_analysis import REQUIREMENTS_MAX_TOKENS, requirements_request
+from requirements_coverage import COVERAGE_TEST_CASE_LIMIT, coverage_request
+from test_case_generation import (
+    BATCH_FULL_CONTEXT_TOKENS, DEFAULT_BATCH_SIZE, DEFAULT_CONTINUATION_ROUNDS, GENERATION_INSTRUCTIONS,
+    GENERATION_MAX_TOKENS, SYSTEM_MESSAGE, group_requirements
+)
+from token_budget import (
+    BRD_TOKENS_PER_REQUIREMENT, DEFAULT_MODEL, MIN_EXPECTED_REQUIREMENTS, TOKENS_PER_REQUIREMENT,
+    TOKENS_PER_TEST_CASE, estimate_call_seconds, estimate_message_tokens, estimate_request_tokens, estimate_tokens,
+    model_profile
+)
+
+# Stands in for each test case line of the coverage prompt before any have been generated
+_PLACEHOLDER_TEST_CASE = {
+    'test_condition': "Verify that the system rejects the request when a mandatory field is missing",
+    'tc_module': 'General',
+}
+
+
+def _stage(name, calls, input_tokens, output_tokens, max_concurrency, model, note=''):
+    """One planned stage: totals plus a wall time assuming calls run in waves of max_concurrency"""
+    calls = max(1, calls)
+    waves = math.ceil(calls / max(1, max_concurrency))
+    per_call_input = input_tokens / calls
+    per_call_output = output_tokens / calls
+    return {
+        'stage': name,
+        'calls': calls,
+        'input_tokens': int(input_tokens),
+        'output_tokens': int(output_tokens),
+        'wall_seconds': round(waves * estimate_call_seconds(per_call_input, per_call_output, model), 1),
+        'note': note,
+    }
+
+
+def generation_targets(requirements_count, options, requirements=None):
+    """Test cases asked of each generation call, as the pipeline sets them.
+
+    A single call targets the requirement count (at least MIN_TEST_CASES
+    for a thin analysis); batched generation targets each requirement
+    group's size, grouped like generate_in_batches when the requirements
+    are known.
+    """
+    batch_size = options.get('batch_size') or DEFAULT_BATCH_SIZE
+    if options.get('batched'):
+        if requirements:
+            return [len(group) for group in group_requirements(requirements, batch_size)]
+        return [min(batch_size, requirements_count - start) for start in range(0, requirements_count, batch_size)]
+    if requirements_count < MIN_REQUIREMENTS:
+        return [max(MIN_TEST_CASES, requirements_count)]
+    return [requirements_count]
+
+
+def plan_pipeline(brd_text, prompt_template, options, requirements_count=None, chunk_count=None, requirements=None,
+                  section_index=None, model=DEFAULT_MODEL):
+    """Pre-flight plan for requirements extraction, generation and coverage analysis.
+
+    chunk_count comes from the requirements chunker, so the plan matches
+    what will actually be sent. requirements (or just requirements_count)
+    are the analyzed ones when known, otherwise the count is estimated from
+    the BRD size. Generation output follows the per-call test case targets
+    and continuation rounds; the coverage stage is the real coverage request
+    with placeholder test cases. Returns a dict with 'stages', totals and
+    'warnings' for prompts that overflow the model.
+    """
+    profile = model_profile(model)
+    max_concurrency = options.get('max_concurrency', 1)
+    brd_tokens = estimate_tokens(brd_text, model)
+    template_tokens = estimate_tokens(prompt_template or '', model)
+    if requirements:
+        requirements_count = len(requirements)
+    expected_requirements = requirements_count or max(MIN_EXPECTED_REQUIREMENTS, brd_tokens // BRD_TOKENS_PER_REQUIREMENT)
+    warnings = []
+    stages = []
+
+    # Requirements extraction: one call, or one per chunk, each with the extraction instructions
+    instructions_tokens = estimate_message_tokens(requirements_request('')['messages'], model)
+    chunks = chunk_count or 1
+    stages.append(_stage(
+        'Requirements analysis', chunks, brd_tokens + chunks * instructions_tokens,
+        min(expected_requirements * TOKENS_PER_REQUIREMENT, chunks * REQUIREMENTS_MAX_TOKENS), max_concurrency, model,
+        f"{chunks} section chunk(s)" if chunk_count else 'single call'
+    ))
+    if not chunk_count and brd_tokens + instructions_tokens > profile['context_window']:
+        warnings.append(f"The BRD (~{brd_tokens:,} tokens) does not fit the {profile['context_window']:,}-token context in one call; enable chunking")
+
+    # Generation: the framework template, instructions and BRD (per batch, up to its context limit) go into every
+    # call, and each call writes its target's test cases over as many continuation rounds as allowed
+    targets = generation_targets(expected_requirements, options, requirements)
+    response_tokens = min(profile['max_output_tokens'], GENERATION_MAX_TOKENS)
+    max_rounds = options.get('max_continuations', DEFAULT_CONTINUATION_ROUNDS)
+    needed = [target * TOKENS_PER_TEST_CASE for target in targets]
+    written = [min(tokens, response_tokens * (1 + max_rounds)) for tokens in needed]
+    rounds = sum(math.ceil(tokens / response_tokens) - 1 for tokens in written)
+    output_tokens = sum(written)
+    prompt_tokens = template_tokens + estimate_message_tokens(
+        [{'role': 'system', 'content': SYSTEM_MESSAGE}, {'role': 'user', 'content': GENERATION_INSTRUCTIONS}], model
+    )
+    batched = bool(options.get('batched'))
+    if batched:
+        generation_input = len(targets) * (prompt_tokens + min(brd_tokens, BATCH_FULL_CONTEXT_TOKENS))
+        note = f"{len(targets)} parallel batch(es)"
+    else:
+        generation_input = prompt_tokens + brd_tokens
+        note = 'single call'
+        if needed[0] > response_tokens:
+            warnings.append(
+                f"~{targets[0]} test cases need ~{needed[0]:,} output tokens, more than one response "
+                f"({response_tokens:,}); batching is faster than continuation"
+            )
+        if generation_input > profile['context_window']:
+            warnings.append(f"The generation prompt (~{generation_input:,} tokens) overflows the model context")
+    if rounds:
+        note += f", ~{rounds} continuation round(s)"
+    if sum(needed) > output_tokens:
+        warnings.append(
+            f"~{sum(needed):,} output tokens are needed but {max_rounds} continuation round(s) per call "
+            f"only allow ~{output_tokens:,}; some test cases will be cut off"
+        )
+    stages.append(_stage('Test case generation', len(targets), generation_input, output_tokens,
+                         max_concurrency if batched else 1, model, note))
+
+    # Coverage analysis: the request the coverage view sends, with the test cases it would list
+    placeholders = [dict(_PLACEHOLDER_TEST_CASE, test_case_id=f"TC_{number:03d}")
+                    for number in range(1, min(sum(targets), COVERAGE_TEST_CASE_LIMIT) + 1)]
+    coverage_input, coverage_output = estimate_request_tokens(
+        coverage_request(brd_text, placeholders, section_index, requirements)
+    )
+    stages.append(_stage('Coverage analysis', 1, coverage_input, coverage_output, 1, model, 'on demand'))
+
+    return {
+        'model': model,
+        'brd_tokens': brd_tokens,
+        'expected_requirements': expected_requirements,
+        'stages': stages,
+        'total_input_tokens': sum(stage['input_tokens'] for stage in stages),
+        'total_output_tokens': sum(stage['output_tokens'] for stage in stages),
+        'total_wall_seconds': round(sum(stage['wall_seconds'] for stage in stages), 1),
+        'warnings': warnings,
+    }
@@ -0,0 +1,313 @@
+"""
+Rate Limits
+Process-wide scheduler that keeps AI calls within requests/tokens-per-minute quotas and retries 429s and transient errors
+"""
+
+import asyncio
+import hashlib
+import os
+import random
+import re
+import threading
+import time
+
+import openai
+
+from token_budget import estimate_request_tokens
+
+# Retries after the first attempt; the backoff doubles per attempt up to the cap
+MAX_RETRIES = 6
+BACKOFF_BASE_SECONDS = 1.0
+BACKOFF_MAX_SECONDS = 60.0
+
+# Errors worth retrying: rate limits, dropped connections, timeouts, conflicts and 5xx responses
+RETRYABLE_ERRORS = (
+    openai.RateLimitError, openai.APIConnectionError, openai.ConflictError, openai.InternalServerError
+)
+
+_DURATION_RE = re.compile(r'(\d+(?:\.\d+)?)(ms|h|m|s)')
+_DURATION_UNITS = {'ms': 0.001, 's': 1, 'm': 60, 'h': 3600}
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def _env_cap(name):
+    """A per-minute cap from the environment; unset, empty or 0 means none"""
+    try:
+        return int(os.environ.get(name) or 0) or None
+    except ValueError:
+        return None
+
+
+# Optional server-wide ceilings applied on top of the limits the API reports. They are a
+# deployment setting (TCG_RATE_LIMIT_RPM / TCG_RATE_LIMIT_TPM) because every session shares the limiters
+_limit_caps = {'requests': _env_cap('TCG_RATE_LIMIT_RPM'), 'tokens': _env_cap('TCG_RATE_LIMIT_TPM')}
+
+
+def parse_reset_duration(value):
+    """Seconds in an x-ratelimit-reset-* value such as '20ms', '1s' or '6m0s'"""
+    if not value:
+        return None
+    parts = _DURATION_RE.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Per-minute quota that refills continuously.
+
+    reserve() takes its amount straight away and may drive the level below
+    zero; the caller then sleeps until the refill covers it, so later callers
+    queue up behind earlier ones in arrival order. With no known limit the
+    bucket lets everything through.
+    """
+
+    def __init__(self, per_minute=None):
+        self.reported_limit = None
+        self.cap = per_minute
+        self.level = float(per_minute) if per_minute else 0.0
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    @property
+    def capacity(self):
+        limits = [limit for limit in (self.reported_limit, self.cap) if limit]
+        return min(limits) if limits else None
+
+    def _refill(self, now):
+        capacity = self.capacity
+        if capacity:
+            self.level = min(capacity, self.level + (now - self.updated) * capacity / 60.0)
+        self.updated = now
+
+    def reserve(self, amount):
+        """Take amount from the bucket; returns the seconds to wait before using it"""
+        with self.lock:
+            capacity = self.capacity
+            if not capacity:
+                return 0.0
+            self._refill(time.monotonic())
+            # A request larger than the whole quota waits for a full bucket instead of forever
+            self.level -= min(amount, capacity)
+            return 0.0 if self.level >= 0 else -self.level * 60.0 / capacity
+
+    def set_cap(self, per_minute):
+        with self.lock:
+            self._refill(time.monotonic())
+            self.cap = per_minute or None
+            if self.capacity:
+                self.level = min(self.level, self.capacity)
+
+    def update(self, limit, remaining):
+        """Adopt the limit and remaining quota reported by the API"""
+        with self.lock:
+            now = time.monotonic()
+            if limit and self.reported_limit is None and not self.cap:
+                # First report for an unlimited bucket: start from what the API says is left
+                self.level = float(limit)
+            self._refill(now)
+            if limit:
+                self.reported_limit = limit
+            if remaining is not None:
+                self.level = min(self.level, float(remaining))
+
+
+class RateLimiter:
+    """Request and token buckets for one API key and model, plus a shared backoff"""
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.blocked_until = 0.0
+        self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'wait_seconds': 0.0}
+
+    def reserve(self, tokens):
+        """Reserve one request and its tokens; returns the seconds to wait before sending"""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+        with self.lock:
+            delay = max(delay, self.blocked_until - time.monotonic())
+            self.counters['requests'] += 1
+            self.counters['wait_seconds'] += max(0.0, delay)
+        return max(0.0, delay)
+
+    def set_caps(self, requests_per_minute=None, tokens_per_minute=None):
+        self.requests.set_cap(requests_per_minute)
+        self.tokens.set_cap(tokens_per_minute)
+
+    def update_from_headers(self, headers):
+        """Update both buckets from x-ratelimit-* response headers, if present"""
+        if not headers:
+            return
+        for name, bucket in (('requests', self.requests), ('tokens', self.tokens)):
+            limit = _header_int(headers, f'x-ratelimit-limit-{name}')
+            remaining = _header_int(headers, f'x-ratelimit-remaining-{name}')
+            if limit or remaining is not None:
+                bucket.update(limit, remaining)
+
+    def back_off(self, seconds, rate_limited=False):
+        """Hold every queued call on this limiter for at least seconds"""
+        with self.lock:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self.counters['retries'] += 1
+            if rate_limited:
+                self.counters['rate_limited'] += 1
+
+    def stats(self):
+        with self.lock:
+            return dict(
+                self.counters,
+                requests_per_minute=self.requests.capacity,
+                tokens_per_minute=self.tokens.capacity,
+            )
+
+
+def _header_int(headers, name):
+    value = headers.get(name)
+    try:
+        return int(float(value)) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _limiter_key(api_key, model, base_url=None):
+    return hashlib.sha256(f"{base_url or ''}\n{api_key or ''}\n{model}".encode('utf-8')).hexdigest()
+
+
+def get_rate_limiter(api_key, model, base_url=None):
+    """Return the process-wide limiter for an API key and model (limits are per model) on an endpoint"""
+    key = _limiter_key(api_key, model, base_url)
+    with _limiters_lock:
+        limiter = _limiters.get(key)
+        if limiter is None:
+            limiter = RateLimiter(_limit_caps['requests'], _limit_caps['tokens'])
+            _limiters[key] = limiter
+        return limiter
+
+
+def rate_limit_caps():
+    """The server-wide (requests, tokens) per-minute caps; None where the API's own limit applies"""
+    with _limiters_lock:
+        return _limit_caps['requests'], _limit_caps['tokens']
+
+
+def set_rate_limit_caps(requests_per_minute=None, tokens_per_minute=None):
+    """Cap every limiter in the process below the API's own limits (None or 0 = use what the API reports).
+
+    This is a process setting for the process owner (the CLI, or a server at
+    startup); never call it from a UI session, since it applies to all of them.
+    """
+    with _limiters_lock:
+        _limit_caps['requests'] = requests_per_minute or None
+        _limit_caps['tokens'] = tokens_per_minute or None
+        limiters = list(_limiters.values())
+    for limiter in limiters:
+        limiter.set_caps(_limit_caps['requests'], _limit_caps['tokens'])
+
+
+def rate_limit_stats():
+    """Counters summed over every limiter in the process"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    totals = {'requests': 0, 'retries': 0, 'rate_limited': 0, 'wait_seconds': 0.0}
+    for limiter in limiters:
+        stats = limiter.stats()
+        for name in totals:
+            totals[name] += stats[name]
+    return totals
+
+
+def is_retryable(error):
+    """Whether an API error is transient; an exhausted quota (insufficient_quota) is not"""
+    if not isinstance(error, RETRYABLE_ERRORS):
+        return False
+    return getattr(error, 'code', None) != 'insufficient_quota'
+
+
+def backoff_seconds(attempt, error=None):
+    """Delay before retry number attempt (0-based).
+
+    Honours the server's retry-after-ms / retry-after headers when given;
+    otherwise exponential backoff with jitter over the upper half of the
+    interval, so parallel callers do not retry in lockstep.
+    """
+    response = getattr(error, 'response', None)
+    headers = response.headers if response is not None else {}
+    retry_after = None
+    if headers.get('retry-after-ms'):
+        retry_after = _header_int(headers, 'retry-after-ms')
+        retry_after = retry_after / 1000.0 if retry_after is not None else None
+    elif headers.get('retry-after'):
+        retry_after = parse_reset_duration(headers.get('retry-after'))
+    if retry_after is not None and 0 < retry_after <= BACKOFF_MAX_SECONDS:
+        return retry_after + random.uniform(0, 0.25 * BACKOFF_BASE_SECONDS)
+
+    ceiling = min(BACKOFF_MAX_SECONDS, BACKOFF_BASE_SECONDS * 2 ** attempt)
+    # On a 429 without retry-after, wait at least until the token window resets
+    if isinstance(error, openai.RateLimitError):
+        reset = parse_reset_duration(headers.get('x-ratelimit-reset-tokens')) or 0
+        ceiling = min(BACKOFF_MAX_SECONDS, max(ceiling, reset))
+    return ceiling / 2 + random.uniform(0, ceiling / 2)
+
+
+def _prepare(client, params):
+    limiter = get_rate_limiter(getattr(client, 'api_key', None), params.get('model'), str(getattr(client, 'base_url', '')))
+    input_tokens, max_output = estimate_request_tokens(params)
+    return limiter, input_tokens + max_output
+
+
+def _on_error(limiter, error, attempt, max_retries):
+    """Back off and return True if error should be retried"""
+    if attempt >= max_retries or not is_retryable(error):
+        return False
+    response = getattr(error, 'response', None)
+    if response is not None:
+        limiter.update_from_headers(response.headers)
+    limiter.back_off(backoff_seconds(attempt, error), isinstance(error, openai.RateLimitError))
+    return True
+
+
+def create_completion(client, params, max_retries=MAX_RETRIES):
+    """client.chat.completions.create(**params) under the rate limiter.
+
+    Waits for request and token quota (the prompt estimate plus max_tokens,
+    which is what the API counts against TPM), learns the real limits from
+    the response headers, and retries 429s and transient errors with
+    jittered exponential backoff. Works for streamed requests too; only
+    opening the stream is retried.
+    """
+    limiter, cost = _prepare(client, params)
+    attempt = 0
+    while True:
+        time.sleep(limiter.reserve(cost))
+        try:
+            raw = client.chat.completions.with_raw_response.create(**params)
+        except Exception as e:
+            if not _on_error(limiter, e, attempt, max_retries):
+                raise
+            attempt += 1
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
+
+
+async def create_completion_async(client, params, max_retries=MAX_RETRIES):
+    """Async counterpart of create_completion for AsyncOpenAI clients"""
+    limiter, cost = _prepare(client, params)
+    attempt = 0
+    while True:
+        await asyncio.sleep(limiter.reserve(cost))
+        try:
+            raw = await client.chat.completions.with_raw_response.create(**params)
+        except Exception as e:
+            if not _on_error(limiter, e, attempt, max_retries):
+                raise
+            attempt += 1
+            continue
+        limiter.update_from_headers(raw.headers)
+        return raw.parse()
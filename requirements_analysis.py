@@ -0,0 +1,491 @@
+"""
+Requirements Analysis
+Requirements extraction from BRD text, in one call or map-reduced over section chunks
+"""
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+from ai_pipeline import DEFAULT_MAX_CONCURRENCY, completion_text, run_completions
+from brd_sections import build_section_index, iter_leaf_blocks, section_label
+from sqlite_cache import SQLiteCache
+from token_budget import estimate_tokens, split_by_tokens
+
+REQUIREMENTS_MODEL = "gpt-4o"
+REQUIREMENTS_MAX_TOKENS = 8192
+
+SYSTEM_MESSAGE = "You are an expert Business Analyst specialized in requirements analysis and extraction."
+
+# BRDs larger than this are extracted chunk by chunk; keeps each call's output well under max_tokens
+CHUNK_MAX_TOKENS = 10000
+
+# The reply grows with the sections in a chunk (a few requirements of ~150 tokens each per section),
+# so chunks are capped by section count too, keeping replies under REQUIREMENTS_MAX_TOKENS
+CHUNK_MAX_SECTIONS = 12
+
+# Times a chunk whose reply still hits max_tokens is split in two and retried
+CHUNK_MAX_SPLITS = 3
+
+# Bump when the prompts or merge rules change so stored artifacts are not reused
+REQUIREMENTS_VERSION = '2'
+REQUIREMENTS_STORE_FILE = 'requirements_artifacts.sqlite'
+
+_requirements_store = None
+_requirements_store_lock = threading.Lock()
+
+REQUIREMENTS_GUIDE = """**REQUIREMENT CATEGORIES TO EXTRACT (Minimum 5-8 per category):**
+
+### 1. USER INTERFACE REQUIREMENTS (8-12 requirements)
+- Each screen/page as separate requirement
+- Form fields and their validations (group by sections)
+- Buttons, links, navigation elements
+- Menu items and dropdown options
+- Search functionality and filters
+- Display formats and layouts
+- File upload/download features
+- Modal dialogs and popups
+
+### 2. BUSINESS PROCESS REQUIREMENTS (10-15 requirements)
+- User registration/login processes
+- Account creation workflows
+- Transaction processing steps
+- Approval workflows (each approval level)
+- Status change processes
+- Email/notification triggers
+- Data synchronization processes
+- Batch processing operations
+
+### 3. DATA VALIDATION REQUIREMENTS (8-12 requirements)
+- Field-level validations (separate for each field type)
+- Business rule validations
+- Cross-field validations
+- Format validations (date, email, phone, etc.)
+- Range validations (amounts, dates)
+- Mandatory field checks
+- Duplicate data checks
+- Data integrity constraints
+
+### 4. INTEGRATION REQUIREMENTS (3-5 requirements)
+- API integrations
+- Database operations
+- Third-party service calls
+- File import/export
+- External system communications
+
+### 5. REPORTING & INQUIRY REQUIREMENTS (3-5 requirements)
+- Report generation
+- Data export features  
+- Search and inquiry functions
+- Dashboard displays
+- Analytics and metrics
+
+### 6. SECURITY & ACCESS REQUIREMENTS (3-5 requirements)
+- Authentication mechanisms
+- Authorization controls
+- Role-based access
+- Session management
+- Audit trail requirements
+
+### 7. BUSINESS RULES & CALCULATIONS (5-8 requirements)
+- Calculation logic
+- Interest computations
+- Fee calculations
+- Business rule validations
+- Conditional processing
+- Status determination logic
+
+**EXTRACTION STRATEGY:**
+1. **Be Granular**: Break large features into 3-4 smaller requirements
+2. **Field-Level**: Each form section = 1 requirement
+3. **Step-by-Step**: Each workflow step = 1 requirement  
+4. **Screen-Specific**: Each screen/page = 1 requirement
+5. **Validation-Specific**: Each validation type = 1 requirement
+6. **Role-Specific**: Different user roles = separate requirements
+
+**EXAMPLES OF GRANULAR BREAKDOWN:**
+- Instead of "User Registration" → Break into:
+  - REQ-001: User registration form - Personal details validation
+  - REQ-002: User registration form - Contact details validation  
+  - REQ-003: User registration form - Document upload functionality
+  - REQ-004: User registration - Email verification process
+  - REQ-005: User registration - Account activation workflow
+"""
+
+OUTPUT_FORMAT = """**OUTPUT FORMAT**:
+Return ONLY a valid JSON object with this structure:
+{
+  "total_requirements": <number_minimum_35>,
+  "requirements": [
+    {
+      "requirement_id": "REQ-001",
+      "requirement_type": "UI/Workflow/Data/Integration/Report/Security/Business Rule/Calculation",
+      "module": "Module Name",
+      "title": "Specific granular requirement title",
+      "description": "Detailed requirement description with specific functionality",
+      "priority": "Critical/High/Medium/Low",
+      "testable": true
+    }
+  ]
+}"""
+
+CHUNK_OUTPUT_FORMAT = """**OUTPUT FORMAT**:
+Return ONLY a valid JSON object with this structure:
+{
+  "total_requirements": <number>,
+  "requirements": [
+    {
+      "requirement_id": "REQ-001",
+      "requirement_type": "UI/Workflow/Data/Integration/Report/Security/Business Rule/Calculation",
+      "module": "Module Name",
+      "title": "Specific granular requirement title",
+      "description": "Detailed requirement description with specific functionality",
+      "priority": "Critical/High/Medium/Low",
+      "testable": true,
+      "source_section": "SEC-0000"
+    }
+  ]
+}
+
+source_section is the [SEC-....] marker of the section the requirement comes from."""
+
+
+def requirements_prompt(brd_text):
+    """Prompt that extracts every requirement from the whole BRD in one call.
+
+    The instructions come first and the BRD last, so the instructions form a
+    byte-stable prefix the provider can serve from its prompt cache.
+    """
+    return f"""You are a Senior Business Analyst specialized in comprehensive requirements extraction from Business Requirements Documents.
+
+## CRITICAL TASK
+
+Extract AT LEAST 30-40 UNIQUE functional requirements from the BRD below. Be extremely thorough and granular. Break down complex features into multiple specific requirements.
+
+{REQUIREMENTS_GUIDE}
+**MINIMUM TARGET**: 35+ unique requirements (aim for 40-50 if document is comprehensive)
+
+**NO DUPLICATES**: Each requirement must be unique and testable
+
+{OUTPUT_FORMAT}
+
+**IMPORTANT**: If the BRD seems to have fewer obvious requirements, EXPAND and DECOMPOSE existing features into granular, testable requirements. Every button click, field validation, screen display, and process step should be a separate requirement.
+
+## BRD DOCUMENT TO ANALYZE
+
+{brd_text}
+
+Start extraction now - aim for 35-50 unique requirements:"""
+
+
+def chunk_prompt(chunk, position, total):
+    """Prompt that extracts the requirements stated in one chunk of the BRD; instructions first, excerpt last"""
+    return f"""You are a Senior Business Analyst specialized in comprehensive requirements extraction from Business Requirements Documents.
+
+The BRD is too large for one pass, so it is analyzed in excerpts. Each section of the excerpt below starts with its [SEC-....] marker.
+
+## CRITICAL TASK
+
+Extract EVERY functional requirement stated in the excerpt. Be extremely thorough and granular. Break down complex features into multiple specific requirements.
+Only extract requirements the excerpt supports; other excerpts are analyzed separately. The category counts below are targets for the whole BRD, not for this excerpt.
+
+{REQUIREMENTS_GUIDE}
+**NO DUPLICATES**: Each requirement must be unique and testable
+
+{CHUNK_OUTPUT_FORMAT}
+
+## BRD EXCERPT {position + 1} OF {total}
+
+{chunk['text']}
+
+Start extraction now:"""
+
+
+def _request(prompt):
+    return {
+        'model': REQUIREMENTS_MODEL,
+        'messages': [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': REQUIREMENTS_MAX_TOKENS,
+        'temperature': 0.2,
+        'response_format': {"type": "json_object"},
+    }
+
+
+def requirements_request(brd_text):
+    """chat.completions.create arguments for single-call extraction"""
+    return _request(requirements_prompt(brd_text))
+
+
+def chunk_request(chunk, position, total):
+    """chat.completions.create arguments for one chunk of a map-reduce extraction"""
+    return _request(chunk_prompt(chunk, position, total))
+
+
+def parse_requirements_response(response_text):
+    """Return (requirements, total_count) from a JSON reply; raises json.JSONDecodeError"""
+    json_response = json.loads(response_text)
+    requirements = json_response.get('requirements', [])
+    return requirements, json_response.get('total_requirements', len(requirements))
+
+
+def _block_text(block):
+    _, marker, piece = block
+    return f"{marker}\n{piece.rstrip()}\n\n" if marker else piece
+
+
+def _make_chunk(blocks, model=REQUIREMENTS_MODEL):
+    """Chunk dict from (section ID, marker, text) blocks"""
+    text = ''.join(_block_text(block) for block in blocks)
+    section_ids = []
+    for section_id, _, _ in blocks:
+        if section_id and section_id not in section_ids:
+            section_ids.append(section_id)
+    return {'text': text, 'section_ids': section_ids, 'tokens': estimate_tokens(text, model), 'blocks': blocks}
+
+
+def build_requirement_chunks(text, section_index=None, max_tokens=CHUNK_MAX_TOKENS, model=REQUIREMENTS_MODEL,
+                             section_ids=None, max_sections=CHUNK_MAX_SECTIONS):
+    """Pack consecutive sections into chunks of at most about max_tokens and max_sections blocks.
+
+    Chunks break only between sections unless a single section is larger
+    than max_tokens. Every block is prefixed with its section marker so the
+    model can cite where each requirement comes from. section_ids limits
+    the chunks to those sections. Returns a list of dicts with 'text',
+    'section_ids', estimated 'tokens' and the 'blocks' they were built from.
+    """
+    if section_index is None:
+        section_index = build_section_index(text)
+
+    blocks = []
+    for section, start, end in iter_leaf_blocks(section_index):
+        if section_ids is not None and section['id'] not in section_ids:
+            continue
+        pieces = split_by_tokens(text[start:end], max_tokens, model)
+        for number, piece in enumerate(pieces):
+            marker = section_label(section) + (' (continued)' if number else '')
+            blocks.append((section['id'], marker, piece))
+    if not blocks and text.strip() and section_ids is None:
+        blocks = [(None, None, piece) for piece in split_by_tokens(text, max_tokens, model)]
+
+    groups = []
+    current, current_tokens = None, 0
+    for block in blocks:
+        tokens = estimate_tokens(_block_text(block), model)
+        if current is None or current_tokens + tokens > max_tokens or len(current) >= max_sections:
+            current, current_tokens = [], 0
+            groups.append(current)
+        current.append(block)
+        current_tokens += tokens
+    return [_make_chunk(group, model) for group in groups]
+
+
+def split_requirement_chunk(chunk, model=REQUIREMENTS_MODEL):
+    """Split a chunk whose reply was cut off into two halves, or return None if it cannot be split.
+
+    Several blocks are split between sections; a single block is split at a
+    line boundary, the second half keeping its section marker.
+    """
+    blocks = chunk['blocks']
+    if len(blocks) > 1:
+        middle = len(blocks) // 2
+        return [_make_chunk(blocks[:middle], model), _make_chunk(blocks[middle:], model)]
+
+    section_id, marker, piece = blocks[0]
+    lines = piece.splitlines(keepends=True)
+    if len(lines) < 2:
+        return None
+    half = estimate_tokens(piece, model) / 2
+    middle, tokens = 0, 0
+    while middle < len(lines) - 1 and (middle == 0 or tokens < half):
+        tokens += estimate_tokens(lines[middle], model)
+        middle += 1
+    second_marker = marker and (marker if marker.endswith(' (continued)') else marker + ' (continued)')
+    return [
+        _make_chunk([(section_id, marker, ''.join(lines[:middle]))], model),
+        _make_chunk([(section_id, second_marker, ''.join(lines[middle:]))], model),
+    ]
+
+
+def _dedupe_key(requirement):
+    """Normalized module + title, so rewordings of case and punctuation collapse"""
+    def normalize(value):
+        return ' '.join(re.sub(r'[^a-z0-9]+', ' ', str(value or '').lower()).split())
+    return normalize(requirement.get('module')), normalize(requirement.get('title'))
+
+
+def merge_requirements(chunk_requirements):
+    """Reduce step: concatenate chunk results in document order, drop duplicates and renumber.
+
+    chunk_requirements is a list of (requirements, section_ids) pairs. A
+    requirement keeps the first source section it was found in; a
+    requirement citing a section outside its chunk falls back to the
+    chunk's first section.
+    """
+    merged = []
+    seen = set()
+    for requirements, section_ids in chunk_requirements:
+        for requirement in requirements:
+            if not isinstance(requirement, dict):
+                continue
+            key = _dedupe_key(requirement)
+            if key in seen:
+                continue
+            seen.add(key)
+
+            requirement = dict(requirement)
+            if requirement.get('source_section') not in section_ids:
+                requirement['source_section'] = section_ids[0] if section_ids else None
+            merged.append(requirement)
+
+    for number, requirement in enumerate(merged, 1):
+        requirement['requirement_id'] = f"REQ-{number:03d}"
+    return merged
+
+
+def merge_revised_requirements(kept, revised):
+    """Add requirements re-extracted from revised sections to those kept from unchanged ones.
+
+    Kept requirements keep their IDs, so test cases traced to them stay
+    valid. Revised requirements that duplicate a kept one are dropped and
+    the rest are numbered after the highest existing ID. Returns
+    (requirements, added).
+    """
+    seen = {_dedupe_key(requirement) for requirement in kept}
+    numbers = [int(match.group(1)) for match in
+               (re.match(r'REQ-(\d+)$', str(requirement.get('requirement_id') or '')) for requirement in kept) if match]
+    next_number = max(numbers, default=0) + 1
+
+    added = []
+    for requirement in revised:
+        key = _dedupe_key(requirement)
+        if key in seen:
+            continue
+        seen.add(key)
+        requirement = dict(requirement, requirement_id=f"REQ-{next_number:03d}")
+        next_number += 1
+        added.append(requirement)
+    return list(kept) + added, added
+
+
+def extract_requirements_chunked(text, api_key, section_index=None, max_tokens=CHUNK_MAX_TOKENS,
+                                 max_concurrency=DEFAULT_MAX_CONCURRENCY, on_done=None, cache=None, refresh_cache=False,
+                                 section_ids=None, base_url=None):
+    """Map-reduce requirements extraction over section chunks.
+
+    Chunks are extracted concurrently, so latency follows the largest chunk
+    rather than the document size. A chunk whose reply is cut off at
+    max_tokens is split in two and retried (up to CHUNK_MAX_SPLITS times)
+    rather than dropped. section_ids restricts extraction to those
+    sections. Returns (requirements, stats) where stats reports the chunk
+    count, the splits made and the chunks that failed.
+    """
+    chunks = build_requirement_chunks(text, section_index, max_tokens, section_ids=section_ids)
+    pending = [dict(chunk, order=(position,)) for position, chunk in enumerate(chunks)]
+    results = []
+    splits = 0
+    while pending:
+        requests = [chunk_request(chunk, chunk['order'][0], len(chunks)) for chunk in pending]
+        completions = run_completions(requests, api_key, max_concurrency, on_done, cache, refresh_cache, base_url)
+        retry = []
+        for chunk, completion in zip(pending, completions):
+            halves = None
+            if (not isinstance(completion, Exception) and completion.choices[0].finish_reason == 'length'
+                    and len(chunk['order']) <= CHUNK_MAX_SPLITS):
+                halves = split_requirement_chunk(chunk)
+            if halves:
+                splits += 1
+                retry.extend(dict(half, order=chunk['order'] + (number,)) for number, half in enumerate(halves))
+            else:
+                results.append((chunk, completion))
+        pending = retry
+    results.sort(key=lambda result: result[0]['order'])
+
+    chunk_requirements = []
+    errors = []
+    for chunk, completion in results:
+        label = '.'.join(str(number + 1) for number in chunk['order'])
+        try:
+            if isinstance(completion, Exception):
+                raise completion
+            if completion.choices[0].finish_reason == 'length':
+                raise ValueError("the reply was cut off at the output token limit")
+            requirements, _ = parse_requirements_response(completion_text(completion))
+        except Exception as e:
+            errors.append(f"Chunk {label} of {len(chunks)}: {str(e)}")
+            continue
+        chunk_requirements.append((requirements, chunk['section_ids']))
+
+    requirements = merge_requirements(chunk_requirements)
+    return requirements, {
+        'chunks': len(chunks),
+        'splits': splits,
+        'raw_requirements': sum(len(requirements) for requirements, _ in chunk_requirements),
+        'errors': errors,
+    }
+
+
+def use_chunked_extraction(text, chunked=None):
+    """Resolve the chunking setting: None means chunk only BRDs too large for one prompt"""
+    return estimate_tokens(text, REQUIREMENTS_MODEL) > CHUNK_MAX_TOKENS if chunked is None else bool(chunked)
+
+
+def brd_fingerprint(text):
+    """Content fingerprint that ties derived artifacts to one exact BRD text"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+def get_requirements_store():
+    """Return the process-wide store of requirements artifacts"""
+    global _requirements_store
+    with _requirements_store_lock:
+        if _requirements_store is None:
+            _requirements_store = SQLiteCache(REQUIREMENTS_STORE_FILE, max_bytes=64 * 1024 * 1024)
+        return _requirements_store
+
+
+def _artifact_key(fingerprint, chunked):
+    return f"v{REQUIREMENTS_VERSION}:{fingerprint}:{'chunked' if chunked else 'single'}"
+
+
+def make_requirements_artifact(text, requirements, total_count, chunked):
+    """Requirements list plus what it was derived from"""
+    return {
+        'fingerprint': brd_fingerprint(text),
+        'chunked': chunked,
+        'version': REQUIREMENTS_VERSION,
+        'model': REQUIREMENTS_MODEL,
+        'created_at': time.strftime("%Y-%m-%d %H:%M:%S"),
+        'total_count': total_count,
+        'requirements': requirements,
+    }
+
+
+def save_requirements_artifact(store, artifact):
+    """Persist an artifact under its BRD fingerprint"""
+    store.set_text(_artifact_key(artifact['fingerprint'], artifact['chunked']), json.dumps(artifact))
+
+
+def load_requirements_artifact(store, fingerprint, chunked):
+    """Return the stored artifact for a BRD fingerprint, or None"""
+    stored = store.get_text(_artifact_key(fingerprint, chunked))
+    return json.loads(stored) if stored is not None else None
+
+
+def artifact_matches(artifact, text, chunked=None):
+    """True if an artifact was derived from exactly this BRD text (and chunking mode, if given)"""
+    if not artifact or artifact.get('fingerprint') != brd_fingerprint(text):
+        return False
+    return chunked is None or artifact.get('chunked') == chunked
+
+
+def requirements_summary_lines(requirements, limit=None):
+    """One line per requirement (ID, title, type) for prompts"""
+    return [
+        f"- {req.get('requirement_id', 'N/A')}: {req.get('title', 'N/A')} (Type: {req.get('requirement_type', 'N/A')})"
+        for req in requirements[:limit]
+    ]
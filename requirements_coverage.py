@@ -0,0 +1,89 @@
+"""
+Requirements Coverage
+Prompt for analyzing which BRD requirements the generated test cases cover
+"""
+
+from brd_sections import build_section_excerpt, build_section_index
+from requirements_analysis import requirements_summary_lines
+
+COVERAGE_MODEL = "gpt-4o"
+COVERAGE_MAX_TOKENS = 8192
+
+# The BRD is cut to a section-fair excerpt of this size, and only the first test cases are listed
+COVERAGE_EXCERPT_CHARS = 15000
+COVERAGE_TEST_CASE_LIMIT = 100
+
+
+def coverage_request(brd_text, test_cases, section_index=None, requirements=None):
+    """chat.completions.create arguments for a requirements coverage analysis"""
+    test_case_summary = "\n".join([
+        f"- {tc.get('test_case_id', 'N/A')}: {tc.get('test_condition', 'N/A')} (Module: {tc.get('tc_module', 'N/A')})"
+        for tc in test_cases[:COVERAGE_TEST_CASE_LIMIT]
+    ])
+
+    # Every section keeps a share of the budget instead of cutting the BRD at a fixed length
+    if section_index is None:
+        section_index = build_section_index(brd_text)
+    brd_excerpt = build_section_excerpt(brd_text, section_index, COVERAGE_EXCERPT_CHARS)
+
+    # Requirements analyzed during generation are reused so IDs match across views
+    if requirements:
+        known_requirements = "\n".join(requirements_summary_lines(requirements))
+        known_requirements = f"""
+**REQUIREMENTS ALREADY IDENTIFIED (use these IDs; add new ones only for requirements missing from this list):**
+{known_requirements}
+"""
+    else:
+        known_requirements = ""
+
+    # Static instructions first, then the BRD and requirements, with the test cases (which change most) last
+    prompt = f"""You are a QA analyst performing requirements coverage analysis.
+
+**TASK:**
+Analyze the BRD below and identify:
+1. All functional requirements, features, and business rules mentioned in the BRD
+2. Which requirements are covered by the generated test cases
+3. Which requirements are NOT covered (gaps)
+
+**OUTPUT FORMAT:**
+Return ONLY a JSON object with this structure:
+{{
+  "total_requirements": <number>,
+  "covered_requirements": [
+    {{
+      "requirement": "Requirement description",
+      "requirement_id": "REQ-001",
+      "covered_by": ["TC_001", "TC_002"],
+      "coverage_level": "Full" or "Partial"
+    }}
+  ],
+  "missing_requirements": [
+    {{
+      "requirement": "Requirement description",
+      "requirement_id": "REQ-XXX",
+      "reason": "Why it's not covered",
+      "priority": "High" or "Medium" or "Low"
+    }}
+  ],
+  "coverage_percentage": <number>,
+  "summary": "Brief analysis summary"
+}}
+
+**BRD DOCUMENT:**
+{brd_excerpt}
+{known_requirements}
+**GENERATED TEST CASES (Summary):**
+{test_case_summary}
+
+Analyze now:"""
+
+    return {
+        'model': COVERAGE_MODEL,
+        'messages': [
+            {"role": "system", "content": "You are an expert QA analyst specialized in requirements traceability and coverage analysis."},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': COVERAGE_MAX_TOKENS,
+        'temperature': 0.2,
+        'response_format': {"type": "json_object"},
+    }
@@ -0,0 +1,121 @@
+"""
+SQLite Cache
+Small persistent key/value cache with size-bounded LRU eviction and optional TTL
+"""
+
+import os
+import sqlite3
+from contextlib import contextmanager
+import threading
+import time
+import zlib
+
+# Default location for every on-disk cache of the app
+CACHE_DIR = os.environ.get(
+    'TCG_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+
+
+class SQLiteCache:
+    """Persistent byte cache stored in a single SQLite file.
+
+    Values are zlib-compressed. When the stored size exceeds max_bytes the
+    least recently used entries are evicted; entries older than ttl_seconds
+    (if set) are treated as missing.
+    """
+
+    def __init__(self, file_name, max_bytes=512 * 1024 * 1024, ttl_seconds=None, cache_dir=None):
+        self.cache_dir = cache_dir or CACHE_DIR
+        self.path = os.path.join(self.cache_dir, file_name)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " size INTEGER NOT NULL,"
+                " created_at REAL NOT NULL,"
+                " last_access REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_last_access ON entries (last_access)")
+
+    @contextmanager
+    def _connect(self):
+        """Open a short-lived connection; Streamlit sessions run on different threads"""
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key):
+        """Return the cached bytes for key, or None on a miss"""
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT value, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None or (self.ttl_seconds is not None and now - row[1] > self.ttl_seconds):
+                if row is not None:
+                    conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                with self._lock:
+                    self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET last_access = ? WHERE key = ?", (now, key))
+
+        with self._lock:
+            self.hits += 1
+        return zlib.decompress(row[0])
+
+    def set(self, key, value):
+        """Store bytes under key and evict least recently used entries if over budget"""
+        compressed = zlib.compress(value)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, compressed, len(compressed), now, now)
+            )
+            self._evict(conn)
+
+    def get_text(self, key):
+        """Return the cached string for key, or None on a miss"""
+        value = self.get(key)
+        return value.decode('utf-8') if value is not None else None
+
+    def set_text(self, key, text):
+        """Store a string under key"""
+        self.set(key, text.encode('utf-8'))
+
+    def _evict(self, conn):
+        """Delete expired entries, then the oldest entries until under max_bytes"""
+        if self.ttl_seconds is not None:
+            conn.execute("DELETE FROM entries WHERE created_at < ?", (time.time() - self.ttl_seconds,))
+
+        total_size = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total_size <= self.max_bytes:
+            return
+
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY last_access").fetchall():
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total_size -= size
+            if total_size <= self.max_bytes:
+                break
+
+    def stats(self):
+        """Return entry count, stored bytes and hit/miss counters"""
+        with self._connect() as conn:
+            count, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        return {'entries': count, 'bytes': size, 'hits': self.hits, 'misses': self.misses}
+
+    def clear(self):
+        """Remove every entry"""
+        with self._connect() as conn:
+            conn.execute("DELETE FROM entries")
@@ -0,0 +1,182 @@
+"""
+Test Case Dedup
+Near-duplicate test case detection with text shingles, MinHash signatures and LSH banding
+"""
+
+import re
+
+import numpy as np
+
+# Jaccard similarity of shingle sets above which two test cases count as near-duplicates
+DEFAULT_THRESHOLD = 0.8
+
+SHINGLE_SIZE = 5
+NUM_PERMUTATIONS = 128
+
+# Shingle hashes processed per block when computing signatures, bounding memory to ~16 MB per block
+_BLOCK_SHINGLES = 16384
+
+_DEDUP_FIELDS = ('test_condition', 'test_case_description')
+
+
+def test_case_text(test_case):
+    """Normalized condition plus description: the text two test cases are compared on"""
+    text = ' '.join(str(test_case.get(field) or '') for field in _DEDUP_FIELDS).lower()
+    return ' '.join(re.sub(r'[\W_]+', ' ', text).split())
+
+
+def shingle_hashes(text, size=SHINGLE_SIZE):
+    """Sorted unique hashes of the text's byte shingles (the whole text if shorter than one).
+
+    Each shingle's bytes are read as a base-257 number, which is exact for
+    shingles of up to 7 bytes, so distinct shingles never share a hash.
+    """
+    data = np.frombuffer(text.encode('utf-8'), dtype=np.uint8).astype(np.uint64)
+    if not len(data):
+        return data
+    if len(data) < size:
+        data = np.concatenate([data, np.zeros(size - len(data), dtype=np.uint64)])
+    windows = np.lib.stride_tricks.sliding_window_view(data, size)
+    powers = np.uint64(257) ** np.arange(size - 1, -1, -1, dtype=np.uint64)
+    return np.unique((windows * powers).sum(axis=1, dtype=np.uint64))
+
+
+def minhash_signatures(shingle_sets, num_permutations=NUM_PERMUTATIONS, seed=1):
+    """MinHash signature matrix (documents x permutations) for a list of shingle hash arrays.
+
+    Permutations are multiply-shift hashes (a*x + b with 64-bit wraparound,
+    top 32 bits kept). Documents are processed in blocks of concatenated
+    shingles so the hashing is vectorized without holding every shingle
+    times every permutation in memory. Empty documents get an all-max
+    signature.
+    """
+    rng = np.random.RandomState(seed)
+    a = rng.randint(0, np.iinfo(np.uint64).max, size=num_permutations, dtype=np.uint64) | np.uint64(1)
+    b = rng.randint(0, np.iinfo(np.uint64).max, size=num_permutations, dtype=np.uint64)
+    signatures = np.full((len(shingle_sets), num_permutations), np.iinfo(np.uint32).max, dtype=np.uint32)
+
+    start = 0
+    while start < len(shingle_sets):
+        end, count = start, 0
+        while end < len(shingle_sets) and (count == 0 or count + len(shingle_sets[end]) <= _BLOCK_SHINGLES):
+            count += len(shingle_sets[end])
+            end += 1
+        block = [(position, hashes) for position, hashes in enumerate(shingle_sets[start:end], start) if len(hashes)]
+        if block:
+            values = np.concatenate([hashes for _, hashes in block])
+            offsets = np.cumsum([0] + [len(hashes) for _, hashes in block[:-1]])
+            permuted = ((a[:, None] * values[None, :] + b[:, None]) >> np.uint64(32)).astype(np.uint32)
+            signatures[[position for position, _ in block]] = np.minimum.reduceat(permuted, offsets, axis=1).T
+        start = end
+    return signatures
+
+
+def lsh_parameters(threshold, num_permutations=NUM_PERMUTATIONS, false_negative_weight=0.8):
+    """(bands, rows) for LSH banding of the signatures around a similarity threshold.
+
+    Minimizes the weighted area under the S-curve 1-(1-s^rows)^bands below
+    threshold (false candidates) and above it (missed duplicates). Missed
+    duplicates weigh more, since false candidates are only extra exact checks.
+    """
+    below = np.linspace(0.0, threshold, 200)
+    above = np.linspace(threshold, 1.0, 200)
+    best, best_error = (num_permutations, 1), None
+    for rows in range(1, num_permutations + 1):
+        bands = num_permutations // rows
+        false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+        false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+        error = (1 - false_negative_weight) * false_positive + false_negative_weight * false_negative
+        if best_error is None or error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def _jaccard(left, right):
+    if not len(left) or not len(right):
+        return 0.0
+    shared = len(np.intersect1d(left, right, assume_unique=True))
+    return shared / (len(left) + len(right) - shared)
+
+
+def find_near_duplicates(test_cases, threshold=DEFAULT_THRESHOLD, num_permutations=NUM_PERMUTATIONS,
+                         shingle_size=SHINGLE_SIZE):
+    """Group test cases whose condition plus description are near-duplicates.
+
+    Candidates come from LSH buckets, so the work grows with the number of
+    test cases rather than the number of pairs; each candidate is then
+    confirmed with the exact Jaccard similarity of its shingles. Returns a
+    list of groups, each a sorted list of at least two test case positions,
+    ordered by their first test case.
+    """
+    shingle_sets = [shingle_hashes(test_case_text(test_case), shingle_size) for test_case in test_cases]
+    signatures = minhash_signatures(shingle_sets, num_permutations)
+    bands, rows = lsh_parameters(threshold, num_permutations)
+
+    parent = list(range(len(test_cases)))
+
+    def find(position):
+        while parent[position] != position:
+            parent[position] = parent[parent[position]]
+            position = parent[position]
+        return position
+
+    for band in range(bands):
+        buckets = {}
+        band_signatures = np.ascontiguousarray(signatures[:, band * rows:(band + 1) * rows])
+        for position, shingles in enumerate(shingle_sets):
+            if len(shingles):
+                buckets.setdefault(band_signatures[position].tobytes(), []).append(position)
+        for members in buckets.values():
+            if len(members) < 2:
+                continue
+            # Compare each member against one representative per group already in the bucket
+            representatives = {}
+            for position in members:
+                root = find(position)
+                if root in representatives:
+                    continue
+                for other_root, other in list(representatives.items()):
+                    if find(other_root) == root:
+                        continue
+                    if _jaccard(shingle_sets[position], shingle_sets[other]) >= threshold:
+                        parent[root] = find(other_root)
+                        root = find(other_root)
+                        break
+                representatives.setdefault(root, position)
+
+    groups = {}
+    for position in range(len(test_cases)):
+        groups.setdefault(find(position), []).append(position)
+    return sorted((members for members in groups.values() if len(members) > 1), key=lambda members: members[0])
+
+
+def collapse_duplicates(test_cases, groups):
+    """Keep only the first test case of each duplicate group"""
+    dropped = {position for members in groups for position in members[1:]}
+    return [test_case for position, test_case in enumerate(test_cases) if position not in dropped]
+
+
+def merge_duplicates(test_cases, groups):
+    """Fold each duplicate group into its first test case.
+
+    The survivor keeps its own fields, fills empty ones from the
+    duplicates, takes the union of their requirement_ids (so traceability
+    is not lost) and lists the merged IDs in 'merged_test_case_ids'.
+    """
+    merged = {}
+    for members in groups:
+        survivor = dict(test_cases[members[0]])
+        requirement_ids = list(survivor.get('requirement_ids') or [])
+        for position in members[1:]:
+            duplicate = test_cases[position]
+            for field, value in duplicate.items():
+                if value and not survivor.get(field):
+                    survivor[field] = value
+            requirement_ids.extend(rid for rid in duplicate.get('requirement_ids') or [] if rid not in requirement_ids)
+        if requirement_ids:
+            survivor['requirement_ids'] = requirement_ids
+        survivor['merged_test_case_ids'] = [test_cases[position].get('test_case_id') for position in members[1:]]
+        merged[members[0]] = survivor
+
+    dropped = {position for members in groups for position in members[1:]}
+    return [merged.get(position, test_case) for position, test_case in enumerate(test_cases) if position not in dropped]
@@ -0,0 +1,212 @@
+"""
+Test Case Export
+Test case tables and Excel/CSV/JSON export shared by the app and the command line
+"""
+
+import io
+import json
+import os
+
+import openpyxl
+import pandas as pd
+
+EXPORT_FORMATS = ('xlsx', 'csv', 'json')
+
+
+def categorize_test_case_type(tc_module):
+    """Categorize test case based on TC Module name"""
+    tc_module_lower = str(tc_module).lower()
+    
+    if 'field validation' in tc_module_lower or 'field-level' in tc_module_lower:
+        return 'Field-Level'
+    elif 'workflow' in tc_module_lower or 'functional' in tc_module_lower:
+        return 'Functional'
+    elif 'negative' in tc_module_lower:
+        return 'Negative'
+    elif 'report' in tc_module_lower or 'inquiry' in tc_module_lower:
+        return 'Report/Inquiry'
+    elif 'modification' in tc_module_lower or 'update' in tc_module_lower:
+        return 'Modification'
+    else:
+        return 'Other'
+
+
+def convert_to_dataframe(test_cases):
+    """Convert test cases JSON to DataFrame"""
+    if not test_cases:
+        return None
+    
+    # Column mapping
+    columns = {
+        'product_name': 'Product Name',
+        'process_category': 'Process Category',
+        'business_process_id': 'Business Process ID',
+        'business_process': 'Business Process',
+        'scenario_id': 'Scenario ID',
+        'scenario_description': 'Scenario Description',
+        'category': 'Category',
+        'importance': 'Importance',
+        'test_case_id': 'Test Case ID',
+        'tc_module': 'TC Module',
+        'test_condition': 'Test Condition',
+        'prerequisite': 'Pre-requisite',
+        'test_case_description': 'Test Case Description',
+        'expected_result': 'Expected Result'
+    }
+    
+    df = pd.DataFrame(test_cases)
+    df = df.rename(columns=columns)
+    
+    # Add Test Type column for categorization
+    df['Test Type'] = df['TC Module'].apply(categorize_test_case_type)
+    
+    # Reorder columns (add Test Type after TC Module)
+    column_order = list(columns.values())
+    # Insert Test Type after TC Module
+    tc_module_idx = column_order.index('TC Module')
+    column_order.insert(tc_module_idx + 1, 'Test Type')
+    
+    df = df[[col for col in column_order if col in df.columns]]
+    
+    return df
+
+
+def create_excel_output(df):
+    """Create formatted Excel output with separate sheets for different test types"""
+    output = io.BytesIO()
+    
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        # Helper function to format sheet
+        def format_sheet(worksheet, column_count=15):
+            header_fill = openpyxl.styles.PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+            header_font = openpyxl.styles.Font(color='FFFFFF', bold=True)
+            
+            for cell in worksheet[1]:
+                cell.fill = header_fill
+                cell.font = header_font
+                cell.alignment = openpyxl.styles.Alignment(horizontal='center', vertical='center', wrap_text=True)
+            
+            # Adjust column widths
+            column_widths = {
+                'A': 20, 'B': 30, 'C': 15, 'D': 40, 'E': 12, 'F': 40,
+                'G': 18, 'H': 12, 'I': 15, 'J': 20, 'K': 15, 'L': 40, 
+                'M': 30, 'N': 50, 'O': 50
+            }
+            
+            for col, width in column_widths.items():
+                if col in worksheet.column_dimensions:
+                    worksheet.column_dimensions[col].width = width
+        
+        # Write all test cases
+        df.to_excel(writer, sheet_name='All Test Cases', index=False)
+        format_sheet(writer.sheets['All Test Cases'])
+        
+        # Separate by Test Type
+        if 'Test Type' in df.columns:
+            # Field-Level Test Cases
+            field_df = df[df['Test Type'] == 'Field-Level']
+            if not field_df.empty:
+                field_df.to_excel(writer, sheet_name='Field-Level Tests', index=False)
+                format_sheet(writer.sheets['Field-Level Tests'])
+            
+            # Functional/Workflow Test Cases
+            functional_df = df[df['Test Type'] == 'Functional']
+            if not functional_df.empty:
+                functional_df.to_excel(writer, sheet_name='Functional Tests', index=False)
+                format_sheet(writer.sheets['Functional Tests'])
+            
+            # Negative Test Cases
+            negative_df = df[df['Test Type'] == 'Negative']
+            if not negative_df.empty:
+                negative_df.to_excel(writer, sheet_name='Negative Tests', index=False)
+                format_sheet(writer.sheets['Negative Tests'])
+            
+            # Other Test Cases (Reports, Modifications, etc.)
+            other_df = df[~df['Test Type'].isin(['Field-Level', 'Functional', 'Negative'])]
+            if not other_df.empty:
+                other_df.to_excel(writer, sheet_name='Other Tests', index=False)
+                format_sheet(writer.sheets['Other Tests'])
+        
+        # Add enhanced summary sheet
+        test_type_counts = df['Test Type'].value_counts().to_dict() if 'Test Type' in df.columns else {}
+        
+        summary_data = {
+            'Metric': [
+                'Total Test Cases',
+                'Field-Level Tests',
+                'Functional/Workflow Tests',
+                'Negative Tests',
+                'Other Tests',
+                '',
+                'Functional Positive',
+                'Functional Negative',
+                '',
+                'Critical Priority',
+                'High Priority',
+                'Medium Priority',
+                'Low Priority',
+                '',
+                'Unique Modules',
+                'Unique Scenarios'
+            ],
+            'Value': [
+                len(df),
+                test_type_counts.get('Field-Level', 0),
+                test_type_counts.get('Functional', 0),
+                test_type_counts.get('Negative', 0),
+                sum([v for k, v in test_type_counts.items() if k not in ['Field-Level', 'Functional', 'Negative']]),
+                '',
+                len(df[df['Category'].str.contains('Positive', case=False, na=False)]),
+                len(df[df['Category'].str.contains('negative', case=False, na=False)]),
+                '',
+                len(df[df['Importance'] == 'Critical']),
+                len(df[df['Importance'] == 'High']),
+                len(df[df['Importance'] == 'Medium']),
+                len(df[df['Importance'] == 'Low']),
+                '',
+                df['TC Module'].nunique(),
+                df['Scenario Description'].nunique()
+            ]
+        }
+        
+        summary_df = pd.DataFrame(summary_data)
+        summary_df.to_excel(writer, sheet_name='Summary', index=False)
+        
+        # Format summary sheet
+        summary_sheet = writer.sheets['Summary']
+        for cell in summary_sheet[1]:
+            cell.fill = openpyxl.styles.PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+            cell.font = openpyxl.styles.Font(color='FFFFFF', bold=True)
+        
+        summary_sheet.column_dimensions['A'].width = 30
+        summary_sheet.column_dimensions['B'].width = 20
+    
+    output.seek(0)
+    return output
+
+
+def export_format(path):
+    """Export format for an output path, from its extension"""
+    extension = os.path.splitext(path)[1].lower().lstrip('.')
+    if extension not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported output format '.{extension}'; use one of: {', '.join(EXPORT_FORMATS)}")
+    return extension
+
+
+def write_test_cases(test_cases, path):
+    """Write test cases to an .xlsx (formatted, one sheet per test type), .csv or .json file"""
+    output_format = export_format(path)
+    if output_format == 'json':
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'test_cases': test_cases}, f, indent=2, ensure_ascii=False)
+        return path
+
+    df = convert_to_dataframe(test_cases)
+    if df is None:
+        df = pd.DataFrame()
+    if output_format == 'csv':
+        df.to_csv(path, index=False)
+    else:
+        with open(path, 'wb') as f:
+            f.write(create_excel_output(df).getvalue())
+    return path
@@ -0,0 +1,588 @@
+"""
+Test Case Generation
+Generation request settings and parsing of complete, truncated or streamed test case JSON
+"""
+
+import json
+import re
+
+from ai_pipeline import DEFAULT_MAX_CONCURRENCY, completion_text, run_tasks
+from brd_sections import build_section_excerpt, build_section_index, get_section_text
+from token_budget import estimate_tokens
+
+GENERATION_MODEL = "gpt-4o"
+GENERATION_MAX_TOKENS = 16384
+GENERATION_TEMPERATURE = 0.3
+
+SYSTEM_MESSAGE = "You are an expert QA Test Analyst specialized in creating comprehensive test cases from Business Requirements Documents."
+
+TEST_CASES_KEY = 'test_cases'
+
+# Requirements per batch in batched mode; ~12 cases fit max_tokens with room to spare
+DEFAULT_BATCH_SIZE = 12
+
+# Batches get the whole BRD up to this size, otherwise only their source sections
+BATCH_FULL_CONTEXT_TOKENS = 10000
+
+# Follow-up calls made when a response stops at max_tokens
+DEFAULT_CONTINUATION_ROUNDS = 3
+
+
+def format_requirements_summary(requirements, total_requirements_count):
+    """Requirements section of the generation prompt (first 10 listed for reference)"""
+    summary = f"Generate EXACTLY {total_requirements_count} test cases - one for each requirement:\n"
+    for i, req in enumerate(requirements[:10], 1):  # Show first 10 for reference
+        summary += f"{i}. {req.get('title', 'N/A')} (Type: {req.get('requirement_type', 'N/A')})\n"
+    if len(requirements) > 10:
+        summary += f"... and {len(requirements) - 10} more requirements"
+    return summary
+
+
+GENERATION_INSTRUCTIONS = """## GENERATION INSTRUCTIONS
+
+Based on the BRD document and requirements analysis below, generate comprehensive test cases following the framework provided.
+
+**CRITICAL REQUIREMENT**: Generate EXACTLY the TEST CASE COUNT given under RUN SETTINGS - ONE test case for EACH identified requirement. Be comprehensive and granular - break down complex features into multiple specific test cases.
+
+**MINIMUM TEST CASE TARGET**: the TEST CASE COUNT under RUN SETTINGS (ensure comprehensive coverage)
+
+**APPLICATION DOMAIN/CONTEXT:**
+Given under RUN SETTINGS.
+
+Use domain-appropriate terminology, workflows, and test scenarios relevant to this industry/application type.
+
+**IMPORTANT REQUIREMENTS:**
+1. Generate test cases in the 14-column structure specified
+2. Include field-level validation test cases (~20%)
+3. Include workflow test cases with 15-step pattern (~55%)
+4. Include authorization/approval test cases (6+ per workflow if applicable)
+5. Include negative test cases (the NEGATIVE TEST RATIO under RUN SETTINGS)
+6. Consider the VARIATIONS listed under RUN SETTINGS
+7. Focus on the MODULES listed under RUN SETTINGS
+
+**ADAPT TO DOMAIN:**
+- Use terminology specific to the application domain
+- Include domain-specific validations and business rules
+- Create realistic test scenarios for this industry
+- Consider domain-specific user roles and workflows
+
+**IMPORTANT - TEST CASE CATEGORIZATION:**
+Clearly mark each test case with appropriate type in the TC Module field:
+- **Field-Level**: Use format "[Module Name] - Field Validation"
+- **Functional/Workflow**: Use format "[Module Name] - Workflow"
+- **Negative**: Use format "[Module Name] - Negative Test"
+
+**TEST CASE DISTRIBUTION:**
+1. **Field-Level Test Cases (~20% of total)**:
+   - Focus on field validations, formats, mandatory checks
+   - TC Module should end with "- Field Validation"
+   - Example: "Account Opening - Field Validation"
+
+2. **Functional/Workflow Test Cases (~60% of total)**:
+   - Focus on end-to-end workflows, business processes
+   - TC Module should end with "- Workflow"
+   - Example: "Account Opening - Workflow"
+
+3. **Negative Test Cases (~15% of total)**:
+   - Focus on business rule violations, error scenarios
+   - TC Module should end with "- Negative Test"
+   - Example: "Account Opening - Negative Test"
+
+4. **Other Test Cases (~5%)**:
+   - Reports, inquiries, modifications
+   - TC Module should reflect the type
+
+**OUTPUT FORMAT:**
+Return ONLY a valid JSON object with a "test_cases" key containing an array of test case objects.
+Each test case object must have these 14 fields:
+- product_name
+- process_category
+- business_process_id
+- business_process
+- scenario_id
+- scenario_description
+- category
+- importance
+- test_case_id
+- tc_module (MUST include type suffix: "- Field Validation", "- Workflow", or "- Negative Test")
+- test_condition
+- prerequisite
+- test_case_description
+- expected_result
+
+**IMPORTANT - COMPREHENSIVE TEST CASE COUNT REQUIREMENT:**
+Generate EXACTLY the TEST CASE COUNT under RUN SETTINGS based on:
+- One test case for each functional requirement identified in the requirements analysis
+- If requirements analysis found fewer than 30 requirements, expand by breaking down complex features into granular test cases
+- Each screen, form section, workflow step, validation rule should be a separate test case
+- Cover all UI elements, business processes, data validations, integrations, reports, and security aspects
+- Be granular: "User Registration" should become 4-5 separate test cases (personal details, contact details, document upload, email verification, account activation)
+- Ensure comprehensive coverage: that many unique test cases
+- No duplicates - each test case must test a unique aspect of the system
+
+Example format:
+{
+  "test_cases": [
+    {
+      "product_name": "Banking Application",
+      "process_category": "Account Opening",
+      "tc_module": "Account Opening - Field Validation",
+      ...
+    },
+    {
+      "product_name": "Banking Application",
+      "process_category": "Account Opening",
+      "tc_module": "Account Opening - Workflow",
+      ...
+    }
+  ]
+}"""
+
+
+def run_settings(total_requirements_count, options):
+    """RUN SETTINGS section: the per-run values the static instructions refer to"""
+    count = total_requirements_count if isinstance(total_requirements_count, int) else 'at least 35'
+    return f"""## RUN SETTINGS
+
+- TEST CASE COUNT: {count}
+- APPLICATION DOMAIN: {options.get('domain_context') or 'Identify from BRD'}
+- NEGATIVE TEST RATIO: ~{options['negative_ratio']}%
+- VARIATIONS: {', '.join(options['variations']) if options['variations'] else 'Identify from BRD'}
+- MODULES: {', '.join(options['focus_modules']) if options['focus_modules'] else 'All modules from BRD'}"""
+
+
+def build_generation_prompt(prompt_template, brd_text, requirements_summary, total_requirements_count, options):
+    """Full generation prompt, ordered from most to least stable.
+
+    The framework template and instructions are byte-identical across runs,
+    so the provider can serve them from its prompt cache; they are followed
+    by the BRD (shared by every batch of a small BRD), the requirements and
+    finally the run settings.
+    """
+    return f"""{prompt_template}
+
+---
+
+{GENERATION_INSTRUCTIONS}
+
+---
+
+## BRD DOCUMENT TO ANALYZE
+
+{brd_text}
+
+---
+
+## REQUIREMENTS ANALYSIS RESULTS
+
+{requirements_summary}
+
+---
+
+{run_settings(total_requirements_count, options)}
+
+Start generating now:"""
+
+
+def generation_request(full_prompt):
+    """chat.completions.create arguments for one generation call"""
+    return {
+        'model': GENERATION_MODEL,
+        'messages': [
+            {"role": "system", "content": SYSTEM_MESSAGE},
+            {"role": "user", "content": full_prompt}
+        ],
+        'max_tokens': GENERATION_MAX_TOKENS,
+        'temperature': GENERATION_TEMPERATURE,
+        'response_format': {"type": "json_object"},
+    }
+
+
+class StreamingTestCaseParser:
+    """Incremental parser that emits each test case object as soon as it is complete.
+
+    Text can be fed in pieces of any size; string/escape state and nesting
+    depth carry over between pieces, so every character is scanned once.
+    Objects are read from the "test_cases" array of the top-level object,
+    or from a top-level array.
+    """
+
+    def __init__(self):
+        self.test_cases = []
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._key = None
+        self._key_parts = None
+        self._expect_key = False
+        self._array_depth = None
+        self._array_done = False
+        self._object_parts = None
+
+    def feed(self, text):
+        """Consume the next piece of text; returns the test cases completed by it"""
+        completed = []
+        capture_from = 0 if self._object_parts is not None else None
+
+        for index, char in enumerate(text):
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._key_parts is not None:
+                        self._key = ''.join(self._key_parts)
+                        self._key_parts = None
+                elif self._key_parts is not None:
+                    self._key_parts.append(char)
+                continue
+
+            if char == '"':
+                self._in_string = True
+                # Only keys of the top-level object are recorded, never string values
+                self._key_parts = [] if self._depth == 1 and self._expect_key else None
+            elif char == ':' and self._depth == 1:
+                self._expect_key = False
+            elif char == ',' and self._depth == 1:
+                self._expect_key = True
+                self._key = None
+            elif char == '{':
+                if self._object_parts is None and self._array_depth is not None and self._depth == self._array_depth:
+                    self._object_parts = []
+                    capture_from = index
+                self._depth += 1
+                if self._depth == 1:
+                    self._expect_key = True
+            elif char == '[':
+                if self._array_depth is None and not self._array_done and (
+                        self._depth == 0 or (self._depth == 1 and self._key == TEST_CASES_KEY)):
+                    self._array_depth = self._depth + 1
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._object_parts is not None and self._depth == self._array_depth:
+                    self._object_parts.append(text[capture_from:index + 1])
+                    try:
+                        test_case = json.loads(''.join(self._object_parts))
+                    except json.JSONDecodeError:
+                        test_case = None
+                    if isinstance(test_case, dict):
+                        completed.append(test_case)
+                    self._object_parts = None
+                    capture_from = None
+            elif char == ']':
+                self._depth -= 1
+                if self._array_depth is not None and self._depth == self._array_depth - 1:
+                    self._array_depth = None
+                    self._array_done = True
+
+        if self._object_parts is not None and capture_from is not None:
+            self._object_parts.append(text[capture_from:])
+
+        self.test_cases.extend(completed)
+        return completed
+
+
+def extract_complete_test_cases(response_text):
+    """Every complete test case object in a possibly truncated response"""
+    parser = StreamingTestCaseParser()
+    parser.feed(response_text)
+    return parser.test_cases
+
+
+def parse_test_cases_response(response_text):
+    """Parse a generation response into a list of test cases.
+
+    Returns (test_cases, recovered): recovered is True when the JSON was
+    cut off and only its complete objects could be kept. test_cases is
+    None when nothing usable was found.
+    """
+    try:
+        json_response = json.loads(response_text)
+    except json.JSONDecodeError:
+        test_cases = extract_complete_test_cases(response_text)
+        if test_cases:
+            return test_cases, True
+
+        # Final fallback - try to extract any JSON array
+        start_idx = response_text.find('[')
+        end_idx = response_text.rfind(']') + 1
+        if start_idx != -1 and end_idx > start_idx:
+            try:
+                return json.loads(response_text[start_idx:end_idx]), False
+            except json.JSONDecodeError:
+                pass
+        return None, False
+
+    if isinstance(json_response, dict) and TEST_CASES_KEY in json_response:
+        test_cases = json_response[TEST_CASES_KEY]
+        return (test_cases if test_cases and isinstance(test_cases, list) else None), False
+    if isinstance(json_response, list):
+        return json_response, False
+
+    if not isinstance(json_response, dict):
+        return None, False
+
+    # Try to find test_cases array in the response
+    for value in json_response.values():
+        if isinstance(value, list) and len(value) > 0:
+            return value, False
+    return None, False
+
+
+def _test_case_signature(test_case):
+    """Normalized condition + description, to catch a continuation repeating a test case under a new ID"""
+    return tuple(
+        ' '.join(str(test_case.get(field) or '').lower().split())
+        for field in ('test_condition', 'test_case_description')
+    )
+
+
+def add_new_test_cases(test_cases, new_cases):
+    """Append the test cases from a continuation that are not already present; returns those added.
+
+    Duplicates are recognised by content, not ID, since a continuation may
+    restart or reuse the ID sequence.
+    """
+    seen = {_test_case_signature(tc) if any(_test_case_signature(tc)) else json.dumps(tc, sort_keys=True)
+            for tc in test_cases}
+    added = []
+    for test_case in new_cases:
+        if not isinstance(test_case, dict):
+            continue
+        signature = _test_case_signature(test_case)
+        key = signature if any(signature) else json.dumps(test_case, sort_keys=True)
+        if key in seen:
+            continue
+        seen.add(key)
+        test_cases.append(test_case)
+        added.append(test_case)
+    return added
+
+
+def _ensure_unique_ids(test_cases):
+    """Renumber stitched test cases if a continuation reused IDs"""
+    ids = [tc.get('test_case_id') for tc in test_cases]
+    if len(set(ids)) != len(ids):
+        renumber_test_cases(test_cases)
+
+
+def continuation_request(request, test_cases, target_count=None):
+    """Follow-up request asking the model to continue after the last complete test case.
+
+    The already generated test cases are summarized by ID and condition
+    rather than replayed in full, which keeps the follow-up prompt small.
+    """
+    last_id = test_cases[-1].get('test_case_id', 'N/A') if test_cases else None
+    written = '\n'.join(
+        f"- {tc.get('test_case_id', 'N/A')}: {tc.get('test_condition', 'N/A')}" for tc in test_cases
+    ) or '- (none)'
+    remaining = ''
+    if isinstance(target_count, int) and target_count > len(test_cases):
+        remaining = f" About {target_count - len(test_cases)} test cases are still needed."
+
+    instruction = f"""Your previous response was cut off at the output token limit.
+
+Test cases already generated:
+{written}
+
+Continue generating the remaining test cases{f' after {last_id}' if last_id else ' from the beginning'}, following the same framework and instructions.{remaining}
+Do not repeat any test case listed above. Continue the test_case_id sequence.
+Return ONLY a valid JSON object with a "test_cases" key containing the new test case objects."""
+
+    follow_up = dict(request)
+    follow_up['messages'] = list(request['messages']) + [{"role": "user", "content": instruction}]
+    return follow_up
+
+
+def _continuation_steps(request, max_rounds, target_count):
+    """The continuation loop as a generator shared by the sync and async drivers.
+
+    Yields each request to send and is sent back its (response_text,
+    finish_reason); returns (test_cases, info) when done.
+    """
+    response_text, finish_reason = yield request
+    test_cases, recovered = parse_test_cases_response(response_text)
+    test_cases = [tc for tc in test_cases or [] if isinstance(tc, dict)]
+    info = {'rounds': 0, 'truncated': finish_reason == 'length', 'recovered': recovered, 'responses': [response_text]}
+
+    while finish_reason == 'length' and info['rounds'] < max_rounds:
+        info['rounds'] += 1
+        response_text, finish_reason = yield continuation_request(request, test_cases, target_count)
+        info['responses'].append(response_text)
+        new_cases, _ = parse_test_cases_response(response_text)
+        if not add_new_test_cases(test_cases, new_cases or []):
+            break
+    info['truncated'] = finish_reason == 'length'
+    _ensure_unique_ids(test_cases)
+    return test_cases or None, info
+
+
+def generate_with_continuation(call, request, max_rounds=DEFAULT_CONTINUATION_ROUNDS, target_count=None):
+    """Run a generation call and keep continuing it while it stops at the token limit.
+
+    call(request) returns (response_text, finish_reason). Pieces are
+    stitched together without duplicates for up to max_rounds follow-up
+    calls. Returns (test_cases, info) where test_cases is None if nothing
+    could be parsed and info reports 'rounds', 'truncated' (still cut off
+    when the rounds ran out), 'recovered' and the raw 'responses'.
+    """
+    steps = _continuation_steps(request, max_rounds, target_count)
+    try:
+        params = next(steps)
+        while True:
+            params = steps.send(call(params))
+    except StopIteration as done:
+        return done.value
+
+
+async def generate_with_continuation_async(complete, request, max_rounds=DEFAULT_CONTINUATION_ROUNDS, target_count=None):
+    """generate_with_continuation for pipeline tasks, using the engine's complete(**params)"""
+    steps = _continuation_steps(request, max_rounds, target_count)
+    try:
+        params = next(steps)
+        while True:
+            completion = await complete(**params)
+            params = steps.send((completion_text(completion), completion.choices[0].finish_reason))
+    except StopIteration as done:
+        return done.value
+
+
+def group_requirements(requirements, max_group_size=DEFAULT_BATCH_SIZE):
+    """Split requirements into batches that keep each module's requirements together.
+
+    Modules larger than max_group_size are split; small modules are packed
+    together in document order so batches stay close to max_group_size.
+    """
+    modules = {}
+    for requirement in requirements:
+        modules.setdefault(str(requirement.get('module') or 'General'), []).append(requirement)
+
+    groups = []
+    current = []
+    for module_requirements in modules.values():
+        for start in range(0, len(module_requirements), max_group_size):
+            piece = module_requirements[start:start + max_group_size]
+            if current and len(current) + len(piece) > max_group_size:
+                groups.append(current)
+                current = []
+            current = current + piece
+    if current:
+        groups.append(current)
+    return groups
+
+
+def batch_requirements_summary(group, position, total_batches):
+    """Requirements section for one batch: every requirement of the group, in full"""
+    lines = [
+        f"This is batch {position + 1} of {total_batches}. Other requirements are covered by other batches.",
+        f"Generate EXACTLY {len(group)} test cases - one for each requirement below and for no other requirement.",
+        "Give each test case a requirement_id field with the ID of the requirement it covers:",
+    ]
+    for req in group:
+        lines.append(
+            f"- {req.get('requirement_id', 'N/A')} [{req.get('module', 'N/A')}] {req.get('title', 'N/A')} "
+            f"(Type: {req.get('requirement_type', 'N/A')}): {req.get('description', '')}"
+        )
+    return '\n'.join(lines)
+
+
+def _fit_tokens(text, section_index, max_tokens):
+    """Section excerpt of text trimmed to about max_tokens"""
+    tokens = estimate_tokens(text, GENERATION_MODEL)
+    if tokens <= max_tokens:
+        return text
+    max_chars = int(len(text) * max_tokens / tokens)
+    return build_section_excerpt(text, section_index or build_section_index(text), max_chars)
+
+
+def batch_brd_context(brd_text, group, section_index=None, max_tokens=BATCH_FULL_CONTEXT_TOKENS):
+    """BRD text sent with one batch: the whole BRD if small, else the group's source sections"""
+    if estimate_tokens(brd_text, GENERATION_MODEL) <= max_tokens:
+        return brd_text
+
+    if section_index is None:
+        section_index = build_section_index(brd_text)
+    section_ids = []
+    for req in group:
+        if req.get('source_section') and req['source_section'] not in section_ids:
+            section_ids.append(req['source_section'])
+    context = '\n'.join(get_section_text(brd_text, section_index, section_id) for section_id in section_ids)
+    if not context.strip():
+        return _fit_tokens(brd_text, section_index, max_tokens)
+    return _fit_tokens(context, None, max_tokens)
+
+
+def renumber_test_cases(test_cases, prefix='TC_'):
+    """Give merged test cases globally unique, sequential IDs"""
+    width = max(3, len(str(len(test_cases))))
+    for number, test_case in enumerate(test_cases, 1):
+        test_case['test_case_id'] = f"{prefix}{number:0{width}d}"
+    return test_cases
+
+
+def continue_test_case_ids(test_cases, new_cases, prefix='TC_'):
+    """Number new_cases after the highest ID in test_cases, leaving existing IDs untouched"""
+    numbers = [int(match.group(1)) for match in
+               (re.match(re.escape(prefix) + r'(\d+)$', str(tc.get('test_case_id') or '')) for tc in test_cases) if match]
+    start = max(numbers, default=0)
+    width = max(3, len(str(start + len(new_cases))))
+    for number, test_case in enumerate(new_cases, start + 1):
+        test_case['test_case_id'] = f"{prefix}{number:0{width}d}"
+    return new_cases
+
+
+def generate_in_batches(prompt_template, brd_text, requirements, options, api_key, section_index=None,
+                        batch_size=DEFAULT_BATCH_SIZE, max_concurrency=DEFAULT_MAX_CONCURRENCY, on_done=None,
+                        cache=None, refresh_cache=False, max_rounds=DEFAULT_CONTINUATION_ROUNDS):
+    """Generate test cases for requirement groups in parallel calls and merge them.
+
+    Truncated batches are continued for up to max_rounds follow-up calls.
+    Returns (test_cases, batches) where batches reports, per batch, its
+    requirement count, the test cases kept, the continuation rounds used,
+    whether it was still cut off ('recovered') and any error. on_done(position,
+    test_cases_so_far, batch) is called as each batch finishes.
+    """
+    groups = group_requirements(requirements, batch_size)
+    requests = []
+    for position, group in enumerate(groups):
+        summary = batch_requirements_summary(group, position, len(groups))
+        context = batch_brd_context(brd_text, group, section_index)
+        requests.append(generation_request(build_generation_prompt(prompt_template, context, summary, len(group), options)))
+
+    batches = [{'requirements': len(group), 'test_cases': [], 'error': None, 'recovered': False, 'rounds': 0}
+               for group in groups]
+
+    def make_task(position, request):
+        async def task(complete):
+            return await generate_with_continuation_async(complete, request, max_rounds, len(groups[position]))
+        return task
+
+    def batch_done(position, result):
+        batch = batches[position]
+        if isinstance(result, Exception):
+            batch['error'] = str(result)
+        else:
+            test_cases, info = result
+            batch['test_cases'] = test_cases or []
+            batch['recovered'] = info['truncated'] or (info['recovered'] and not info['rounds'])
+            batch['rounds'] = info['rounds']
+            if test_cases is None:
+                batch['error'] = "No test cases could be parsed from the response"
+            group_ids = [req.get('requirement_id') for req in groups[position]]
+            for test_case in batch['test_cases']:
+                # Keep traceability to the requirement a test case covers, or else to its whole batch
+                if test_case.get('requirement_id') in group_ids:
+                    test_case.setdefault('requirement_ids', [test_case['requirement_id']])
+                else:
+                    test_case.setdefault('requirement_ids', group_ids)
+        if on_done is not None:
+            on_done(position, [tc for b in batches for tc in b['test_cases']], batch)
+
+    tasks = [make_task(position, request) for position, request in enumerate(requests)]
+    run_tasks(tasks, api_key, max_concurrency, batch_done, cache, refresh_cache, options.get('base_url'))
+
+    test_cases = [test_case for batch in batches for test_case in batch['test_cases']]
+    return renumber_test_cases(test_cases), batches
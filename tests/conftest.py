@@ -0,0 +1,49 @@
+"""
+Shared fixtures: a small sectioned BRD, a mock OpenAI server and per-test stores
+"""
+
+import pytest
+
+import brd_revisions
+import openai_clients
+import requirements_analysis
+import sqlite_cache
+from mock_openai_server import start_server
+
+SAMPLE_BRD = """# Objectives
+This document covers the account opening requirements agreed with the client.
+# Account Opening
+## Customer Details
+The customer name is mandatory and limited to 60 characters
+The date of birth must show the customer is at least 18 years old
+## Initial Deposit
+The initial deposit must be at least 100 in the account currency
+Deposits above 10000 need supervisor approval
+# Reports
+## Daily Report
+A daily report lists every account opened that day with its branch
+"""
+
+
+@pytest.fixture
+def sample_brd():
+    return SAMPLE_BRD
+
+
+@pytest.fixture
+def stores(tmp_path, monkeypatch):
+    """Run with fresh SQLite stores in a temporary directory"""
+    monkeypatch.setattr(sqlite_cache, 'CACHE_DIR', str(tmp_path))
+    monkeypatch.setattr(requirements_analysis, '_requirements_store', None)
+    monkeypatch.setattr(brd_revisions, '_suite_store', None)
+    return tmp_path
+
+
+@pytest.fixture
+def mock_api(monkeypatch):
+    """Point the server-default base URL at a mock server for the test; yields its base URL"""
+    server, base_url = start_server(latency=0)
+    monkeypatch.setattr(openai_clients, 'DEFAULT_BASE_URL', base_url)
+    yield base_url
+    server.shutdown()
+    server.server_close()
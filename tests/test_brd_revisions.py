@@ -0,0 +1,92 @@
+from brd_pipeline import generate_suite, incremental_options, regenerate_suite, DEFAULT_OPTIONS
+from brd_revisions import diff_sections, plan_revision
+from brd_sections import build_section_index
+
+
+def _revise(text):
+    return text.replace("at least 100", "at least 250").replace("# Reports\n", "# Reports\n## Audit Trail\nEvery change is audited\n")
+
+
+def _titles(text, section_ids):
+    index = build_section_index(text)
+    return [index['sections'][index['by_id'][section_id]]['title'] for section_id in section_ids]
+
+
+def test_diff_sections_classifies_changes(sample_brd):
+    revised = _revise(sample_brd)
+    diff = diff_sections(sample_brd, revised)
+
+    assert _titles(revised, [new for _, new in diff['changed']]) == ['Initial Deposit']
+    assert _titles(revised, diff['added']) == ['Audit Trail']
+    assert diff['removed'] == []
+    assert len(diff['unchanged']) == len(build_section_index(sample_brd)['sections']) - 1
+
+
+def test_diff_sections_ignores_reflowed_text(sample_brd):
+    reflowed = sample_brd.replace("mandatory and limited", "mandatory\nand   limited")
+    diff = diff_sections(sample_brd, reflowed)
+    assert diff['changed'] == [] and diff['added'] == [] and diff['removed'] == []
+
+
+def _previous_suite(text):
+    index = build_section_index(text)
+    section_id = {section['title']: section['id'] for section in index['sections']}
+    requirements = [
+        {'requirement_id': 'REQ-001', 'title': 'Name', 'source_section': section_id['Customer Details']},
+        {'requirement_id': 'REQ-002', 'title': 'Deposit', 'source_section': section_id['Initial Deposit']},
+    ]
+    test_cases = [
+        {'test_case_id': 'TC_001', 'requirement_ids': ['REQ-001']},
+        {'test_case_id': 'TC_002', 'requirement_ids': ['REQ-002']},
+        {'test_case_id': 'TC_003', 'requirement_ids': ['REQ-001', 'REQ-002']},
+    ]
+    return {'created_at': '2026-01-01 00:00:00', 'brd_text': text,
+            'artifact': {'requirements': requirements}, 'test_cases': test_cases}
+
+
+def test_plan_revision_keeps_unchanged_sections(sample_brd):
+    revised = _revise(sample_brd)
+    plan, reason = plan_revision(_previous_suite(sample_brd), revised)
+
+    assert reason is None
+    assert [req['requirement_id'] for req in plan['kept_requirements']] == ['REQ-001']
+    assert [req['requirement_id'] for req in plan['dropped_requirements']] == ['REQ-002']
+    assert [tc['test_case_id'] for tc in plan['kept_test_cases']] == ['TC_001']
+    assert [tc['test_case_id'] for tc in plan['dropped_test_cases']] == ['TC_002', 'TC_003']
+    assert sorted(_titles(revised, plan['sections_to_extract'])) == ['Audit Trail', 'Initial Deposit']
+    # Kept requirements point at the section IDs of the new version
+    assert _titles(revised, [plan['kept_requirements'][0]['source_section']]) == ['Customer Details']
+
+
+def test_plan_revision_needs_traceable_suite(sample_brd):
+    previous = _previous_suite(sample_brd)
+    del previous['artifact']['requirements'][0]['source_section']
+    plan, reason = plan_revision(previous, _revise(sample_brd))
+    assert plan is None and 'section by section' in reason
+
+    previous = _previous_suite(sample_brd)
+    previous['test_cases'][0]['requirement_ids'] = []
+    plan, reason = plan_revision(previous, _revise(sample_brd))
+    assert plan is None and 'not traced' in reason
+
+
+def test_revision_takes_incremental_path(sample_brd, stores, mock_api):
+    options = incremental_options(dict(DEFAULT_OPTIONS, section_index=build_section_index(sample_brd)))
+    baseline = generate_suite(sample_brd, "Generate {target_count} test cases for this BRD:\n{brd_text}", 'sk-test',
+                              options)
+    assert baseline['test_cases']
+
+    previous = {'created_at': '2026-01-01 00:00:00', 'brd_text': sample_brd,
+                'artifact': baseline['artifact'], 'test_cases': baseline['test_cases']}
+    revised = _revise(sample_brd)
+    messages = []
+    suite = regenerate_suite(revised, "Generate {target_count} test cases for this BRD:\n{brd_text}", 'sk-test',
+                             incremental_options(dict(DEFAULT_OPTIONS, section_index=build_section_index(revised))),
+                             previous, report=lambda level, message: messages.append((level, message)))
+
+    assert not any(level == 'warning' for level, _ in messages), messages
+    revision = suite['revision']
+    assert (revision['sections_changed'], revision['sections_added'], revision['sections_removed']) == (1, 1, 0)
+    assert revision['requirements_added'] > 0
+    assert revision['test_cases_kept'] > 0
+    assert len(suite['test_cases']) == revision['test_cases_kept'] + revision['test_cases_generated']
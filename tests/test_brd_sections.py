@@ -0,0 +1,61 @@
+import pytest
+
+from brd_sections import build_section_excerpt, build_section_index, get_section_text
+
+
+def _long_brd(sections=1000):
+    return ''.join(
+        f"# Section {number} title\n" + "The system shall validate the field. " * (number * 37 % 60 + 1) + "\n"
+        for number in range(sections)
+    )
+
+
+def test_section_index_offsets(sample_brd):
+    index = build_section_index(sample_brd)
+    titles = [section['title'] for section in index['sections']]
+    assert titles == ['Objectives', 'Account Opening', 'Customer Details', 'Initial Deposit', 'Reports', 'Daily Report']
+
+    deposit = index['sections'][titles.index('Initial Deposit')]
+    assert deposit['parent'] == index['sections'][titles.index('Account Opening')]['id']
+    assert get_section_text(sample_brd, index, deposit['id']).startswith("## Initial Deposit\n")
+
+
+@pytest.mark.parametrize('max_chars', [500, 5000, 15000, 50000, 200000])
+def test_excerpt_honors_budget(max_chars):
+    text = _long_brd()
+    excerpt = build_section_excerpt(text, build_section_index(text), max_chars)
+    assert len(excerpt) <= max_chars
+
+
+def test_excerpt_keeps_every_heading_when_they_fit():
+    text = _long_brd()
+    excerpt = build_section_excerpt(text, build_section_index(text), 50000)
+    assert excerpt.count('# Section ') == 1000
+    assert '[... truncated ...]' in excerpt
+
+
+def test_excerpt_falls_back_to_headings():
+    text = _long_brd()
+    excerpt = build_section_excerpt(text, build_section_index(text), 5000)
+    assert excerpt.startswith("# Section 0 title\n# Section 1 title\n")
+    assert excerpt.endswith("more section(s) omitted ...]\n")
+
+
+def test_excerpt_returns_short_text_unchanged(sample_brd):
+    assert build_section_excerpt(sample_brd, build_section_index(sample_brd), 10000) == sample_brd
+
+
+def test_pipe_in_heading_is_not_a_table_row():
+    text = ("4.2 Fees | Charges\nThe system shall charge the fee.\n"
+            "Fee | Amount | Frequency\nLedger | 10 | Monthly\nCard |  | Yearly\n"
+            "4.3 Sheet\nName|Limit\nSavings|100\n")
+    sections = build_section_index(text)['sections']
+    assert [(section['kind'], section['title']) for section in sections] == [
+        ('clause', 'Fees | Charges'), ('table', 'Table (3 rows)'), ('clause', 'Sheet'), ('table', 'Table (2 rows)'),
+    ]
+    assert text[sections[1]['start']:].startswith("Fee | Amount")
+
+
+def test_pipe_in_prose_is_not_a_table_row():
+    text = "# Scope\nUse the a|b option when | appears | oddly\nThe system shall log it.\n"
+    assert [section['kind'] for section in build_section_index(text)['sections']] == ['heading']
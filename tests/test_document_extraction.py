@@ -0,0 +1,80 @@
+import os
+import zipfile
+
+import document_extraction
+from document_extraction import W_NS, extract_documents, extraction_cache_key, iter_docx_blocks
+from sqlite_cache import SQLiteCache
+from upload_storage import hash_file
+
+
+def test_cache_key_uses_known_hash(tmp_path, monkeypatch):
+    path = tmp_path / 'brd.txt'
+    path.write_text("Objectives\n")
+    digest = hash_file(str(path))
+    assert extraction_cache_key('brd.txt', str(path)) == extraction_cache_key('brd.txt', str(path), digest)
+
+    def fail(path):
+        raise AssertionError("the file was hashed again")
+    monkeypatch.setattr(document_extraction, 'hash_file', fail)
+    assert extraction_cache_key('brd.txt', str(path), digest).startswith(digest)
+
+
+def test_extract_documents_serves_cached_text(tmp_path):
+    path = tmp_path / 'brd.txt'
+    path.write_text("# Objectives\nAccounts are opened online\n")
+    cache = SQLiteCache('extraction.sqlite', cache_dir=str(tmp_path))
+    documents = [('brd.txt', str(path), hash_file(str(path)))]
+
+    first = extract_documents(documents, cache=cache)
+    second = extract_documents(documents, cache=cache)
+    assert first[0]['text'] == second[0]['text']
+    assert second[0].get('cached') and not first[0].get('cached')
+
+
+DOCX_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'CASA and TD BRD (1).docx')
+
+
+def test_docx_headings_are_marked_and_stripped():
+    lines = list(iter_docx_blocks(DOCX_PATH))
+    assert lines[0] == "# Objectives"
+    assert lines[1:3] == [lines[1].strip(), lines[2].strip()]
+    assert "## CASA Product Configuration" in lines
+    assert not any(line[:1].isspace() for line in lines)
+
+
+def _write_docx(path, body):
+    with zipfile.ZipFile(path, 'w') as docx:
+        docx.writestr('word/document.xml', (
+            f'<w:document xmlns:w="{W_NS[1:-1]}"><w:body>{body}</w:body></w:document>'
+        ))
+
+
+def test_docx_tab_stops_are_not_text(tmp_path):
+    path = str(tmp_path / 'tabs.docx')
+    _write_docx(path, (
+        '<w:p><w:pPr><w:tabs><w:tab w:val="right" w:pos="9000"/></w:tabs></w:pPr>'
+        '<w:r><w:t>Limit</w:t></w:r><w:r><w:tab/></w:r><w:r><w:t>5000</w:t></w:r></w:p>'
+    ))
+    assert list(iter_docx_blocks(path)) == ["Limit\t5000"]
+
+
+def test_docx_content_control_blocks_are_freed(tmp_path, monkeypatch):
+    path = str(tmp_path / 'sdt.docx')
+    paragraphs = ''.join(f'<w:p><w:r><w:t>Line {number}</w:t></w:r></w:p>' for number in range(50))
+    _write_docx(path, f'<w:sdt><w:sdtContent>{paragraphs}</w:sdtContent></w:sdt>')
+
+    parsed = []
+    iterparse = document_extraction.etree.iterparse
+
+    def recording_iterparse(*args, **kwargs):
+        for event, elem in iterparse(*args, **kwargs):
+            parsed.append(elem)
+            yield event, elem
+    monkeypatch.setattr(document_extraction.etree, 'iterparse', recording_iterparse)
+
+    lines = []
+    for line in iter_docx_blocks(path):
+        lines.append(line)
+        # Finished paragraphs inside the content control are removed as the parse goes
+        assert len(list(parsed[-1].itersiblings(preceding=True))) <= 1
+    assert lines == [f"Line {number}" for number in range(50)]
@@ -0,0 +1,21 @@
+import openai_clients
+from openai_clients import close_openai_clients, get_openai_client, resolve_base_url
+
+
+def test_clients_are_pooled_per_key_and_base_url(monkeypatch):
+    monkeypatch.setattr(openai_clients, 'DEFAULT_BASE_URL', None)
+    try:
+        first = get_openai_client('sk-test', 'http://127.0.0.1:1/v1')
+        assert get_openai_client('sk-test', 'http://127.0.0.1:1/v1/') is first
+        other = get_openai_client('sk-test', 'http://127.0.0.1:2/v1')
+        assert other is not first
+        assert str(other.base_url).startswith('http://127.0.0.1:2/v1')
+    finally:
+        close_openai_clients()
+
+
+def test_session_base_url_overrides_server_default(monkeypatch):
+    monkeypatch.setattr(openai_clients, 'DEFAULT_BASE_URL', 'http://default/v1')
+    assert resolve_base_url(None) == 'http://default/v1'
+    assert resolve_base_url('  ') == 'http://default/v1'
+    assert resolve_base_url('http://session/v1/') == 'http://session/v1'
@@ -0,0 +1,48 @@
+from brd_sections import build_section_excerpt, build_section_index
+from pipeline_plan import generation_targets, plan_pipeline
+from requirements_analysis import REQUIREMENTS_MAX_TOKENS
+from requirements_coverage import COVERAGE_EXCERPT_CHARS, COVERAGE_MAX_TOKENS
+from test_case_generation import BATCH_FULL_CONTEXT_TOKENS, GENERATION_MAX_TOKENS
+from token_budget import TOKENS_PER_TEST_CASE, estimate_tokens
+
+BRD = "The system shall validate the account number. " * 20000
+
+
+def test_plan_caps_requirements_output_per_chunk():
+    plan = plan_pipeline(BRD, '', {'max_concurrency': 4}, requirements_count=500, chunk_count=2)
+    requirements_stage = plan['stages'][0]
+    assert requirements_stage['calls'] == 2
+    assert requirements_stage['output_tokens'] == 2 * REQUIREMENTS_MAX_TOKENS
+
+
+def test_plan_limits_batch_context():
+    batched = plan_pipeline(BRD, '', {'batched': True, 'batch_size': 10}, requirements_count=40)
+    single = plan_pipeline(BRD, '', {}, requirements_count=40)
+    generation_batched, generation_single = batched['stages'][1], single['stages'][1]
+    assert generation_batched['calls'] == 4
+    prompt_tokens = generation_single['input_tokens'] - estimate_tokens(BRD)
+    assert generation_batched['input_tokens'] == 4 * (prompt_tokens + BATCH_FULL_CONTEXT_TOKENS)
+
+
+def test_generation_targets_follow_the_pipeline():
+    assert generation_targets(12, {}) == [35]
+    assert generation_targets(80, {}) == [80]
+    assert generation_targets(30, {'batched': True, 'batch_size': 12}) == [12, 12, 6]
+    requirements = [{'module': module} for module in 'AAAAABBBBBBBBBCC']
+    assert generation_targets(16, {'batched': True, 'batch_size': 8}, requirements) == [5, 8, 3]
+
+
+def test_generation_output_is_capped_by_continuation_rounds():
+    plan = plan_pipeline(BRD, '', {'max_continuations': 1}, requirements_count=200)
+    generation = plan['stages'][1]
+    assert generation['output_tokens'] == 2 * GENERATION_MAX_TOKENS < 200 * TOKENS_PER_TEST_CASE
+    assert '1 continuation round' in generation['note']
+    assert any('cut off' in warning for warning in plan['warnings'])
+
+
+def test_coverage_stage_is_the_real_request():
+    plan = plan_pipeline(BRD, '', {}, requirements_count=40)
+    coverage = plan['stages'][2]
+    assert coverage['output_tokens'] == COVERAGE_MAX_TOKENS
+    excerpt = build_section_excerpt(BRD, build_section_index(BRD), COVERAGE_EXCERPT_CHARS)
+    assert estimate_tokens(excerpt) < coverage['input_tokens'] < estimate_tokens(excerpt) + 3000
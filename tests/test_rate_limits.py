@@ -0,0 +1,46 @@
+from rate_limits import TokenBucket
+
+
+def test_unlimited_bucket_never_waits():
+    assert TokenBucket().reserve(10 ** 9) == 0.0
+
+
+def test_bucket_queues_callers_past_the_quota():
+    bucket = TokenBucket(per_minute=600)
+    assert bucket.reserve(600) == 0.0
+    # The next 60 tokens refill at 10 per second
+    assert 5.5 < bucket.reserve(60) <= 6.0
+
+
+def test_bucket_adopts_reported_limit():
+    bucket = TokenBucket()
+    bucket.update(limit=120, remaining=0)
+    assert bucket.capacity == 120
+    assert bucket.reserve(60) > 25
+
+
+def test_limiters_start_with_the_server_caps(monkeypatch):
+    import rate_limits
+    monkeypatch.setattr(rate_limits, '_limiters', {})
+    monkeypatch.setattr(rate_limits, '_limit_caps', {'requests': 60, 'tokens': None})
+    limiter = rate_limits.get_rate_limiter('sk-test', 'gpt-4o', 'http://127.0.0.1:1/v1')
+    assert limiter.stats()['requests_per_minute'] == 60
+    assert limiter.stats()['tokens_per_minute'] is None
+    assert rate_limits.get_rate_limiter('sk-test', 'gpt-4o', 'http://127.0.0.1:1/v1') is limiter
+
+
+def test_caps_are_read_from_the_environment(monkeypatch):
+    from rate_limits import _env_cap
+    monkeypatch.setenv('TCG_RATE_LIMIT_RPM', '500')
+    monkeypatch.setenv('TCG_RATE_LIMIT_TPM', 'lots')
+    assert _env_cap('TCG_RATE_LIMIT_RPM') == 500
+    assert _env_cap('TCG_RATE_LIMIT_TPM') is None
+    assert _env_cap('TCG_RATE_LIMIT_UNSET') is None
+
+
+def test_cap_applies_below_the_reported_limit():
+    bucket = TokenBucket(per_minute=60)
+    bucket.update(limit=6000, remaining=6000)
+    assert bucket.capacity == 60
+    bucket.set_cap(None)
+    assert bucket.capacity == 6000
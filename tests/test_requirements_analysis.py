@@ -0,0 +1,104 @@
+from brd_sections import build_section_index
+from requirements_analysis import (
+    build_requirement_chunks, extract_requirements_chunked, merge_requirements, merge_revised_requirements,
+    split_requirement_chunk
+)
+
+
+def _sectioned_brd(sections, lines=3):
+    return ''.join(
+        f"## Rule {number}\n" + ''.join(f"Rule {number} clause {line}: the limit is {line * 100}\n" for line in range(lines))
+        for number in range(sections)
+    )
+
+
+def test_chunks_are_capped_by_sections_and_tokens():
+    text = _sectioned_brd(30)
+    chunks = build_requirement_chunks(text, max_sections=12)
+    assert [len(chunk['section_ids']) for chunk in chunks] == [12, 12, 6]
+    assert all(f"[{section_id}]" in chunk['text'] for chunk in chunks for section_id in chunk['section_ids'])
+
+    small = build_requirement_chunks(text, max_tokens=200, max_sections=100)
+    assert len(small) > 3 and all(chunk['tokens'] <= 200 for chunk in small)
+
+
+def test_chunks_limited_to_section_ids():
+    text = _sectioned_brd(10)
+    index = build_section_index(text)
+    wanted = [index['sections'][2]['id'], index['sections'][7]['id']]
+    chunks = build_requirement_chunks(text, index, section_ids=wanted)
+    assert [section_id for chunk in chunks for section_id in chunk['section_ids']] == wanted
+
+
+def test_split_chunk_between_sections_then_within_one():
+    chunk = build_requirement_chunks(_sectioned_brd(5))[0]
+    first, second = split_requirement_chunk(chunk)
+    assert first['section_ids'] + second['section_ids'] == chunk['section_ids']
+
+    single = build_requirement_chunks(_sectioned_brd(1, lines=40))[0]
+    head, tail = split_requirement_chunk(single)
+    assert head['section_ids'] == tail['section_ids'] == single['section_ids']
+    assert '(continued)' in tail['text'] and '(continued)' not in head['text']
+
+    tiny = build_requirement_chunks(_sectioned_brd(1, lines=0))[0]
+    assert split_requirement_chunk(tiny) is None
+
+
+def test_merge_requirements_dedupes_and_renumbers():
+    merged = merge_requirements([
+        ([{'requirement_id': 'REQ-007', 'module': 'Deposits', 'title': 'Minimum deposit', 'source_section': 'SEC-0001'},
+          {'requirement_id': 'REQ-008', 'module': 'Deposits', 'title': 'Maximum deposit', 'source_section': 'SEC-0009'}],
+         ['SEC-0001', 'SEC-0002']),
+        ([{'module': 'deposits', 'title': 'Minimum  deposit!', 'source_section': 'SEC-0003'},
+          {'module': 'Reports', 'title': 'Daily report', 'source_section': 'SEC-0003'}],
+         ['SEC-0003']),
+    ])
+    assert [(req['requirement_id'], req['title'], req['source_section']) for req in merged] == [
+        ('REQ-001', 'Minimum deposit', 'SEC-0001'),
+        ('REQ-002', 'Maximum deposit', 'SEC-0001'),
+        ('REQ-003', 'Daily report', 'SEC-0003'),
+    ]
+
+
+def test_merge_revised_requirements_keeps_ids():
+    kept = [{'requirement_id': 'REQ-001', 'module': 'A', 'title': 'One'},
+            {'requirement_id': 'REQ-004', 'module': 'A', 'title': 'Four'}]
+    requirements, added = merge_revised_requirements(kept, [{'module': 'A', 'title': 'one'},
+                                                            {'module': 'B', 'title': 'New'}])
+    assert [req['requirement_id'] for req in requirements] == ['REQ-001', 'REQ-004', 'REQ-005']
+    assert added == [{'module': 'B', 'title': 'New', 'requirement_id': 'REQ-005'}]
+
+
+def test_truncated_chunks_are_split_and_retried():
+    from mock_openai_server import start_server
+
+    # Two requirements per section do not fit one reply for a whole chunk, but do for a quarter of one
+    server, base_url = start_server(latency=0, max_output_tokens=900)
+    try:
+        text = _sectioned_brd(12)
+        requirements, stats = extract_requirements_chunked(text, 'sk-test', base_url=base_url)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert stats['chunks'] == 1 and stats['splits'] >= 1 and stats['errors'] == []
+    assert len({req['source_section'] for req in requirements}) == 12
+
+
+def test_truncated_single_call_artifact_is_saved_as_chunked(stores):
+    from brd_pipeline import DEFAULT_OPTIONS, requirements_artifact
+    from mock_openai_server import start_server
+    from requirements_analysis import use_chunked_extraction
+
+    text = _sectioned_brd(12)
+    assert not use_chunked_extraction(text, None)
+    server, base_url = start_server(latency=0, max_output_tokens=900)
+    options = dict(DEFAULT_OPTIONS, base_url=base_url)
+    try:
+        artifact = requirements_artifact(text, 'sk-test', options)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert artifact['chunked'] and len(artifact['requirements']) >= 12
+    # With the server gone, the single-call request can only succeed by finding the chunked artifact
+    assert requirements_artifact(text, 'sk-test', options)['requirements'] == artifact['requirements']
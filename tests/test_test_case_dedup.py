@@ -0,0 +1,62 @@
+import numpy as np
+
+from test_case_dedup import (NUM_PERMUTATIONS, collapse_duplicates, find_near_duplicates, lsh_parameters,
+                            merge_duplicates, minhash_signatures, shingle_hashes)
+
+
+def _case(number, condition, requirement_ids=None):
+    return {'test_case_id': f"TC_{number:03d}", 'test_condition': condition,
+            'test_case_description': "1. Open the account screen\n2. Enter the details\n3. Submit",
+            'requirement_ids': requirement_ids or []}
+
+
+TEST_CASES = [
+    _case(1, "Verify the initial deposit of at least 100 is accepted", ['REQ-001']),
+    _case(2, "Verify the initial deposit of at least 100 is accepted.", ['REQ-002']),
+    _case(3, "Verify a cheque book request is rejected for dormant accounts", ['REQ-003']),
+    _case(4, "Verify the daily report lists every account opened that day", ['REQ-004']),
+]
+
+
+def test_finds_near_duplicates_only():
+    assert find_near_duplicates(TEST_CASES) == [[0, 1]]
+
+
+def test_collapse_keeps_first_of_each_group():
+    collapsed = collapse_duplicates(TEST_CASES, [[0, 1]])
+    assert [tc['test_case_id'] for tc in collapsed] == ['TC_001', 'TC_003', 'TC_004']
+
+
+def test_merge_keeps_traceability():
+    merged = merge_duplicates(TEST_CASES, [[0, 1]])
+    assert [tc['test_case_id'] for tc in merged] == ['TC_001', 'TC_003', 'TC_004']
+    assert merged[0]['requirement_ids'] == ['REQ-001', 'REQ-002']
+    assert merged[0]['merged_test_case_ids'] == ['TC_002']
+    assert TEST_CASES[0]['requirement_ids'] == ['REQ-001']
+
+
+def test_signatures_agree_on_identical_text_and_empty_text_is_skipped():
+    shingles = [shingle_hashes("verify the deposit"), shingle_hashes(""), shingle_hashes("verify the deposit")]
+    signatures = minhash_signatures(shingles)
+    assert signatures.shape == (3, NUM_PERMUTATIONS)
+    assert np.array_equal(signatures[0], signatures[2])
+    assert (signatures[1] == np.iinfo(np.uint32).max).all()
+    assert find_near_duplicates([{'test_condition': ''}, {'test_condition': ''}]) == []
+
+
+def test_lsh_bands_fit_the_signature():
+    bands, rows = lsh_parameters(0.8)
+    assert bands * rows <= NUM_PERMUTATIONS
+    # The S-curve should turn around the threshold: a likely hit above it, unlikely well below it
+    assert 1 - (1 - 0.9 ** rows) ** bands > 0.9
+    assert 1 - (1 - 0.5 ** rows) ** bands < 0.2
+
+
+def test_many_distinct_cases_have_no_duplicates():
+    words = ['deposit', 'cheque', 'dormant', 'report', 'branch', 'limit', 'closure', 'nominee', 'statement']
+    cases = [{'test_case_id': f"TC_{number:03d}",
+              'test_condition': ' '.join(words[(number * step) % len(words)] + str(number * step)
+                                         for step in range(1, 8))}
+             for number in range(300)]
+    cases.append(dict(cases[123], test_case_id='TC_300'))
+    assert find_near_duplicates(cases) == [[123, 300]]
@@ -0,0 +1,83 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from test_case_generation import StreamingTestCaseParser, generate_with_continuation, generate_with_continuation_async
+
+REQUEST = {'model': 'gpt-4o', 'messages': [{'role': 'user', 'content': 'Generate test cases'}], 'max_tokens': 100}
+
+
+def _reply(numbers, truncated):
+    text = json.dumps({'test_cases': [{'test_case_id': f"TC_{n:03d}", 'test_condition': f"Condition {n}"}
+                                      for n in numbers]})
+    return (text[:-10] if truncated else text), ('length' if truncated else 'stop')
+
+
+def _scripted(replies):
+    """call(request) that records requests and plays back replies"""
+    requests = []
+
+    def call(request):
+        requests.append(request)
+        return replies[len(requests) - 1]
+    return call, requests
+
+
+def test_continuation_stitches_truncated_replies():
+    call, requests = _scripted([_reply([1, 2, 3], True), _reply([3, 4], False)])
+    test_cases, info = generate_with_continuation(call, REQUEST, max_rounds=2)
+
+    assert [tc['test_condition'] for tc in test_cases] == ['Condition 1', 'Condition 2', 'Condition 3', 'Condition 4']
+    assert info['rounds'] == 1 and not info['truncated'] and len(requests) == 2
+    assert len(requests[1]['messages']) > len(REQUEST['messages'])
+
+
+def test_continuation_stops_after_max_rounds():
+    call, requests = _scripted([_reply([1, 2], True), _reply([3, 4], True), _reply([5], True)])
+    test_cases, info = generate_with_continuation(call, REQUEST, max_rounds=1)
+    assert info['rounds'] == 1 and info['truncated'] and len(requests) == 2
+
+
+def test_async_continuation_matches_sync():
+    replies = [_reply([1, 2, 3], True), _reply([3, 4], False)]
+    call, _ = _scripted(list(replies))
+    expected = generate_with_continuation(call, REQUEST, max_rounds=2)
+
+    played = iter(replies)
+
+    async def complete(**params):
+        text, finish_reason = next(played)
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=text),
+                                                        finish_reason=finish_reason)])
+
+    assert asyncio.run(generate_with_continuation_async(complete, REQUEST, max_rounds=2)) == expected
+
+
+def _feed_in_pieces(text, size):
+    parser = StreamingTestCaseParser()
+    for start in range(0, len(text), size):
+        parser.feed(text[start:start + size])
+    return parser.test_cases
+
+
+def test_stream_parser_emits_cases_across_pieces():
+    cases = [{'test_case_id': f"TC_{n:03d}", 'expected_result': 'Shows "Saved" {ok} [1]'} for n in range(1, 4)]
+    text = json.dumps({'summary': {'total': 3}, 'test_cases': cases})
+    for size in (1, 7, len(text)):
+        assert _feed_in_pieces(text, size) == cases
+
+
+def test_stream_parser_keeps_cases_before_truncation():
+    text = json.dumps({'test_cases': [{'test_case_id': 'TC_001'}, {'test_case_id': 'TC_002'}]})
+    assert _feed_in_pieces(text[:-20], 5) == [{'test_case_id': 'TC_001'}]
+
+
+def test_stream_parser_reads_top_level_array():
+    assert _feed_in_pieces('[{"test_case_id": "TC_001"}, {"test_case_id": "TC_002"}]', 3) == [
+        {'test_case_id': 'TC_001'}, {'test_case_id': 'TC_002'}]
+
+
+def test_stream_parser_ignores_test_cases_as_a_value():
+    text = json.dumps({'section': 'test_cases', 'notes': [{'text': 'not a test case'}],
+                       'test_cases': [{'test_case_id': 'TC_001'}]})
+    assert _feed_in_pieces(text, 4) == [{'test_case_id': 'TC_001'}]
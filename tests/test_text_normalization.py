@@ -0,0 +1,36 @@
+from text_normalization import PAGE_BREAK, normalize_brd_text
+
+
+def test_removes_titled_contents_block():
+    text = "Contents\nIntroduction\t1\nAccount Opening\t3\n\nIntroduction\nThis BRD covers account opening."
+    normalized, _ = normalize_brd_text(text)
+    assert normalized == "Introduction\nThis BRD covers account opening."
+
+
+def test_removes_untitled_dot_leader_contents():
+    text = "1 Introduction ..... 1\n2 Accounts ..... 2\n3 Deposits ..... 5\nIntroduction\nBody text"
+    normalized, _ = normalize_brd_text(text)
+    assert normalized == "Introduction\nBody text"
+
+
+def test_keeps_body_tables():
+    text = "Transaction limits\nLimit\t5000\nDaily cap\t20000\nMinimum\t100\nEnd of limits"
+    normalized, _ = normalize_brd_text(text)
+    assert "Limit 5000" in normalized and "Daily cap 20000" in normalized and "Minimum 100" in normalized
+
+
+def test_keeps_dot_leader_lines_with_decreasing_numbers():
+    text = "Fees\nGold ..... 500\nSilver ..... 200\nBronze ..... 50"
+    normalized, _ = normalize_brd_text(text)
+    assert "Gold ..... 500" in normalized
+
+
+def test_removes_running_headers_and_page_numbers():
+    bodies = [["Accounts are opened online", "Deposits need approval", "Statements are monthly"],
+              ["Cheque books are issued", "Overdrafts are optional", "Sweeps run nightly"],
+              ["Dormancy starts after a year", "Nominees are recorded", "Closures need consent"],
+              ["Interest is paid quarterly", "Fees are waived for staff", "Limits are per branch"]]
+    pages = ['\n'.join(["ACME Bank CASA BRD"] + body + [f"Page {page} of 4"]) for page, body in enumerate(bodies, 1)]
+    normalized, stats = normalize_brd_text(PAGE_BREAK.join(pages))
+    assert normalized.split('\n') == [line for body in bodies for line in body]
+    assert stats['chars_saved'] > 0
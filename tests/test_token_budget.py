@@ -0,0 +1,9 @@
+from token_budget import estimate_tokens, split_by_tokens
+
+
+def test_split_by_tokens_respects_limit():
+    text = "The system shall validate the account number.\n" * 400
+    pieces = split_by_tokens(text, 500)
+    assert len(pieces) > 1
+    assert ''.join(pieces) == text
+    assert all(estimate_tokens(piece) <= 500 for piece in pieces)
@@ -0,0 +1,33 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+from PIL import Image
+
+from ui_coverage import screen_analysis_task
+
+ELEMENTS = {'screen_type': 'form', 'elements': [{'type': 'button', 'label': 'Submit'}]}
+
+
+def _run(tmp_path, replies):
+    image_path = tmp_path / 'screen.png'
+    Image.new('RGB', (4, 4)).save(image_path)
+    replies = iter(replies)
+
+    async def complete(**request):
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=next(replies)))])
+
+    return asyncio.run(screen_analysis_task(str(image_path), 'Login', [])(complete))
+
+
+def test_mapping_is_parsed_from_fenced_json(tmp_path):
+    mapping = {'mappings': [], 'overall_coverage': 0, 'summary': 'None'}
+    result = _run(tmp_path, [json.dumps(ELEMENTS), f"```json\n{json.dumps(mapping)}\n```"])
+    assert result['mapping'] == mapping and 'error' not in result
+
+
+def test_bad_mapping_reply_keeps_extracted_elements(tmp_path):
+    result = _run(tmp_path, [json.dumps(ELEMENTS), "Sorry, I cannot map these elements."])
+    assert result['error'].startswith("Could not extract valid JSON from mapping response")
+    assert result['elements'] == ELEMENTS['elements'] and result['screen_type'] == 'form'
+    assert 'mapping' not in result
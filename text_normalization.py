@@ -0,0 +1,133 @@
+"""
+Text Normalization
+Strips page furniture and redundant whitespace from extracted BRD text before prompting
+"""
+
+import re
+from collections import Counter
+
+# Extractors separate PDF pages with a form feed so page edges can be recognised
+PAGE_BREAK = '\f'
+
+# Rough characters-per-token ratio for English prose on GPT-4 class tokenizers
+CHARS_PER_TOKEN = 4
+
+# Lines checked at the top and bottom of each page for running headers/footers
+PAGE_EDGE_LINES = 2
+
+_BANNER_RE = re.compile(r'^\s*([=\-_*#~])\1{9,}\s*$')
+_PAGE_NUMBER_RE = re.compile(
+    r'^\s*(?:page\s*)?[-–(\[]?\s*\d{1,4}\s*[-–)\]]?(?:\s*(?:of|/)\s*\d{1,4})?\s*$',
+    re.IGNORECASE
+)
+_TOC_ENTRY_RE = re.compile(r'^\s*\S.{0,150}?(?:\s*(\.{3,})\s*|\t+\s*)(\d{1,4})\s*$')
+_TOC_TITLE_RE = re.compile(r'^\s*#*\s*(table of contents|contents|index)\s*$', re.IGNORECASE)
+_INLINE_SPACE_RE = re.compile(r'[ \t ]+')
+_DIGITS_RE = re.compile(r'\d+')
+
+
+def _furniture_signature(line):
+    """Compare header/footer candidates with page numbers and dates masked out"""
+    return _DIGITS_RE.sub('#', ' '.join(line.split()).lower())
+
+
+def _page_edge_indexes(lines):
+    """Return the indexes of the first and last non-empty lines of a page"""
+    content = [index for index, line in enumerate(lines) if line.strip()]
+    return set(content[:PAGE_EDGE_LINES] + content[-PAGE_EDGE_LINES:])
+
+
+def _remove_page_furniture(pages):
+    """Drop running headers/footers and page numbers from a list of page texts"""
+    page_lines = [page.split('\n') for page in pages]
+    page_edges = [_page_edge_indexes(lines) for lines in page_lines]
+
+    # A line that sits on a page edge on at least half of the pages is furniture
+    edge_counts = Counter()
+    for lines, edges in zip(page_lines, page_edges):
+        edge_counts.update(set(_furniture_signature(lines[index]) for index in edges))
+
+    threshold = max(3, len(page_lines) // 2)
+    furniture = {signature for signature, count in edge_counts.items() if count >= threshold}
+
+    cleaned_pages = []
+    for lines, edges in zip(page_lines, page_edges):
+        kept = [
+            line for index, line in enumerate(lines)
+            if index not in edges
+            or not (_PAGE_NUMBER_RE.match(line) or _furniture_signature(line) in furniture)
+        ]
+        cleaned_pages.append('\n'.join(kept))
+    return cleaned_pages
+
+
+def _is_toc_block(entries, titled):
+    """Whether a run of entry-like lines is a table of contents rather than a body table.
+
+    Under a Contents title any run counts. Without one, it takes three or
+    more dot-leader entries whose page numbers never go down, so tables
+    such as "Limit<tab>5000" stay.
+    """
+    if titled:
+        return len(entries) >= 1
+    pages = [int(match.group(2)) for match in entries]
+    return (len(entries) >= 3 and all(match.group(1) for match in entries)
+            and all(earlier <= later for earlier, later in zip(pages, pages[1:])))
+
+
+def _remove_toc_blocks(lines):
+    """Drop table-of-contents blocks and their title"""
+    kept = []
+    index = 0
+    while index < len(lines):
+        run_end = index
+        while run_end < len(lines) and (_TOC_ENTRY_RE.match(lines[run_end]) or (
+                not lines[run_end].strip() and run_end + 1 < len(lines) and _TOC_ENTRY_RE.match(lines[run_end + 1]))):
+            run_end += 1
+
+        entries = [_TOC_ENTRY_RE.match(line) for line in lines[index:run_end] if line.strip()]
+        title = next((line for line in reversed(kept) if line.strip()), '')
+        if entries and _is_toc_block(entries, bool(_TOC_TITLE_RE.match(title))):
+            while kept and (not kept[-1].strip() or _TOC_TITLE_RE.match(kept[-1])):
+                kept.pop()
+            index = run_end
+        else:
+            kept.append(lines[index])
+            index += 1
+    return kept
+
+
+def estimate_tokens(text):
+    """Cheap token estimate used for reporting savings"""
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def normalize_brd_text(text):
+    """Remove page furniture and redundant whitespace from combined BRD text.
+
+    Returns (normalized_text, stats) where stats reports original and
+    normalized sizes plus the characters and estimated tokens saved.
+    """
+    original_text = text
+    if PAGE_BREAK in text:
+        text = '\n'.join(_remove_page_furniture(text.split(PAGE_BREAK)))
+
+    lines = [line for line in text.split('\n') if not _BANNER_RE.match(line)]
+    lines = _remove_toc_blocks(lines)
+    lines = [_INLINE_SPACE_RE.sub(' ', line).strip() for line in lines]
+
+    # Collapse runs of blank lines to a single blank line
+    normalized = []
+    for line in lines:
+        if not line and (not normalized or not normalized[-1]):
+            continue
+        normalized.append(line)
+    normalized_text = '\n'.join(normalized).strip()
+
+    stats = {
+        'original_chars': len(original_text),
+        'normalized_chars': len(normalized_text),
+        'chars_saved': len(original_text) - len(normalized_text),
+        'estimated_tokens_saved': estimate_tokens(original_text) - estimate_tokens(normalized_text),
+    }
+    return normalized_text, stats
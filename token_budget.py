@@ -0,0 +1,154 @@
+"""
+Token Budget
+Fast local token estimates per model, call wall-time estimates and typical output sizes for planning
+"""
+
+import math
+import re
+
+# Approximations of how each tokenizer family splits English BRD text:
+# characters per token for words by length class, digits grouped per token,
+# and tokens per punctuation run and per CJK character
+TOKENIZER_TABLES = {
+    'o200k_base': {
+        'short_word_chars': 6, 'long_word_chars_per_token': 4.4, 'digits_per_token': 3,
+        'punctuation_chars_per_token': 2.0, 'cjk_tokens_per_char': 0.8, 'newline_tokens': 0.5,
+    },
+    'cl100k_base': {
+        'short_word_chars': 5, 'long_word_chars_per_token': 4.0, 'digits_per_token': 3,
+        'punctuation_chars_per_token': 1.6, 'cjk_tokens_per_char': 1.1, 'newline_tokens': 0.6,
+    },
+}
+
+# Context window, output cap, tokenizer and rough throughput per model
+MODEL_PROFILES = {
+    'gpt-4o': {
+        'tokenizer': 'o200k_base', 'context_window': 128000, 'max_output_tokens': 16384,
+        'output_tokens_per_second': 60, 'input_tokens_per_second': 5000, 'request_overhead_seconds': 0.8,
+    },
+    'gpt-4o-mini': {
+        'tokenizer': 'o200k_base', 'context_window': 128000, 'max_output_tokens': 16384,
+        'output_tokens_per_second': 90, 'input_tokens_per_second': 8000, 'request_overhead_seconds': 0.6,
+    },
+    'gpt-4-turbo': {
+        'tokenizer': 'cl100k_base', 'context_window': 128000, 'max_output_tokens': 4096,
+        'output_tokens_per_second': 30, 'input_tokens_per_second': 3000, 'request_overhead_seconds': 1.0,
+    },
+    'gpt-3.5-turbo': {
+        'tokenizer': 'cl100k_base', 'context_window': 16385, 'max_output_tokens': 4096,
+        'output_tokens_per_second': 80, 'input_tokens_per_second': 10000, 'request_overhead_seconds': 0.5,
+    },
+}
+DEFAULT_MODEL = 'gpt-4o'
+
+# Chat format framing per message and per request
+MESSAGE_OVERHEAD_TOKENS = 4
+REQUEST_OVERHEAD_TOKENS = 3
+
+# A high-detail screenshot is billed as up to this many tokens
+IMAGE_TOKENS = 765
+
+# Typical output sizes, for planning before anything has been generated
+TOKENS_PER_REQUIREMENT = 110
+TOKENS_PER_TEST_CASE = 420
+BRD_TOKENS_PER_REQUIREMENT = 250
+MIN_EXPECTED_REQUIREMENTS = 35
+
+_PIECE_RE = re.compile(
+    r'(?P<word>[A-Za-z]+)|(?P<digits>\d+)|(?P<newline>\n)|(?P<space>[ \t\r\f\v]+)'
+    r'|(?P<cjk>[぀-ヿ㐀-鿿가-힯])|(?P<other>[^\sA-Za-z\d])+'
+)
+
+
+def model_profile(model):
+    """Profile for a model, matching dated snapshots (gpt-4o-2024-08-06) by prefix"""
+    for name in sorted(MODEL_PROFILES, key=len, reverse=True):
+        if model == name or model.startswith(name + '-'):
+            return MODEL_PROFILES[name]
+    return MODEL_PROFILES[DEFAULT_MODEL]
+
+
+def estimate_tokens(text, model=DEFAULT_MODEL):
+    """Estimate the token count of text for a model without a tokenizer.
+
+    Words up to the table's short-word length count as one token (the
+    leading space merges into it), longer words are split by characters per
+    token, digits are grouped and punctuation runs are split by length.
+    Meant for budgeting and chunk sizing, not billing.
+    """
+    if not text:
+        return 0
+    table = TOKENIZER_TABLES[model_profile(model)['tokenizer']]
+    tokens = 0.0
+    for match in _PIECE_RE.finditer(text):
+        kind = match.lastgroup
+        length = match.end() - match.start()
+        if kind == 'word':
+            tokens += 1 if length <= table['short_word_chars'] else math.ceil(length / table['long_word_chars_per_token'])
+        elif kind == 'digits':
+            tokens += math.ceil(length / table['digits_per_token'])
+        elif kind == 'newline':
+            tokens += table['newline_tokens']
+        elif kind == 'space':
+            # Single spaces merge into the next word; longer runs become their own tokens
+            tokens += 0 if length == 1 else math.ceil(length / 4)
+        elif kind == 'cjk':
+            tokens += table['cjk_tokens_per_char']
+        else:
+            tokens += math.ceil(length / table['punctuation_chars_per_token'])
+    return int(math.ceil(tokens))
+
+
+def estimate_message_tokens(messages, model=DEFAULT_MODEL):
+    """Estimate the prompt tokens of a chat messages list, including image parts"""
+    tokens = REQUEST_OVERHEAD_TOKENS
+    for message in messages:
+        tokens += MESSAGE_OVERHEAD_TOKENS
+        content = message.get('content')
+        if isinstance(content, str):
+            tokens += estimate_tokens(content, model)
+        elif isinstance(content, list):
+            for part in content:
+                if part.get('type') == 'text':
+                    tokens += estimate_tokens(part.get('text', ''), model)
+                elif part.get('type') == 'image_url':
+                    tokens += IMAGE_TOKENS
+    return tokens
+
+
+def estimate_request_tokens(params):
+    """(input_tokens, max_output_tokens) for chat.completions.create arguments"""
+    model = params.get('model', DEFAULT_MODEL)
+    return estimate_message_tokens(params.get('messages', []), model), params.get('max_tokens') or model_profile(model)['max_output_tokens']
+
+
+def estimate_call_seconds(input_tokens, output_tokens, model=DEFAULT_MODEL):
+    """Rough wall time of one call: overhead, prompt processing and output generation"""
+    profile = model_profile(model)
+    return (profile['request_overhead_seconds'] + input_tokens / profile['input_tokens_per_second']
+            + output_tokens / profile['output_tokens_per_second'])
+
+
+def split_by_tokens(text, max_tokens, model=DEFAULT_MODEL):
+    """Split text at line boundaries into pieces of at most about max_tokens"""
+    pieces = []
+    current = []
+    current_tokens = 0
+    for line in text.splitlines(keepends=True):
+        line_tokens = estimate_tokens(line, model)
+        if line_tokens > max_tokens:
+            # A single huge line (e.g. a flattened table) is cut by characters
+            chars = max(1, int(len(line) * max_tokens / line_tokens))
+            if current:
+                pieces.append(''.join(current))
+                current, current_tokens = [], 0
+            pieces.extend(line[start:start + chars] for start in range(0, len(line), chars))
+            continue
+        if current and current_tokens + line_tokens > max_tokens:
+            pieces.append(''.join(current))
+            current, current_tokens = [], 0
+        current.append(line)
+        current_tokens += line_tokens
+    if current:
+        pieces.append(''.join(current))
+    return pieces
@@ -0,0 +1,195 @@
+"""
+UI Coverage
+Screenshot analysis and UI-element-to-test-case mapping prompts, run as pipeline tasks
+"""
+
+import base64
+import io
+import json
+
+from PIL import Image
+
+from ai_pipeline import completion_text
+
+SCREENSHOT_PROMPT = """Analyze this UI screenshot and extract all interactive elements.
+
+For each UI element, identify:
+1. Element type (input_field, button, link, checkbox, dropdown, radio_button, textarea, etc.)
+2. Element label/text (visible text or placeholder)
+3. Whether it's required (look for * or "required" indicators)
+4. Any validation hints or helper text
+
+IMPORTANT: Return ONLY valid JSON. No markdown, no code blocks, no explanations. Just pure JSON.
+
+JSON structure:
+{
+  "screen_type": "login/form/dashboard/etc",
+  "elements": [
+    {
+      "type": "input_field",
+      "label": "Email Address",
+      "required": true,
+      "placeholder": "Enter your email",
+      "description": "Brief description of what this element does"
+    }
+  ]
+}
+
+Be thorough and extract ALL interactive elements you can see. Return the JSON now:"""
+
+
+def encode_image_to_base64(image_file):
+    """Encode an image (path or file object) to base64"""
+    image = Image.open(image_file)
+    buffered = io.BytesIO()
+    image.save(buffered, format=image.format if image.format else "PNG")
+    return base64.b64encode(buffered.getvalue()).decode('utf-8')
+
+
+def parse_json_response(response_text):
+    """Parse a JSON reply, tolerating markdown code fences and surrounding prose"""
+    try:
+        return json.loads(response_text)
+    except json.JSONDecodeError:
+        pass
+
+    if "```json" in response_text:
+        start = response_text.find("```json") + 7
+        end = response_text.find("```", start)
+        if end > start:
+            try:
+                return json.loads(response_text[start:end].strip())
+            except json.JSONDecodeError:
+                pass
+
+    start = response_text.find('{')
+    end = response_text.rfind('}') + 1
+    if start >= 0 and end > start:
+        try:
+            return json.loads(response_text[start:end])
+        except json.JSONDecodeError:
+            pass
+    return None
+
+
+def screenshot_request(image_file):
+    """chat.completions.create arguments for extracting UI elements from a screenshot"""
+    base64_image = encode_image_to_base64(image_file)
+    return {
+        'model': "gpt-4o",
+        'messages': [
+            {
+                "role": "user",
+                "content": [
+                    {"type": "text", "text": SCREENSHOT_PROMPT},
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/jpeg;base64,{base64_image}",
+                            "detail": "high"
+                        }
+                    }
+                ]
+            }
+        ],
+        'max_tokens': 2000,
+        'temperature': 0.1,
+    }
+
+
+def mapping_request(ui_elements, test_cases, screen_name):
+    """chat.completions.create arguments for mapping UI elements to test cases.
+
+    The instructions and the test case list are the same for every screen of
+    a run and come first, so only the screen's own elements vary per call.
+    """
+    elements_summary = "\n".join([
+        f"- {elem.get('type', 'N/A')}: {elem.get('label', 'N/A')} (Required: {elem.get('required', False)})"
+        for elem in ui_elements
+    ])
+
+    test_case_summary = "\n".join([
+        f"- {tc.get('test_case_id', 'N/A')}: {tc.get('test_condition', 'N/A')} | Description: {tc.get('test_case_description', 'N/A')[:150]}"
+        for tc in test_cases[:100]
+    ])
+
+    prompt = f"""You are a QA analyst mapping UI elements to test cases.
+
+**TASK:**
+For each UI element of the screen below, find which test cases cover it. Match based on:
+- Element label mentions in test case description
+- Element type and actions (enter, click, select, verify)
+- Semantic similarity (e.g., "user email" matches "email field")
+
+Return ONLY a JSON object:
+{{
+  "mappings": [
+    {{
+      "element_type": "input_field",
+      "element_label": "Email Address",
+      "covered_by": ["TC_001", "TC_002"],
+      "coverage_level": "Full" or "Partial" or "None",
+      "confidence": 0.95,
+      "missing_scenarios": ["List any missing test scenarios for this element"]
+    }}
+  ],
+  "overall_coverage": 85.5,
+  "summary": "Brief summary of UI coverage"
+}}
+
+**AVAILABLE TEST CASES:**
+{test_case_summary}
+
+**SCREEN:** {screen_name}
+
+**UI ELEMENTS FOUND:**
+{elements_summary}
+
+Analyze now:"""
+
+    return {
+        'model': "gpt-4o",
+        'messages': [
+            {"role": "system", "content": "You are an expert QA analyst specialized in UI test coverage analysis."},
+            {"role": "user", "content": prompt}
+        ],
+        'max_tokens': 3000,
+        'temperature': 0.2,
+        'response_format': {"type": "json_object"},
+    }
+
+
+def screen_analysis_task(image_file, screen_name, test_cases):
+    """Pipeline task that extracts a screen's UI elements and maps them to test cases.
+
+    The task resolves to a dict with 'screen_name', 'screen_type',
+    'elements' and 'mapping', or with 'error' if a step failed; elements
+    already extracted are kept when only the mapping step fails.
+    """
+    async def task(complete):
+        result = {'screen_name': screen_name}
+        try:
+            request = screenshot_request(image_file)
+        except Exception as e:
+            result['error'] = f"Error encoding image: {str(e)}"
+            return result
+
+        response_text = completion_text(await complete(**request))
+        ui_analysis = parse_json_response(response_text)
+        if not ui_analysis or 'elements' not in ui_analysis:
+            result['error'] = f"Could not extract valid JSON from response: {response_text[:500]}"
+            return result
+
+        result['screen_type'] = ui_analysis.get('screen_type', 'Unknown')
+        result['elements'] = ui_analysis['elements']
+
+        mapping_text = completion_text(await complete(**mapping_request(result['elements'], test_cases, screen_name)))
+        mapping = parse_json_response(mapping_text or '')
+        if not isinstance(mapping, dict):
+            result['error'] = f"Could not extract valid JSON from mapping response: {mapping_text[:500]}"
+            return result
+
+        result['mapping'] = mapping
+        return result
+
+    return task
@@ -0,0 +1,192 @@
+"""
+Upload Storage
+Spools uploaded files to disk, enforces byte budgets and exposes memory-mapped access
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import shutil
+import tempfile
+import time
+from contextlib import contextmanager
+
+MAX_UPLOAD_FILE_BYTES = 100 * 1024 * 1024
+MAX_SESSION_UPLOAD_BYTES = 300 * 1024 * 1024
+
+UPLOAD_DIR_PREFIX = 'tcg_uploads_'
+SPOOL_CHUNK_BYTES = 1024 * 1024
+
+# Session directories untouched for this long are assumed abandoned
+STALE_UPLOAD_DIR_SECONDS = 24 * 60 * 60
+
+
+def create_upload_dir():
+    """Create a private temporary directory for one session's uploads"""
+    cleanup_stale_upload_dirs()
+    return tempfile.mkdtemp(prefix=UPLOAD_DIR_PREFIX)
+
+
+def cleanup_stale_upload_dirs(max_age_seconds=STALE_UPLOAD_DIR_SECONDS):
+    """Remove upload directories left behind by sessions that ended long ago"""
+    temp_root = tempfile.gettempdir()
+    cutoff = time.time() - max_age_seconds
+    for entry in os.listdir(temp_root):
+        path = os.path.join(temp_root, entry)
+        if entry.startswith(UPLOAD_DIR_PREFIX) and os.path.isdir(path):
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    shutil.rmtree(path, ignore_errors=True)
+            except OSError:
+                pass
+
+
+def _upload_key(uploaded_file):
+    """Identify an upload across Streamlit reruns"""
+    file_id = getattr(uploaded_file, 'file_id', None) or getattr(uploaded_file, 'id', None)
+    return str(file_id) if file_id is not None else f"{uploaded_file.name}:{uploaded_file.size}"
+
+
+def spool_upload(uploaded_file, upload_dir):
+    """Copy an upload to disk in fixed-size chunks and hash it on the way.
+
+    Returns a record dict with 'name', 'path', 'size' and 'sha256'.
+    """
+    digest = hashlib.sha256()
+    fd, path = tempfile.mkstemp(dir=upload_dir, suffix=os.path.splitext(uploaded_file.name)[1])
+    size = 0
+
+    uploaded_file.seek(0)
+    with os.fdopen(fd, 'wb') as spooled:
+        while True:
+            chunk = uploaded_file.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+            spooled.write(chunk)
+            size += len(chunk)
+    uploaded_file.seek(0)
+
+    return {'name': uploaded_file.name, 'path': path, 'size': size, 'sha256': digest.hexdigest()}
+
+
+def spool_uploads(uploaded_files, upload_dir, registry, category,
+                  max_file_bytes=MAX_UPLOAD_FILE_BYTES, max_session_bytes=MAX_SESSION_UPLOAD_BYTES):
+    """Spool a category of uploads (e.g. 'brd', 'screenshots') to disk within budget.
+
+    registry is a per-session dict (kept in session state) of spooled files by
+    category. Files no longer in the uploader are deleted, files spooled on a
+    previous rerun are reused, and files over the per-file or per-session
+    byte budget are rejected. Returns (records, errors) with records in
+    upload order.
+    """
+    previous = registry.get(category, {})
+    current = {}
+    records = []
+    errors = []
+
+    current_keys = {_upload_key(uploaded_file) for uploaded_file in uploaded_files}
+    for key, record in previous.items():
+        if key not in current_keys:
+            _remove_quietly(record['path'])
+
+    other_bytes = sum(
+        record['size']
+        for other_category, records_by_key in registry.items() if other_category != category
+        for record in records_by_key.values()
+    )
+    session_bytes = other_bytes
+
+    for uploaded_file in uploaded_files:
+        key = _upload_key(uploaded_file)
+
+        if uploaded_file.size > max_file_bytes:
+            errors.append(
+                f"{uploaded_file.name} is {uploaded_file.size / 1024 / 1024:.1f} MB; "
+                f"the per-file limit is {max_file_bytes / 1024 / 1024:.0f} MB"
+            )
+            continue
+        if session_bytes + uploaded_file.size > max_session_bytes:
+            errors.append(
+                f"{uploaded_file.name} would exceed the session upload budget of "
+                f"{max_session_bytes / 1024 / 1024:.0f} MB"
+            )
+            continue
+
+        record = previous.get(key)
+        if record is None or not os.path.exists(record['path']):
+            record = spool_upload(uploaded_file, upload_dir)
+
+        current[key] = record
+        records.append(record)
+        session_bytes += record['size']
+
+    # Rejected files that were spooled on an earlier rerun are dropped too
+    for key, record in previous.items():
+        if key in current_keys and key not in current:
+            _remove_quietly(record['path'])
+
+    registry[category] = current
+    return records, errors
+
+
+def _remove_quietly(path):
+    """Delete a spooled file, ignoring files that are already gone"""
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class _MappedReader(io.RawIOBase):
+    """Seekable, read-only file object over an mmap (zipfile and PyPDF2 need seekable())"""
+
+    def __init__(self, mapped):
+        super().__init__()
+        self._mapped = mapped
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self._mapped.read(len(buffer))
+        buffer[:len(data)] = data
+        return len(data)
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        self._mapped.seek(offset, whence)
+        return self._mapped.tell()
+
+    def tell(self):
+        return self._mapped.tell()
+
+
+@contextmanager
+def open_mapped(path):
+    """Open a spooled file as a read-only, memory-mapped file object"""
+    with open(path, 'rb') as spooled:
+        if os.fstat(spooled.fileno()).st_size == 0:
+            # mmap cannot map empty files
+            yield io.BytesIO(b'')
+            return
+        mapped = mmap.mmap(spooled.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            yield _MappedReader(mapped)
+        finally:
+            mapped.close()
+
+
+def hash_file(path):
+    """Return the sha256 of a file without reading it into memory at once"""
+    digest = hashlib.sha256()
+    with open_mapped(path) as mapped:
+        while True:
+            chunk = mapped.read(SPOOL_CHUNK_BYTES)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()